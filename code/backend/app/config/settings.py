@@ -43,6 +43,52 @@ class Settings(BaseSettings):
 
     # Models service settings
     MODELS_SERVICE_URL: str = "http://localhost:8001"
+    # Send the relative image path instead of uploading the file (uploads volume mounted in both services)
+    MODELS_SHARED_VOLUME: bool = False
+    # Pooled client: connection limits, keep-alive and per-phase timeouts (seconds)
+    MODELS_MAX_CONNECTIONS: int = 20
+    MODELS_MAX_KEEPALIVE: int = 10
+    MODELS_KEEPALIVE_EXPIRY: float = 30.0
+    MODELS_CONNECT_TIMEOUT: float = 3.0
+    MODELS_READ_TIMEOUT: float = 60.0
+    MODELS_WRITE_TIMEOUT: float = 30.0
+    MODELS_POOL_TIMEOUT: float = 10.0
+    # Retries of connection errors, timeouts, 429 and 5xx, with exponential backoff and jitter
+    MODELS_RETRIES: int = 2
+    MODELS_RETRY_BACKOFF: float = 0.5
+    # Circuit breaker: consecutive failed calls before failing fast, and seconds before probing again
+    MODELS_BREAKER_THRESHOLD: int = 5
+    MODELS_BREAKER_RESET: float = 30.0
+
+    # Job queue settings
+    # "queue": jobs are stored in the job_queue table and run by worker processes (python -m app.worker)
+    # "inline": jobs run as background tasks of the API process (local development without a worker)
+    # Inline by default: queued jobs would never run without a worker
+    JOB_QUEUE_MODE: str = "inline"
+    # Attempts per job, and base/maximum delay (seconds) of the exponential backoff between them
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_RETRY_BACKOFF: float = 5.0
+    JOB_RETRY_MAX_BACKOFF: float = 300.0
+    # Seconds a claimed job stays invisible to other workers; renewed while the job runs,
+    # so only jobs of a dead worker become claimable again
+    JOB_VISIBILITY_TIMEOUT: float = 60.0
+    # Jobs run concurrently by each worker process, per job type
+    WORKER_INGREDIENTS_CONCURRENCY: int = 4
+    WORKER_RECIPE_CONCURRENCY: int = 2
+    WORKER_SPECULATIVE_CONCURRENCY: int = 1
+    # Seconds between polls of an empty queue
+    WORKER_POLL_INTERVAL: float = 1.0
+    # Seconds between keep-alive comments on idle job event streams (GET /jobs/by-recipe/{recipe_id}/events)
+    JOB_EVENTS_HEARTBEAT: float = 15.0
+    # Longest wait (seconds) of a long poll on the job status endpoints (?wait=)
+    JOB_MAX_WAIT: float = 30.0
+    # In-memory cache of job states serving the status polls (entries per process, 0 disables it), and the
+    # seconds an entry lives without being updated by a job event
+    JOB_CACHE_SIZE: int = 10000
+    JOB_CACHE_TTL: float = 300.0
+    # Generate the recipe from the detected ingredients as soon as detection completes; the recipe job
+    # adopts it if the user confirms the same ingredient names (costs an LLM call per discarded guess)
+    SPECULATIVE_RECIPES: bool = False
 
     @property
     def DATABASE_URL(self) -> str:
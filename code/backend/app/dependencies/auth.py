@@ -1,4 +1,4 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from typing import Annotated
@@ -8,6 +8,8 @@ from app.utils.security import decode_access_token
 
 # HTTP Bearer token scheme
 security = HTTPBearer()
+# Same scheme, optional: for endpoints that also accept the token in the query string
+optional_security = HTTPBearer(auto_error=False)
 
 
 def get_current_user(
@@ -33,8 +35,16 @@ def get_current_user(
     Raises:
         HTTPException: If token is invalid or user not found
     """
-    token = credentials.credentials
+    return user_from_token(credentials.credentials, db)
 
+
+def user_from_token(token: str, db: Session) -> User:
+    """
+    Returns the active user a JWT access token was issued to.
+
+    Raises:
+        HTTPException: If token is invalid or user not found
+    """
     # Decode token
     payload = decode_access_token(token)
     if payload is None:
@@ -81,6 +91,29 @@ def get_current_user(
     return user
 
 
+def get_current_user_stream(
+    token: str | None = Query(None, description="Access token, for clients that cannot send headers (EventSource)"),
+    credentials: HTTPAuthorizationCredentials | None = Depends(optional_security),
+    db: Session = Depends(get_db)
+) -> User:
+    """
+    Dependency authenticating event streams: browsers' EventSource cannot send an Authorization header,
+    so the token may also be passed as the `token` query parameter.
+
+    Raises:
+        HTTPException: If no token is given, or it is invalid
+    """
+    if credentials is not None:
+        token = credentials.credentials
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user_from_token(token, db)
+
+
 def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
     """
     Dependency to ensure user is active.
@@ -1,15 +1,36 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from app.config.settings import settings
 from app.routes import health, auth, recipes, categories, jobs
+from app.services.job_cache import job_cache
+from app.services.job_events import event_broker
+from app.services.models_client import models_client
 from pathlib import Path
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pooled, keep-alive client of the models service for the whole application
+    models_client.start()
+    # The job status cache is kept up to date by the job events of every process: listen from the start
+    events_task = asyncio.create_task(event_broker.run()) if job_cache.enabled else None
+    yield
+    await models_client.aclose()
+    if events_task is not None:
+        events_task.cancel()
+    # Otherwise the job events connection opens with the first stream
+    await event_broker.aclose()
+
+
 app = FastAPI(
     title=settings.APP_NAME,
     description="Backend API for Recipe Suggester application",
     version=settings.API_VERSION,
-    debug=settings.DEBUG
+    debug=settings.DEBUG,
+    lifespan=lifespan
 )
 
 # CORS middleware configuration - environment-aware
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum as SQLEnum, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum as SQLEnum, Text, Float, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
@@ -24,6 +24,9 @@ class IngredientsJob(Base):
 
     recipe = relationship("Recipe", back_populates="ingredients_job")
 
+    # one detection per recipe, even when requested concurrently (upload with detect, POST /jobs/ingredients)
+    __table_args__ = (UniqueConstraint("recipe_id", name="uq_ingredients_jobs_recipe_id"),)
+
 
 # represents job called for LLM recipe generation
 class RecipeJob(Base):
@@ -37,3 +40,31 @@ class RecipeJob(Base):
     end_time = Column(DateTime, nullable=True)
 
     recipe = relationship("Recipe", back_populates="recipe_job")
+
+
+# outcome of a speculative recipe generation, once the user submits their ingredients
+SPECULATION_ADOPTED = "adopted"
+SPECULATION_DISCARDED = "discarded"
+
+
+# recipe generated from the detected ingredients before the user confirms them (SPECULATIVE_RECIPES):
+# adopted by the recipe job if the user submits the same ingredient names
+class SpeculativeRecipe(Base):
+    __tablename__ = "speculative_recipes"
+
+    id = Column(Integer, primary_key=True, index=True)
+    recipe_id = Column(Integer, ForeignKey("recipes.id", ondelete="CASCADE"), nullable=False, unique=True)
+    # sha256 of the sorted, lower-cased ingredient names the recipe was generated from
+    fingerprint = Column(String(64), nullable=False)
+    status = Column(SQLEnum(JobStatus), nullable=False, default=JobStatus.running)
+    recipe_json = Column(Text, nullable=True)
+    start_time = Column(DateTime, default=datetime.utcnow, nullable=False)
+    end_time = Column(DateTime, nullable=True)
+    # set when the user submits their ingredients: adopted (same names) or discarded
+    outcome = Column(String(20), nullable=True)
+    # recipe job waiting for this generation, when adopted while still running
+    recipe_job_id = Column(Integer, ForeignKey("recipe_jobs.id", ondelete="SET NULL"), nullable=True)
+    # generation time the user did not wait for, once adopted
+    saved_seconds = Column(Float, nullable=True)
+
+    recipe_job = relationship("RecipeJob")
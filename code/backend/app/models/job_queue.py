@@ -0,0 +1,32 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, Index, UniqueConstraint
+from datetime import datetime
+from app.db.database import Base
+
+
+# kinds of queued work, one per job table
+JOB_TYPE_INGREDIENTS = "ingredients"
+JOB_TYPE_RECIPE = "recipe"
+JOB_TYPE_SPECULATIVE = "speculative"
+
+
+# durable queue entry of a job, claimed by the workers (deleted once the job is done)
+class QueuedJob(Base):
+    __tablename__ = "job_queue"
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_type = Column(String(20), nullable=False)
+    job_id = Column(Integer, nullable=False)
+    payload = Column(Text, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    # not claimable before run_at (retry backoff), nor while locked_until is in the future (visibility timeout)
+    run_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    locked_until = Column(DateTime, nullable=True)
+    locked_by = Column(String(255), nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("job_type", "job_id", name="uq_job_queue_job"),
+        Index("ix_job_queue_claim", "job_type", "run_at"),
+    )
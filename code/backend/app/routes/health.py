@@ -2,6 +2,11 @@ from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 from app.db.database import get_db
 from sqlalchemy import text
+from app.services.models_client import models_client, CircuitBreaker
+from app.services.job_cache import job_cache
+from app.services.job_events import event_broker
+from app.services.job_queue import queue_stats
+from app.services.job_service import speculation_stats
 
 router = APIRouter()
 
@@ -34,3 +39,33 @@ def health_check_db(db: Session = Depends(get_db)):
             "status": "unhealthy",
             "message": f"Database connection failed: {str(e)}"
         }
+
+
+@router.get("/health/models")
+def health_check_models():
+    """
+    Health of the models service as seen by this API: connection pool and circuit breaker state.
+    Does not call the models service.
+    """
+    stats = models_client.stats()
+    return {
+        "status": "healthy" if stats["circuit"]["state"] == CircuitBreaker.CLOSED else "unhealthy",
+        **stats
+    }
+
+
+@router.get("/health/queue")
+def health_check_queue(db: Session = Depends(get_db)):
+    """
+    Job queue depth and age per job type: jobs ready to run, waiting for a retry and running,
+    and the age of the oldest queued job. Also the job event streams open on this API process,
+    and the hit rate and time saved of speculative recipe generation, and the hit ratio and memory use of
+    the job status cache of this API process.
+    """
+    return {
+        "status": "healthy",
+        "queues": queue_stats(db),
+        "events": event_broker.stats(),
+        "speculation": speculation_stats(db),
+        "status_cache": job_cache.stats()
+    }
@@ -1,16 +1,40 @@
-from fastapi import APIRouter, Depends, status, BackgroundTasks
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status, BackgroundTasks
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
+from app.config.settings import settings
 from app.db.database import get_db
-from app.dependencies.auth import get_current_user
+from app.dependencies.auth import get_current_user, get_current_user_stream
 from app.models.user import User
 from app.schemas.job import IngredientsJobResponse, RecipeJobResponse, UpdateIngredientsRequest, Ingredient
+from app.models.job_queue import JOB_TYPE_INGREDIENTS, JOB_TYPE_RECIPE
 from app.services import job_service
+from app.services.job_events import event_broker, recipe_event_stream, JobEventsUnavailable
 from pydantic import BaseModel
 from typing import List
 
 
 router = APIRouter(prefix="/jobs", tags=["jobs"])
 
+# Long-poll parameters of the job status endpoints
+WaitQuery = Query(0.0, ge=0, description="Seconds to wait for the job to change before answering (capped by JOB_MAX_WAIT)")
+IfNoneMatchHeader = Header(None, description="ETag of the job the client already has: 304 while it is unchanged")
+
+
+async def job_status_response(job_type: str, job_id: int, user_id: int, wait: float, if_none_match: str | None, db: Session) -> Response:
+    """
+    Job state with its ETag, or 304 Not Modified (no body) when it matches If-None-Match.
+    """
+    job_state = await job_service.wait_for_job(
+        db, job_type, job_id, user_id, if_none_match, min(wait, settings.JOB_MAX_WAIT)
+    )
+    etag = job_service.job_etag(job_state)
+    # Clients may keep the answer but must revalidate it (If-None-Match) every time
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if job_service.etag_matches(etag, if_none_match):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return JSONResponse(job_state["job"], headers=headers)
+
 
 @router.post("/ingredients/{recipe_id}", response_model=IngredientsJobResponse, status_code=status.HTTP_201_CREATED)
 def create_ingredients_job(
@@ -26,17 +50,20 @@ def create_ingredients_job(
     return job_service.create_ingredients_job(db, recipe_id, current_user.id, background_tasks)
 
 
-@router.get("/ingredients/{job_id}", response_model=IngredientsJobResponse)
-def get_ingredients_job(
+@router.get("/ingredients/{job_id}", response_model=IngredientsJobResponse, responses={304: {"description": "Job unchanged"}})
+async def get_ingredients_job(
     job_id: int,
+    wait: float = WaitQuery,
+    if_none_match: str | None = IfNoneMatchHeader,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Gets status of ingredients detection job.
-    Poll this endpoint to check when processing is complete.
+    Poll this endpoint to check when processing is complete: with `wait`, the answer is held until the job changes
+    (long poll), and If-None-Match returns 304 while the job is unchanged.
     """
-    return job_service.get_ingredients_job(db, job_id, current_user.id)
+    return await job_status_response(JOB_TYPE_INGREDIENTS, job_id, current_user.id, wait, if_none_match, db)
 
 
 @router.put("/ingredients/{recipe_id}", response_model=IngredientsJobResponse)
@@ -81,17 +108,20 @@ def create_recipe_job(
     return job_service.create_recipe_job(db, recipe_id, current_user.id, ingredients_dicts, background_tasks)
 
 
-@router.get("/recipe/{job_id}", response_model=RecipeJobResponse)
-def get_recipe_job(
+@router.get("/recipe/{job_id}", response_model=RecipeJobResponse, responses={304: {"description": "Job unchanged"}})
+async def get_recipe_job(
     job_id: int,
+    wait: float = WaitQuery,
+    if_none_match: str | None = IfNoneMatchHeader,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Gets status of recipe generation job.
-    We poll this endpoint to check when processing is complete.
+    We poll this endpoint to check when processing is complete, optionally as a long poll (`wait`)
+    with If-None-Match returning 304 while the job is unchanged.
     """
-    return job_service.get_recipe_job(db, job_id, current_user.id)
+    return await job_status_response(JOB_TYPE_RECIPE, job_id, current_user.id, wait, if_none_match, db)
 
 
 @router.get("/by-recipe/{recipe_id}")
@@ -104,3 +134,34 @@ def get_jobs_by_recipe(
     Gets both ingredients and recipe jobs for a specific recipe.
     """
     return job_service.get_jobs_by_recipe(db, recipe_id, current_user.id)
+
+
+@router.get("/by-recipe/{recipe_id}/events")
+async def stream_jobs_by_recipe(
+    recipe_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user_stream)
+):
+    """
+    Server-Sent Events stream of a recipe's jobs, replacing the polling of the job endpoints.
+    Sends the current state of each job (`ingredients` and `recipe` events, same payload as the job endpoints),
+    then every status change and result as soon as it is committed, and `end` once the jobs cannot change any more.
+    Authenticated once when opened; EventSource clients pass the token as the `token` query parameter.
+    """
+    # Subscribe before reading the snapshot, so a change committed in between is not missed
+    try:
+        queue = await event_broker.subscribe(recipe_id)
+    except JobEventsUnavailable as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+    try:
+        snapshot = await run_in_threadpool(job_service.get_jobs_snapshot, db, recipe_id, current_user.id)
+    except Exception:
+        event_broker.unsubscribe(recipe_id, queue)
+        raise
+
+    return StreamingResponse(
+        recipe_event_stream(recipe_id, queue, snapshot, settings.JOB_EVENTS_HEARTBEAT),
+        media_type="text/event-stream",
+        # No caching, and no buffering by reverse proxies (nginx), so events are not held back
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, status, UploadFile, File
+from fastapi import APIRouter, BackgroundTasks, Depends, Query, status, UploadFile, File
 from sqlalchemy.orm import Session
 from app.db.database import get_db
 from app.dependencies.auth import get_current_user
 from app.models.user import User
-from app.schemas.recipe import RecipeResponse, RecipeWithCategory, RecipeUpdate
-from app.services import recipe_service
+from app.schemas.job import IngredientsJobResponse
+from app.schemas.recipe import RecipeResponse, RecipeUploadResponse, RecipeWithCategory, RecipeUpdate
+from app.services import job_service, recipe_service
 
 
 router = APIRouter(prefix="/recipes", tags=["recipes"])
@@ -55,11 +56,22 @@ def delete_recipe(
     recipe_service.delete_recipe(db, recipe_id, current_user.id)
 
 
-@router.post("/{recipe_id}/upload", response_model=RecipeResponse)
-async def upload_image(
+@router.post("/{recipe_id}/upload", response_model=RecipeUploadResponse)
+def upload_image(
     recipe_id: int,
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
+    detect: bool = Query(False, description="Also start ingredient detection (idempotent: an existing job is returned)"),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    return recipe_service.upload_recipe_image(db, recipe_id, current_user.id, file)
+    """
+    Stores the recipe image. With `detect`, also creates the ingredients job once the image is written,
+    saving the client the POST /jobs/ingredients round trip: detection runs while the client moves on.
+    """
+    recipe = recipe_service.upload_recipe_image(db, recipe_id, current_user.id, file)
+    response = RecipeUploadResponse.model_validate(recipe)
+    if detect:
+        job = job_service.ensure_ingredients_job(db, recipe_id, current_user.id, background_tasks)
+        response.ingredients_job = IngredientsJobResponse.model_validate(job)
+    return response
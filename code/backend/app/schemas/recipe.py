@@ -2,6 +2,7 @@ from pydantic import BaseModel
 from typing import Optional
 from datetime import datetime
 from app.schemas.category import CategoryResponse
+from app.schemas.job import IngredientsJobResponse
 
 
 class RecipeCreate(BaseModel):
@@ -24,6 +25,11 @@ class RecipeResponse(BaseModel):
         from_attributes = True
 
 
+class RecipeUploadResponse(RecipeResponse):
+    # set when the upload also started ingredient detection (detect=true)
+    ingredients_job: Optional[IngredientsJobResponse] = None
+
+
 class RecipeWithCategory(RecipeResponse):
     category: Optional[CategoryResponse]
 
@@ -0,0 +1,144 @@
+import json
+import sys
+import threading
+import time
+from collections import OrderedDict
+from app.config.settings import settings
+from app.services.job_events import event_broker
+
+
+class JobStatusCache:
+    """
+    Bounded in-memory cache of job states and owners, keyed by (job type, job id), so status polls of unchanged
+    jobs are answered without a query.
+
+    Entries are added when a job is created or first read, updated write-through when a job change commits
+    (job events: local commits at once, other processes through LISTEN/NOTIFY), and expire after `ttl` seconds as a
+    safety net. The least recently used entries are evicted beyond `max_entries`. Thread-safe: read from the
+    threadpool, updated from the event loop.
+
+    A state read from the database is cached only if no job event arrived since the read started (`generation`),
+    so a change committed meanwhile is never overwritten by the older state.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # (job type, job id) -> (owner user id, job state, expiry, approximate size in bytes)
+        self._entries: OrderedDict[tuple[str, int], tuple[int, dict, float, int]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.updates = 0
+        self.evictions = 0
+
+    @classmethod
+    def from_settings(cls) -> "JobStatusCache":
+        return cls(max_entries=settings.JOB_CACHE_SIZE, ttl=settings.JOB_CACHE_TTL)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    @property
+    def generation(self) -> int:
+        """
+        Number of job events received: read it before reading a job from the database, and pass it to `put`.
+        """
+        return self._generation
+
+    def get(self, job_type: str, job_id: int) -> tuple[int, dict] | None:
+        """
+        The owner and state of a job, or None if not cached (or expired).
+        """
+        key = (job_type, job_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[2] < time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0], entry[1]
+
+    def put(self, job_type: str, job_id: int, user_id: int, job_state: dict, generation: int | None = None):
+        """
+        Caches the state of a job. With `generation`, only if no job event arrived since then.
+        """
+        if not self.enabled:
+            return
+        key = (job_type, job_id)
+        size = self._size(job_state)
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (user_id, job_state, time.monotonic() + self.ttl, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def on_event(self, job_state: dict | None):
+        """
+        Job events listener: a committed change updates the cached job (jobs not cached are not added, their owner
+        is unknown). A truncated or deletion event drops it, and None (events may have been missed) clears the cache.
+        """
+        with self._lock:
+            self._generation += 1
+        if job_state is None:
+            self.clear()
+            return
+        key = (job_state["type"], job_state["job"]["id"])
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return
+        if job_state.get("truncated") or job_state.get("deleted"):
+            self.invalidate(*key)
+            return
+        self.updates += 1
+        self.put(key[0], key[1], entry[0], job_state)
+
+    def invalidate(self, job_type: str, job_id: int):
+        with self._lock:
+            self._remove((job_type, job_id))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, key: tuple[str, int]):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[3]
+
+    def _size(self, job_state: dict) -> int:
+        # Serialized size of the state plus the container overhead: an estimate, not an exact measure
+        return len(json.dumps(job_state)) + sys.getsizeof(job_state) + sys.getsizeof(job_state["job"])
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "approx_bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else None,
+            "updates": self.updates,
+            "evictions": self.evictions,
+        }
+
+
+# Shared by the requests of the process; kept up to date by the job events
+job_cache = JobStatusCache.from_settings()
+event_broker.add_listener(job_cache.on_event)
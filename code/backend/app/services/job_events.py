@@ -0,0 +1,357 @@
+"""
+Job status events, pushed to the clients of GET /jobs/by-recipe/{recipe_id}/events.
+
+A status change is published with NOTIFY in the transaction that commits it, so an event is sent exactly when the
+change becomes visible (and never for a rolled back one). Each API process LISTENs on one dedicated connection and
+fans the events out in memory to its streams: events from the workers and the other API replicas reach every
+stream, with no query per subscriber. Without Postgres (SQLite in tests), events are published in memory once
+their transaction commits.
+
+Listeners (the job status cache) receive every event: those committed by this process as soon as they commit,
+and the others through LISTEN.
+"""
+import asyncio
+import json
+from typing import AsyncIterator, Callable
+import psycopg2
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+from app.config.settings import settings
+from app.models.job import JobStatus
+from app.models.job_queue import JOB_TYPE_INGREDIENTS, JOB_TYPE_RECIPE
+from app.schemas.job import IngredientsJobResponse, RecipeJobResponse
+
+CHANNEL = "job_events"
+# NOTIFY payloads are limited to 8000 bytes: a larger result is left out, and read once per API process
+MAX_NOTIFY_PAYLOAD = 7900
+# Milliseconds before a browser reconnects a closed stream
+RECONNECT_DELAY_MS = 2000
+
+JOB_SCHEMAS = {JOB_TYPE_INGREDIENTS: IngredientsJobResponse, JOB_TYPE_RECIPE: RecipeJobResponse}
+RESULT_FIELDS = {JOB_TYPE_INGREDIENTS: "ingredients_json", JOB_TYPE_RECIPE: "recipe_json"}
+FINAL_STATUSES = {JobStatus.completed.value, JobStatus.failed.value}
+
+
+class JobEventsUnavailable(Exception):
+    """
+    Raised when a stream cannot be opened because this process cannot listen to the job events.
+    """
+
+
+def job_event(job_type: str, job) -> dict:
+    """
+    Event carrying the state of a job, in the shape returned by the job endpoints.
+    """
+    return {
+        "type": job_type,
+        "recipe_id": job.recipe_id,
+        "job": JOB_SCHEMAS[job_type].model_validate(job).model_dump(mode="json"),
+    }
+
+
+def notify_job_event(db: Session, job_type: str, job):
+    """
+    Publishes the state of a job when `db` commits. Call it after changing the job, before the commit.
+    """
+    if job_type not in JOB_SCHEMAS:
+        # Speculative generations are internal: clients only see the recipe job adopting them
+        return
+    _notify(db, job_event(job_type, job))
+
+
+def notify_job_deleted(db: Session, job_type: str, job):
+    """
+    Publishes the deletion of a job (with its recipe) when `db` commits, so no process keeps serving its state.
+    """
+    _notify(db, {"type": job_type, "recipe_id": job.recipe_id, "job": {"id": job.id}, "deleted": True})
+
+
+def _notify(db: Session, job_state: dict):
+    job_type = job_state["type"]
+    local = db.get_bind().dialect.name != "postgresql"
+    # Published to the listeners of this process (and, without Postgres, to its streams) once committed
+    db.info.setdefault(CHANNEL, []).append((job_state, local))
+    if local:
+        return
+
+    payload = json.dumps(job_state)
+    if len(payload.encode()) > MAX_NOTIFY_PAYLOAD:
+        truncated = {**job_state, "job": {**job_state["job"], RESULT_FIELDS[job_type]: None}, "truncated": True}
+        payload = json.dumps(truncated)
+    db.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": CHANNEL, "payload": payload})
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_committed(session: Session):
+    for job_state, local in session.info.pop(CHANNEL, []):
+        event_broker.notify_listeners(job_state)
+        if local:
+            event_broker.publish(job_state)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_rolled_back(session: Session):
+    session.info.pop(CHANNEL, None)
+
+
+def stream_finished(statuses: dict[str, str]) -> bool:
+    """
+    Whether a recipe's jobs cannot change any more: recipe generated (or failed), or ingredients detection failed.
+    """
+    return (
+        statuses.get(JOB_TYPE_RECIPE) in FINAL_STATUSES
+        or statuses.get(JOB_TYPE_INGREDIENTS) == JobStatus.failed.value
+    )
+
+
+def format_event(name: str, data: dict) -> str:
+    return f"event: {name}\ndata: {json.dumps(data)}\n\n"
+
+
+class JobEventBroker:
+    """
+    In-memory fan-out of job events to the streams of this process, fed by LISTEN on Postgres.
+
+    The listening connection opens with the first stream. If it drops, events may have been missed: every stream
+    is closed, so its client reconnects and starts again from a fresh snapshot. A subscriber that falls behind
+    loses its oldest events, keeping the latest state of each job.
+    """
+
+    def __init__(self, dsn: str | None = None, queue_size: int = 64, connect_timeout: float = 5.0):
+        self.dsn = dsn
+        self.queue_size = queue_size
+        self.connect_timeout = connect_timeout
+        self._subscribers: dict[int, set[asyncio.Queue]] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._lock: asyncio.Lock | None = None
+        self._connection = None
+        self._listeners: list[Callable[[dict | None], None]] = []
+        self.received = 0
+        self.dropped = 0
+
+    @classmethod
+    def from_settings(cls) -> "JobEventBroker":
+        return cls(dsn=settings.DATABASE_URL if settings.DATABASE_URL.startswith("postgresql") else None)
+
+    @property
+    def receiving(self) -> bool:
+        """
+        Whether this process receives the events of every process: listening, or without Postgres (local events only).
+        """
+        return not self.dsn or self._connection is not None
+
+    def add_listener(self, listener: Callable[[dict | None], None]):
+        """
+        Calls `listener` with every job event, from any thread, and with None when events may have been missed.
+        """
+        self._listeners.append(listener)
+
+    def notify_listeners(self, job_state: dict | None):
+        for listener in self._listeners:
+            try:
+                listener(job_state)
+            except Exception as e:
+                print(f"[Job Events] Listener {listener} failed: {e}")
+
+    async def subscribe(self, recipe_id: int) -> asyncio.Queue:
+        """
+        Starts receiving the events of a recipe. Subscribe before reading the snapshot, so no event is missed.
+        """
+        self._bind_loop()
+        if self.dsn:
+            await self._listen()
+        queue = asyncio.Queue(self.queue_size)
+        self._subscribers.setdefault(recipe_id, set()).add(queue)
+        return queue
+
+    async def run(self, retry_delay: float = 5.0):
+        """
+        Keeps the listening connection open, reconnecting when it drops, for the listeners: unlike streams,
+        they need every event from the start. Runs until cancelled (application lifespan).
+        """
+        self._bind_loop()
+        while True:
+            if self.dsn and self._connection is None:
+                try:
+                    await self._listen()
+                except JobEventsUnavailable as e:
+                    print(f"[Job Events] {e}, retrying in {retry_delay}s")
+            await asyncio.sleep(retry_delay)
+
+    def _bind_loop(self):
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # New event loop (e.g. application restarted in the same process): its reader is not registered
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+            self._loop, self._lock = loop, asyncio.Lock()
+
+    def unsubscribe(self, recipe_id: int, queue: asyncio.Queue):
+        queues = self._subscribers.get(recipe_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[recipe_id]
+
+    def publish(self, job_state: dict):
+        """
+        Delivers an event to the streams of its recipe in this process. Can be called from any thread.
+        """
+        if self._loop is None:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._deliver(job_state)
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._deliver, job_state)
+        except RuntimeError:
+            # The loop of the streams is closed: nobody is listening
+            pass
+
+    def _deliver(self, job_state: dict | None, recipe_id: int | None = None):
+        recipe_id = job_state["recipe_id"] if job_state is not None else recipe_id
+        for queue in self._subscribers.get(recipe_id, ()):
+            if queue.full():
+                queue.get_nowait()
+                self.dropped += 1
+            queue.put_nowait(job_state)
+
+    async def _listen(self):
+        async with self._lock:
+            if self._connection is not None:
+                return
+            try:
+                connection = await asyncio.wait_for(asyncio.to_thread(self._connect), self.connect_timeout)
+            except (psycopg2.Error, asyncio.TimeoutError) as e:
+                raise JobEventsUnavailable(f"Cannot listen to job events: {e}") from e
+            self._connection = connection
+            self._loop.add_reader(connection.fileno(), self._on_notify)
+            print(f"[Job Events] Listening on channel {CHANNEL}")
+
+    def _connect(self):
+        connection = psycopg2.connect(self.dsn, connect_timeout=max(1, int(self.connect_timeout)))
+        connection.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+        with connection.cursor() as cursor:
+            cursor.execute(f"LISTEN {CHANNEL}")
+        return connection
+
+    def _on_notify(self):
+        try:
+            self._connection.poll()
+        except psycopg2.Error as e:
+            print(f"[Job Events] Lost the listening connection: {e}")
+            self._disconnect()
+            return
+
+        while self._connection.notifies:
+            notify = self._connection.notifies.pop(0)
+            self.received += 1
+            try:
+                job_state = json.loads(notify.payload)
+            except ValueError:
+                continue
+            self.notify_listeners(job_state)
+            if job_state["recipe_id"] not in self._subscribers:
+                continue
+            if job_state.get("truncated"):
+                self._loop.create_task(self._deliver_complete(job_state))
+            else:
+                self._deliver(job_state)
+
+    async def _deliver_complete(self, job_state: dict):
+        """
+        Reads the result left out of a NOTIFY payload, once for all the streams of this process.
+        """
+        def load():
+            from app.db.database import SessionLocal
+            from app.services.job_queue import JOB_MODELS
+
+            model = JOB_MODELS[job_state["type"]]
+            db = SessionLocal()
+            try:
+                job = db.query(model).filter(model.id == job_state["job"]["id"]).first()
+                return job_event(job_state["type"], job) if job is not None else None
+            finally:
+                db.close()
+
+        try:
+            complete = await asyncio.to_thread(load)
+        except Exception as e:
+            print(f"[Job Events] Cannot read {job_state['type']} job {job_state['job']['id']}: {e}")
+            complete = None
+        self._deliver(complete or job_state)
+
+    def _disconnect(self):
+        connection, self._connection = self._connection, None
+        if connection is None:
+            return
+        try:
+            self._loop.remove_reader(connection.fileno())
+        except (ValueError, OSError):
+            pass
+        connection.close()
+        self.notify_listeners(None)
+        # Close every stream: their clients reconnect and read a fresh snapshot
+        for recipe_id in list(self._subscribers):
+            self._deliver(None, recipe_id)
+
+    async def aclose(self):
+        """
+        Closes the listening connection and the open streams. Called by the application lifespan.
+        """
+        if self._loop is asyncio.get_running_loop():
+            self._disconnect()
+
+    def stats(self) -> dict:
+        return {
+            "listening": self._connection is not None,
+            "recipes": len(self._subscribers),
+            "streams": sum(len(queues) for queues in self._subscribers.values()),
+            "received": self.received,
+            "dropped": self.dropped,
+        }
+
+
+async def recipe_event_stream(
+    recipe_id: int,
+    queue: asyncio.Queue,
+    snapshot: list[dict],
+    heartbeat: float,
+) -> AsyncIterator[str]:
+    """
+    Server-Sent Events of a recipe's jobs: the current state of each job, then every change as it is committed.
+
+    A comment line is sent every `heartbeat` seconds so proxies keep the connection open. Once the jobs cannot
+    change any more, an `end` event tells the client to close the stream instead of reconnecting.
+    """
+    try:
+        yield f"retry: {RECONNECT_DELAY_MS}\n\n"
+        statuses = {}
+        for job_state in snapshot:
+            statuses[job_state["type"]] = job_state["job"]["status"]
+            yield format_event(job_state["type"], job_state["job"])
+
+        while not stream_finished(statuses):
+            try:
+                job_state = await asyncio.wait_for(queue.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if job_state is None or job_state.get("deleted"):
+                return
+            statuses[job_state["type"]] = job_state["job"]["status"]
+            yield format_event(job_state["type"], job_state["job"])
+
+        yield format_event("end", {"recipe_id": recipe_id})
+    finally:
+        event_broker.unsubscribe(recipe_id, queue)
+
+
+# Shared by every stream of the process; its listening connection is closed by the application lifespan
+event_broker = JobEventBroker.from_settings()
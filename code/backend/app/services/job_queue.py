@@ -0,0 +1,185 @@
+import json
+import random
+from datetime import datetime, timedelta
+from sqlalchemy import case, func, or_
+from sqlalchemy.orm import Session
+from app.config.settings import settings
+from app.models.job import IngredientsJob, RecipeJob, JobStatus, SpeculativeRecipe
+from app.models.job_queue import QueuedJob, JOB_TYPE_INGREDIENTS, JOB_TYPE_RECIPE, JOB_TYPE_SPECULATIVE
+from app.services.job_events import notify_job_event
+
+JOB_MODELS = {JOB_TYPE_INGREDIENTS: IngredientsJob, JOB_TYPE_RECIPE: RecipeJob, JOB_TYPE_SPECULATIVE: SpeculativeRecipe}
+
+
+def enqueue_job(db: Session, job_type: str, job_id: int, payload: dict | None = None) -> QueuedJob:
+    """
+    Adds a job to the queue without committing: the caller commits it together with the job row,
+    so a job is never created without its queue entry.
+    """
+    entry = QueuedJob(
+        job_type=job_type,
+        job_id=job_id,
+        payload=json.dumps(payload) if payload is not None else None,
+        attempts=0,
+        max_attempts=settings.JOB_MAX_ATTEMPTS,
+        run_at=datetime.utcnow(),
+    )
+    db.add(entry)
+    return entry
+
+
+def claim_job(db: Session, job_type: str, worker_id: str, visibility_timeout: float | None = None) -> QueuedJob | None:
+    """
+    Claims the oldest runnable job of a type for a worker.
+
+    The row is locked with SELECT ... FOR UPDATE SKIP LOCKED, so concurrent workers claim different jobs without
+    waiting on each other. The claimed job stays invisible to other workers until its lease (`locked_until`) expires.
+    """
+    now = datetime.utcnow()
+    entry = (
+        db.query(QueuedJob)
+        .filter(
+            QueuedJob.job_type == job_type,
+            QueuedJob.run_at <= now,
+            or_(QueuedJob.locked_until.is_(None), QueuedJob.locked_until < now),
+        )
+        .order_by(QueuedJob.run_at, QueuedJob.id)
+        .with_for_update(skip_locked=True)
+        .limit(1)
+        .first()
+    )
+    if entry is None:
+        db.commit()
+        return None
+
+    entry.attempts += 1
+    entry.locked_by = worker_id
+    entry.locked_until = now + timedelta(seconds=visibility_timeout or settings.JOB_VISIBILITY_TIMEOUT)
+    db.commit()
+    db.refresh(entry)
+    return entry
+
+
+def extend_lease(db: Session, entry_id: int, worker_id: str, visibility_timeout: float | None = None) -> bool:
+    """
+    Renews the lease of a running job. Returns False if the worker lost it (expired and claimed by another worker).
+    """
+    locked_until = datetime.utcnow() + timedelta(seconds=visibility_timeout or settings.JOB_VISIBILITY_TIMEOUT)
+    updated = (
+        db.query(QueuedJob)
+        .filter(QueuedJob.id == entry_id, QueuedJob.locked_by == worker_id)
+        .update({QueuedJob.locked_until: locked_until}, synchronize_session=False)
+    )
+    db.commit()
+    return updated == 1
+
+
+def cancel_job(db: Session, job_type: str, job_id: int) -> bool:
+    """
+    Removes a queued job no worker is running, so it never runs. Returns False if it is running (or not queued).
+    """
+    now = datetime.utcnow()
+    deleted = (
+        db.query(QueuedJob)
+        .filter(
+            QueuedJob.job_type == job_type,
+            QueuedJob.job_id == job_id,
+            or_(QueuedJob.locked_until.is_(None), QueuedJob.locked_until < now),
+        )
+        .delete(synchronize_session=False)
+    )
+    return deleted == 1
+
+
+def complete_job(db: Session, entry_id: int, worker_id: str) -> bool:
+    """
+    Removes a finished job (completed, or failed for good) from the queue.
+    Returns False, leaving the entry alone, if the worker's lease was lost and another worker took the job over.
+    """
+    deleted = (
+        db.query(QueuedJob)
+        .filter(QueuedJob.id == entry_id, QueuedJob.locked_by == worker_id)
+        .delete(synchronize_session=False)
+    )
+    db.commit()
+    return deleted == 1
+
+
+def retry_delay(attempts: int) -> float:
+    """
+    Exponential backoff with jitter: half the delay is fixed, half random, so failed jobs do not retry in lockstep.
+    """
+    delay = min(settings.JOB_RETRY_MAX_BACKOFF, settings.JOB_RETRY_BACKOFF * 2 ** max(0, attempts - 1))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def retry_job(db: Session, entry_id: int, worker_id: str, error: str) -> datetime | None:
+    """
+    Releases a failed attempt, making the job runnable again after the backoff delay.
+    Returns when it will be retried, or None if the worker no longer holds the lease.
+    """
+    entry = (
+        db.query(QueuedJob)
+        .filter(QueuedJob.id == entry_id, QueuedJob.locked_by == worker_id)
+        .with_for_update()
+        .first()
+    )
+    if entry is None:
+        return None
+    entry.run_at = datetime.utcnow() + timedelta(seconds=retry_delay(entry.attempts))
+    entry.locked_until = None
+    entry.locked_by = None
+    entry.last_error = error[:2000]
+    db.commit()
+    return entry.run_at
+
+
+def fail_job(db: Session, entry_id: int, job_type: str, job_id: int, error: str | None = None):
+    """
+    Marks the job failed and removes it from the queue, e.g. once its worker died during every attempt.
+    """
+    job = db.query(JOB_MODELS[job_type]).filter(JOB_MODELS[job_type].id == job_id).first()
+    if job is not None and job.status == JobStatus.running:
+        job.status = JobStatus.failed
+        job.end_time = datetime.utcnow()
+        notify_job_event(db, job_type, job)
+        # A recipe job that adopted a failed speculative generation generates the recipe itself
+        waiting_job = getattr(job, "recipe_job", None)
+        if waiting_job is not None and waiting_job.status == JobStatus.running:
+            enqueue_job(db, JOB_TYPE_RECIPE, waiting_job.id)
+    db.query(QueuedJob).filter(QueuedJob.id == entry_id).delete(synchronize_session=False)
+    db.commit()
+    if error:
+        print(f"[Job Queue] {job_type} job {job_id} failed for good: {error}")
+
+
+def queue_stats(db: Session) -> dict:
+    """
+    Queue depth and job age per job type: jobs ready to run, waiting for a retry, and running (leased),
+    plus the age of the oldest queued job.
+    """
+    now = datetime.utcnow()
+    leased = (QueuedJob.locked_until.isnot(None)) & (QueuedJob.locked_until >= now)
+    rows = (
+        db.query(
+            QueuedJob.job_type,
+            func.sum(case((leased, 1), else_=0)),
+            func.sum(case((~leased & (QueuedJob.run_at > now), 1), else_=0)),
+            func.count(QueuedJob.id),
+            func.min(QueuedJob.created_at),
+        )
+        .group_by(QueuedJob.job_type)
+        .all()
+    )
+    stats = {
+        job_type: {"ready": 0, "delayed": 0, "running": 0, "oldest_age_seconds": None}
+        for job_type in JOB_MODELS
+    }
+    for job_type, running, delayed, total, oldest in rows:
+        stats[job_type] = {
+            "ready": int(total) - int(running or 0) - int(delayed or 0),
+            "delayed": int(delayed or 0),
+            "running": int(running or 0),
+            "oldest_age_seconds": (now - oldest).total_seconds() if oldest else None,
+        }
+    return stats
@@ -1,17 +1,71 @@
 import os
-import httpx
 from pathlib import Path
 from sqlalchemy.orm import Session
 from fastapi import HTTPException, status, BackgroundTasks
 from datetime import datetime
 import asyncio
+import hashlib
 import json
-from app.models.job import IngredientsJob, RecipeJob, JobStatus
+from fastapi.concurrency import run_in_threadpool
+from app.config.settings import settings
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from app.models.job import IngredientsJob, RecipeJob, JobStatus, SpeculativeRecipe, SPECULATION_ADOPTED, SPECULATION_DISCARDED
+from app.models.job_queue import JOB_TYPE_INGREDIENTS, JOB_TYPE_RECIPE, JOB_TYPE_SPECULATIVE
 from app.models.recipe import Recipe
+from app.services.job_cache import job_cache
+from app.services.job_events import event_broker, job_event, notify_job_event, JobEventsUnavailable
+from app.services.job_queue import enqueue_job, cancel_job
 from app.services.llm_service import generate_recipe_from_ingredients
 
 
+def queue_enabled() -> bool:
+    """
+    Whether jobs go to the durable queue (run by worker processes) rather than to in-process background tasks.
+    """
+    return settings.JOB_QUEUE_MODE == "queue"
+
+
+def speculation_enabled() -> bool:
+    """
+    Whether a recipe is generated from the detected ingredients as soon as detection completes,
+    before the user confirms them.
+    """
+    return settings.SPECULATIVE_RECIPES
+
+
+def ingredients_fingerprint(ingredients: list[dict]) -> str:
+    """
+    Identity of an ingredient set as the LLM sees it: its sorted, lower-cased, unique ingredient names.
+    """
+    names = sorted({(ing.get("name") or "").strip().lower() for ing in ingredients} - {""})
+    return hashlib.sha256(json.dumps(names).encode()).hexdigest()
+
+
+# Speculative generations running as tasks of this process (inline mode), so discarded ones can be cancelled
+_speculative_tasks: dict[int, asyncio.Task] = {}
+
+
 def create_ingredients_job(db: Session, recipe_id: int, user_id: int, background_tasks: BackgroundTasks = None) -> IngredientsJob:
+    job, created = get_or_create_ingredients_job(db, recipe_id, user_id, background_tasks)
+    if not created:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Ingredients job already exists for this recipe")
+    return job
+
+
+def ensure_ingredients_job(db: Session, recipe_id: int, user_id: int, background_tasks: BackgroundTasks = None) -> IngredientsJob:
+    """
+    Returns the ingredients job of a recipe, creating it (and starting detection) if there is none yet.
+    Idempotent: a retried upload, or a client still calling POST /jobs/ingredients, does not detect twice.
+    """
+    job, _ = get_or_create_ingredients_job(db, recipe_id, user_id, background_tasks)
+    return job
+
+
+def get_or_create_ingredients_job(db: Session, recipe_id: int, user_id: int, background_tasks: BackgroundTasks = None) -> tuple[IngredientsJob, bool]:
+    """
+    The ingredients job of a recipe, and whether this call created it.
+    """
     recipe = db.query(Recipe).filter(Recipe.id == recipe_id, Recipe.user_id == user_id).first()
     if not recipe:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Recipe not found")
@@ -19,18 +73,29 @@ def create_ingredients_job(db: Session, recipe_id: int, user_id: int, background
     # Check if job already exists
     existing_job = db.query(IngredientsJob).filter(IngredientsJob.recipe_id == recipe_id).first()
     if existing_job:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Ingredients job already exists for this recipe")
+        return existing_job, False
 
     job = IngredientsJob(recipe_id=recipe_id, status=JobStatus.running)
     db.add(job)
+    try:
+        db.flush()
+    except IntegrityError:
+        # Created by a concurrent request in the meantime (unique recipe_id)
+        db.rollback()
+        return db.query(IngredientsJob).filter(IngredientsJob.recipe_id == recipe_id).one(), False
+    if queue_enabled():
+        # Queued in the same transaction as the job, picked up by a worker
+        enqueue_job(db, JOB_TYPE_INGREDIENTS, job.id)
+    notify_job_event(db, JOB_TYPE_INGREDIENTS, job)
     db.commit()
     db.refresh(job)
+    cache_job_state(JOB_TYPE_INGREDIENTS, job, user_id)
 
     # Launch async task to process ingredients (if background_tasks provided)
-    if background_tasks:
+    if background_tasks and not queue_enabled():
         background_tasks.add_task(process_ingredients_async, job.id)
 
-    return job
+    return job, True
 
 
 def get_ingredients_job(db: Session, job_id: int, user_id: int) -> IngredientsJob:
@@ -67,26 +132,31 @@ def update_ingredients_json(db: Session, recipe_id: int, user_id: int, ingredien
 
     # Convert validated data to JSON string for storage
     job.ingredients_json = json.dumps(ingredients_data)
+    notify_job_event(db, JOB_TYPE_INGREDIENTS, job)
+    # Edited ingredients: a recipe generated from the detected ones will not be used
+    speculation = pending_speculation(db, recipe_id)
+    if speculation is not None and speculation.fingerprint != ingredients_fingerprint(ingredients_data["ingredients"]):
+        discard_speculation(db, speculation)
     db.commit()
     db.refresh(job)
 
     return job
 
 
-async def process_ingredients_async(job_id: int):
+async def process_ingredients_async(job_id: int, final_attempt: bool = True):
     """
     Async task that processes ML model for ingredient detection from image.
     Updates job status when done.
+    When a later attempt will follow (queued jobs), errors are raised instead of failing the job.
     """
-    import httpx
     from app.db.database import SessionLocal
-    from app.config.settings import settings
+    from app.services.models_client import models_client
 
     db = SessionLocal()
     try:
-        # Get the job and recipe
+        # Get the job and recipe (a job already finished is not run again, e.g. when redelivered by the queue)
         job = db.query(IngredientsJob).filter(IngredientsJob.id == job_id).first()
-        if not job:
+        if not job or job.status != JobStatus.running:
             return
         print(f'job successfully retrieved: {job}')
         
@@ -102,16 +172,16 @@ async def process_ingredients_async(job_id: int):
             raise FileNotFoundError(f"Image file not found at path {image_path}")
         print(f'image path: {image_path}')
         
-        models_service_url = f"{settings.MODELS_SERVICE_URL}/predict"
-        print(f'model service setted: {models_service_url}')
-        
-        async with httpx.AsyncClient(timeout=60.0) as client:
+        # Pooled client: keep-alive connections, retries, and fails fast while the models service is down
+        if settings.MODELS_SHARED_VOLUME:
+            # The models service reads the file from the shared volume: send only its relative path
+            shared_path = (UPLOAD_DIR / recipe.image).as_posix()
+            result = await models_client.predict_path(shared_path)
+        else:
+            # Read once, so every retry sends the whole file
             with open(image_path, "rb") as f:
-                files = {"file": (recipe.image, f, "image/jpeg")}
-                response = await client.post(models_service_url, files=files)
-
-            response.raise_for_status()
-            result = response.json()
+                data = f.read()
+            result = await models_client.predict_file(recipe.image, data)
         
         ingredients_data = result.get("ingredients", [])
         print(f'ingredients retrieved: {ingredients_data}')
@@ -119,14 +189,22 @@ async def process_ingredients_async(job_id: int):
         job.status = JobStatus.completed
         job.ingredients_json = json.dumps(ingredients_data)
         job.end_time = datetime.utcnow()
+        notify_job_event(db, JOB_TYPE_INGREDIENTS, job)
+        speculation = start_speculation(db, job.recipe_id, ingredients_data) if speculation_enabled() else None
         db.commit()
+        if speculation is not None and not queue_enabled():
+            run_speculation_inline(speculation.id, ingredients_data)
 
     except Exception as e:
         print(f"Error in process_ingredients_async: {e}")
+        if not final_attempt:
+            db.rollback()
+            raise
         job = db.query(IngredientsJob).filter(IngredientsJob.id == job_id).first()
         if job:
             job.status = JobStatus.failed
             job.end_time = datetime.utcnow()
+            notify_job_event(db, JOB_TYPE_INGREDIENTS, job)
             db.commit()
     finally:
         db.close()
@@ -156,11 +234,18 @@ def create_recipe_job(db: Session, recipe_id: int, user_id: int, ingredients: li
 
     job = RecipeJob(recipe_id=recipe_id, status=JobStatus.running)
     db.add(job)
+    db.flush()
+    # Same ingredients as a speculative generation: take its result (or wait for it) instead of generating again
+    adopted = adopt_speculation(db, recipe_id, job, ingredients)
+    if queue_enabled() and not adopted:
+        enqueue_job(db, JOB_TYPE_RECIPE, job.id, {"ingredients": ingredients})
+    notify_job_event(db, JOB_TYPE_RECIPE, job)
     db.commit()
     db.refresh(job)
+    cache_job_state(JOB_TYPE_RECIPE, job, user_id)
 
     # Launch async task to generate recipe (if background_tasks provided)
-    if background_tasks:
+    if background_tasks and not queue_enabled() and not adopted:
         background_tasks.add_task(process_recipe_async, job.id, ingredients)
 
     return job
@@ -178,15 +263,46 @@ def get_recipe_job(db: Session, job_id: int, user_id: int) -> RecipeJob:
     return job
 
 
-async def process_recipe_async(job_id: int, ingredients: list[dict]):
+def complete_recipe_job(db: Session, job: RecipeJob, recipe_dict: dict):
+    """
+    Stores a generated recipe in its job, and its title in the recipe (the caller commits).
+    """
+    # Update the Recipe table with the generated title
+    recipe = db.query(Recipe).filter(Recipe.id == job.recipe_id).first()
+    if recipe and "title" in recipe_dict:
+        old_title = recipe.title
+        recipe.title = recipe_dict["title"]
+        print(f"[Recipe Title Update] Recipe ID {recipe.id}: '{old_title}' -> '{recipe.title}'")
+    else:
+        print(f"[Recipe Title Update] SKIPPED - recipe: {recipe}, has title: {'title' in recipe_dict}")
+
+    # Update the job with recipe JSON
+    job.status = JobStatus.completed
+    job.recipe_json = json.dumps(recipe_dict)
+    job.end_time = datetime.utcnow()
+
+
+async def process_recipe_async(job_id: int, ingredients: list[dict] | None, final_attempt: bool = True):
     """
     Async task that uses LLM for recipe generation.
     Updates job status when done.
+    Without ingredients, uses the ones of the recipe's ingredients job.
+    When a later attempt will follow (queued jobs), errors are raised instead of failing the job.
     """
     from app.db.database import SessionLocal
 
     db = SessionLocal()
     try:
+        job = db.query(RecipeJob).filter(RecipeJob.id == job_id).first()
+        if not job or job.status != JobStatus.running:
+            return
+
+        if ingredients is None:
+            ingredients_job = db.query(IngredientsJob).filter(IngredientsJob.recipe_id == job.recipe_id).first()
+            data = json.loads(ingredients_job.ingredients_json or "[]") if ingredients_job else []
+            # Detection stores a list, user edits an object with an "ingredients" list
+            ingredients = data.get("ingredients", []) if isinstance(data, dict) else data
+
         # Extract ingredient names from the list (ignore confidence)
         ingredient_names = [ing.get("name", "") for ing in ingredients if ing.get("name")]
 
@@ -196,21 +312,9 @@ async def process_recipe_async(job_id: int, ingredients: list[dict]):
         # Generate recipe using LLM
         recipe_dict = await generate_recipe_from_ingredients(ingredient_names)
 
-        job = db.query(RecipeJob).filter(RecipeJob.id == job_id).first()
         if job:
-            # Update the Recipe table with the generated title
-            recipe = db.query(Recipe).filter(Recipe.id == job.recipe_id).first()
-            if recipe and "title" in recipe_dict:
-                old_title = recipe.title
-                recipe.title = recipe_dict["title"]
-                print(f"[Recipe Title Update] Recipe ID {recipe.id}: '{old_title}' -> '{recipe.title}'")
-            else:
-                print(f"[Recipe Title Update] SKIPPED - recipe: {recipe}, has title: {'title' in recipe_dict}")
-
-            # Update the job with recipe JSON
-            job.status = JobStatus.completed
-            job.recipe_json = json.dumps(recipe_dict)
-            job.end_time = datetime.utcnow()
+            complete_recipe_job(db, job, recipe_dict)
+            notify_job_event(db, JOB_TYPE_RECIPE, job)
             db.commit()
 
     except Exception as e:
@@ -223,15 +327,170 @@ async def process_recipe_async(job_id: int, ingredients: list[dict]):
         elif "api_key" in error_msg.lower() or "authentication" in error_msg.lower():
             print("OpenAI API authentication error - check API key")
 
+        if not final_attempt:
+            db.rollback()
+            raise
         job = db.query(RecipeJob).filter(RecipeJob.id == job_id).first()
         if job:
             job.status = JobStatus.failed
             job.end_time = datetime.utcnow()
+            notify_job_event(db, JOB_TYPE_RECIPE, job)
             db.commit()
     finally:
         db.close()
 
 
+def start_speculation(db: Session, recipe_id: int, ingredients: list[dict]) -> SpeculativeRecipe | None:
+    """
+    Records a speculative generation from the detected ingredients, queued in the caller's transaction.
+    In inline mode, the caller runs it after committing (`run_speculation_inline`).
+    """
+    if not any(ing.get("name") for ing in ingredients):
+        return None
+    speculation = SpeculativeRecipe(recipe_id=recipe_id, fingerprint=ingredients_fingerprint(ingredients), status=JobStatus.running)
+    db.add(speculation)
+    db.flush()
+    if queue_enabled():
+        enqueue_job(db, JOB_TYPE_SPECULATIVE, speculation.id, {"ingredients": ingredients})
+    return speculation
+
+
+def run_speculation_inline(speculation_id: int, ingredients: list[dict]):
+    task = asyncio.create_task(process_speculative_recipe_async(speculation_id, ingredients))
+    _speculative_tasks[speculation_id] = task
+    task.add_done_callback(lambda _: _speculative_tasks.pop(speculation_id, None))
+
+
+def pending_speculation(db: Session, recipe_id: int) -> SpeculativeRecipe | None:
+    """
+    The speculative generation of a recipe not adopted nor discarded yet, locked against its own completion.
+    """
+    return db.query(SpeculativeRecipe).filter(
+        SpeculativeRecipe.recipe_id == recipe_id,
+        SpeculativeRecipe.outcome.is_(None)
+    ).with_for_update().first()
+
+
+def discard_speculation(db: Session, speculation: SpeculativeRecipe):
+    """
+    Drops a speculative generation: cancelled if not started (or running in this process), its result ignored otherwise.
+    """
+    speculation.outcome = SPECULATION_DISCARDED
+    if speculation.status == JobStatus.running:
+        cancel_job(db, JOB_TYPE_SPECULATIVE, speculation.id)
+        task = _speculative_tasks.get(speculation.id)
+        if task is not None:
+            task.cancel()
+    print(f"[Speculation] Recipe {speculation.recipe_id}: discarded ({speculation.status.value})")
+
+
+def adopt_speculation(db: Session, recipe_id: int, job: RecipeJob, ingredients: list[dict]) -> bool:
+    """
+    Gives a new recipe job the result of the recipe's speculative generation, if it used the same ingredient names:
+    completed at once if the generation is done, else completed by the generation when it finishes.
+    A speculative generation from other ingredients is discarded. Returns whether the job was adopted.
+    """
+    speculation = pending_speculation(db, recipe_id)
+    if speculation is None:
+        return False
+    if speculation.status == JobStatus.failed or speculation.fingerprint != ingredients_fingerprint(ingredients):
+        discard_speculation(db, speculation)
+        return False
+
+    speculation.outcome = SPECULATION_ADOPTED
+    if speculation.status == JobStatus.completed:
+        # The user does not wait for the generation at all
+        speculation.saved_seconds = (speculation.end_time - speculation.start_time).total_seconds()
+        complete_recipe_job(db, job, json.loads(speculation.recipe_json))
+    else:
+        # The generation has a head start
+        speculation.saved_seconds = (datetime.utcnow() - speculation.start_time).total_seconds()
+        speculation.recipe_job_id = job.id
+    print(f"[Speculation] Recipe {recipe_id}: adopted ({speculation.status.value}), {speculation.saved_seconds:.1f}s saved")
+    return True
+
+
+async def process_speculative_recipe_async(speculation_id: int, ingredients: list[dict], final_attempt: bool = True):
+    """
+    Async task generating a recipe from the detected ingredients before the user confirms them.
+    Its result goes to the recipe job that adopted it, if any; a discarded generation stops, or its result is dropped.
+    If it fails for good, the recipe job that adopted it runs a generation of its own.
+    """
+    from app.db.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        speculation = db.query(SpeculativeRecipe).filter(SpeculativeRecipe.id == speculation_id).first()
+        if not speculation or speculation.status != JobStatus.running or speculation.outcome == SPECULATION_DISCARDED:
+            return
+
+        ingredient_names = [ing.get("name", "") for ing in ingredients if ing.get("name")]
+        recipe_dict = await generate_recipe_from_ingredients(ingredient_names)
+
+        # Locked and read again: the user may have adopted or discarded it meanwhile
+        speculation = db.query(SpeculativeRecipe).filter(
+            SpeculativeRecipe.id == speculation_id
+        ).with_for_update().populate_existing().first()
+        if not speculation or speculation.outcome == SPECULATION_DISCARDED:
+            db.commit()
+            return
+        speculation.status = JobStatus.completed
+        speculation.recipe_json = json.dumps(recipe_dict)
+        speculation.end_time = datetime.utcnow()
+        waiting_job = speculation.recipe_job
+        if waiting_job is not None and waiting_job.status == JobStatus.running:
+            complete_recipe_job(db, waiting_job, recipe_dict)
+            notify_job_event(db, JOB_TYPE_RECIPE, waiting_job)
+        db.commit()
+
+    except Exception as e:
+        print(f"Error in process_speculative_recipe_async: {e}")
+        if not final_attempt:
+            db.rollback()
+            raise
+        db.rollback()
+        speculation = db.query(SpeculativeRecipe).filter(
+            SpeculativeRecipe.id == speculation_id
+        ).with_for_update().first()
+        fallback_job_id = None
+        if speculation:
+            speculation.status = JobStatus.failed
+            speculation.end_time = datetime.utcnow()
+            waiting_job = speculation.recipe_job
+            if waiting_job is not None and waiting_job.status == JobStatus.running:
+                # Adopted: the recipe job generates the recipe itself
+                fallback_job_id = waiting_job.id
+                if queue_enabled():
+                    enqueue_job(db, JOB_TYPE_RECIPE, fallback_job_id, {"ingredients": ingredients})
+            db.commit()
+        if fallback_job_id is not None and not queue_enabled():
+            await process_recipe_async(fallback_job_id, ingredients)
+    finally:
+        db.close()
+
+
+def speculation_stats(db: Session) -> dict:
+    """
+    Speculative generations started, adopted, discarded and still pending; hit rate among the decided ones,
+    and generation time the users did not wait for thanks to adoption.
+    """
+    counts = {outcome: (count, saved) for outcome, count, saved in db.query(
+        SpeculativeRecipe.outcome, func.count(SpeculativeRecipe.id), func.sum(SpeculativeRecipe.saved_seconds)
+    ).group_by(SpeculativeRecipe.outcome).all()}
+    adopted, saved = counts.get(SPECULATION_ADOPTED, (0, None))
+    discarded = counts.get(SPECULATION_DISCARDED, (0, None))[0]
+    return {
+        "enabled": speculation_enabled(),
+        "started": sum(count for count, _ in counts.values()),
+        "adopted": adopted,
+        "discarded": discarded,
+        "pending": counts.get(None, (0, None))[0],
+        "hit_rate": adopted / (adopted + discarded) if adopted + discarded else None,
+        "saved_seconds_total": float(saved or 0.0),
+        "saved_seconds_avg": float(saved) / adopted if adopted and saved is not None else None,
+    }
+
+
 def get_jobs_by_recipe(db: Session, recipe_id: int, user_id: int):
     """
     Gets both ingredients and recipe jobs for a specific recipe.
@@ -247,3 +506,115 @@ def get_jobs_by_recipe(db: Session, recipe_id: int, user_id: int):
         "ingredients_job": ingredients_job,
         "recipe_job": recipe_job
     }
+
+
+def get_jobs_snapshot(db: Session, recipe_id: int, user_id: int) -> list[dict]:
+    """
+    Current state of a recipe's jobs, as job events: the start of the recipe's event stream.
+    """
+    jobs = get_jobs_by_recipe(db, recipe_id, user_id)
+    return [
+        job_event(job_type, job)
+        for job_type, job in ((JOB_TYPE_INGREDIENTS, jobs["ingredients_job"]), (JOB_TYPE_RECIPE, jobs["recipe_job"]))
+        if job is not None
+    ]
+
+
+def job_etag(job_state: dict) -> str:
+    """
+    Strong ETag of a job's representation: it changes whenever a field of the job row does.
+    """
+    digest = hashlib.sha1(json.dumps(job_state["job"], sort_keys=True).encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def etag_matches(etag: str, if_none_match: str | None) -> bool:
+    """
+    Whether an If-None-Match header lists `etag` (weak comparison, as RFC 9110 requires for If-None-Match).
+    """
+    if not if_none_match:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+def job_cache_usable() -> bool:
+    """
+    Whether cached job states are up to date: only while this process receives the job events of every process.
+    """
+    return job_cache.enabled and event_broker.receiving
+
+
+def cache_job_state(job_type: str, job, user_id: int):
+    """
+    Caches a job just created, so the first status polls do not query it.
+    """
+    if job_cache_usable():
+        job_cache.put(job_type, job.id, user_id, job_event(job_type, job))
+
+
+def get_job_state(db: Session, job_type: str, job_id: int, user_id: int) -> dict:
+    """
+    State of a user's job (a job event), from the job status cache if there, otherwise read and cached.
+    """
+    use_cache = job_cache_usable()
+    if use_cache:
+        cached = job_cache.get(job_type, job_id)
+        if cached is not None:
+            owner_id, job_state = cached
+            if owner_id != user_id:
+                detail = "Ingredients job not found" if job_type == JOB_TYPE_INGREDIENTS else "Recipe job not found"
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=detail)
+            return job_state
+
+    generation = job_cache.generation
+    getter = get_ingredients_job if job_type == JOB_TYPE_INGREDIENTS else get_recipe_job
+    job_state = job_event(job_type, getter(db, job_id, user_id))
+    if use_cache:
+        job_cache.put(job_type, job_id, user_id, job_state, generation)
+    return job_state
+
+
+async def wait_for_job(db: Session, job_type: str, job_id: int, user_id: int, if_none_match: str | None, wait: float) -> dict:
+    """
+    Long poll: returns the state of a job (a job event), first waiting up to `wait` seconds for it to change
+    if it is unchanged since the client's If-None-Match ETag (or, without one, still running).
+
+    The database connection is released while waiting: changes are noticed through the job events, and the job
+    is read again only when one of them concerns it.
+    """
+    def unchanged(state: dict) -> bool:
+        if if_none_match:
+            return etag_matches(job_etag(state), if_none_match)
+        return state["job"]["status"] == JobStatus.running.value
+
+    job_state = await run_in_threadpool(get_job_state, db, job_type, job_id, user_id)
+    if wait <= 0 or not unchanged(job_state):
+        return job_state
+
+    try:
+        queue = await event_broker.subscribe(job_state["recipe_id"])
+    except JobEventsUnavailable as e:
+        print(f"[Jobs] Cannot wait for {job_type} job {job_id}: {e}")
+        return job_state
+    try:
+        # Read again now that events are received, so a change committed in between is not missed
+        job_state = await run_in_threadpool(get_job_state, db, job_type, job_id, user_id)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + wait
+        while unchanged(job_state):
+            db.close()
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=remaining)
+            except asyncio.TimeoutError:
+                break
+            if event is None:
+                break
+            if event["type"] == job_type and event["job"]["id"] == job_id:
+                job_state = await run_in_threadpool(get_job_state, db, job_type, job_id, user_id)
+        return job_state
+    finally:
+        event_broker.unsubscribe(job_state["recipe_id"], queue)
@@ -0,0 +1,246 @@
+import asyncio
+import random
+import time
+import httpx
+from app.config.settings import settings
+
+
+class ModelsServiceUnavailable(Exception):
+    """
+    Raised when the models service cannot answer: circuit open, or still failing after the retries.
+    """
+
+
+class CircuitBreaker:
+    """
+    Stops calling a service that keeps failing, so callers fail fast instead of waiting for timeouts.
+
+    - closed: calls go through; `failure_threshold` consecutive failures open the circuit
+    - open: calls are refused until `reset_timeout` seconds have passed
+    - half_open: a single probe call goes through; its success closes the circuit, its failure opens it again
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: float | None = None
+        self.times_opened = 0
+        self._probing = False
+
+    def allow(self) -> bool:
+        """
+        Whether a call may go through now. In half-open state, only one probe call is allowed at a time.
+        """
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        self._probing = False
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.times_opened += 1
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def release_probe(self):
+        """
+        Give up a probe call without a result (e.g. cancelled), so the next call probes instead.
+        """
+        self._probing = False
+
+    def snapshot(self) -> dict:
+        retry_in = None
+        if self.state == self.OPEN:
+            retry_in = max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "times_opened": self.times_opened,
+            "retry_in_seconds": retry_in,
+        }
+
+
+class ModelsServiceClient:
+    """
+    Application-lifetime HTTP client of the models service.
+
+    Connections are pooled and kept alive across jobs. Connection errors, timeouts, 429 and 5xx answers are retried
+    with exponential backoff and full jitter (honouring Retry-After); a circuit breaker fails calls fast while the
+    service is down. Detection requests are idempotent, so retrying them is safe.
+    """
+
+    # Answers worth retrying: overloaded (429, 503), or a transient server error
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(
+        self,
+        base_url: str,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 30.0,
+        connect_timeout: float = 3.0,
+        read_timeout: float = 60.0,
+        write_timeout: float = 30.0,
+        pool_timeout: float = 10.0,
+        retries: int = 2,
+        backoff: float = 0.5,
+        max_backoff: float = 10.0,
+        breaker: CircuitBreaker | None = None,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = httpx.Timeout(connect=connect_timeout, read=read_timeout, write=write_timeout, pool=pool_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.breaker = breaker or CircuitBreaker()
+        self._transport = transport
+        self._client: httpx.AsyncClient | None = None
+        self.in_flight = 0
+        self.requests = 0
+        self.retried = 0
+        self.failures = 0
+        self.rejected = 0
+
+    @classmethod
+    def from_settings(cls) -> "ModelsServiceClient":
+        return cls(
+            base_url=settings.MODELS_SERVICE_URL,
+            max_connections=settings.MODELS_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.MODELS_MAX_KEEPALIVE,
+            keepalive_expiry=settings.MODELS_KEEPALIVE_EXPIRY,
+            connect_timeout=settings.MODELS_CONNECT_TIMEOUT,
+            read_timeout=settings.MODELS_READ_TIMEOUT,
+            write_timeout=settings.MODELS_WRITE_TIMEOUT,
+            pool_timeout=settings.MODELS_POOL_TIMEOUT,
+            retries=settings.MODELS_RETRIES,
+            backoff=settings.MODELS_RETRY_BACKOFF,
+            breaker=CircuitBreaker(settings.MODELS_BREAKER_THRESHOLD, settings.MODELS_BREAKER_RESET),
+        )
+
+    def start(self) -> httpx.AsyncClient:
+        """
+        Open the connection pool. Called by the application lifespan; requests also open it on first use.
+        """
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url, limits=self.limits, timeout=self.timeout, transport=self._transport
+            )
+        return self._client
+
+    async def aclose(self):
+        """
+        Close the pooled connections. The client can be started again afterwards.
+        """
+        if self._client is not None:
+            client, self._client = self._client, None
+            await client.aclose()
+
+    async def predict_path(self, image_path: str) -> dict:
+        """
+        Detect the ingredients of an image on the volume shared with the models service.
+        """
+        return await self._post("/predict/path", json={"image_path": image_path})
+
+    async def predict_file(self, filename: str, data: bytes, content_type: str = "image/jpeg") -> dict:
+        """
+        Detect the ingredients of an uploaded image.
+        """
+        return await self._post("/predict", files={"file": (filename, data, content_type)})
+
+    async def _post(self, path: str, **kwargs) -> dict:
+        if not self.breaker.allow():
+            self.rejected += 1
+            raise ModelsServiceUnavailable("Models service circuit is open, failing fast")
+        client = self.start()
+        self.requests += 1
+        self.in_flight += 1
+        try:
+            for attempt in range(self.retries + 1):
+                retry_after = None
+                try:
+                    response = await client.post(path, **kwargs)
+                    if response.status_code not in self.RETRY_STATUSES:
+                        # 4xx answers come from a healthy service: they count as successes for the breaker
+                        self.breaker.record_success()
+                        response.raise_for_status()
+                        return response.json()
+                    error = f"HTTP {response.status_code}"
+                    retry_after = self._retry_after(response)
+                except httpx.TransportError as e:
+                    error = f"{type(e).__name__}: {e}"
+
+                if attempt == self.retries:
+                    break
+                self.retried += 1
+                delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+                await asyncio.sleep(max(delay, retry_after or 0))
+
+            self.failures += 1
+            self.breaker.record_failure()
+            raise ModelsServiceUnavailable(f"Models service failed after {self.retries + 1} attempts: {error}")
+        except asyncio.CancelledError:
+            self.breaker.release_probe()
+            raise
+        finally:
+            self.in_flight -= 1
+
+    def _retry_after(self, response: httpx.Response) -> float | None:
+        try:
+            return min(float(response.headers["Retry-After"]), self.max_backoff)
+        except (KeyError, ValueError):
+            return None
+
+    def stats(self) -> dict:
+        """
+        Pool and circuit breaker state, for the health endpoint.
+        """
+        return {
+            "base_url": self.base_url,
+            "pool": {
+                "open": self._client is not None,
+                "max_connections": self.limits.max_connections,
+                "max_keepalive_connections": self.limits.max_keepalive_connections,
+                "connections": self._connections(),
+                "in_flight": self.in_flight,
+            },
+            "requests": self.requests,
+            "retries": self.retried,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "circuit": self.breaker.snapshot(),
+        }
+
+    def _connections(self) -> int | None:
+        # httpx does not expose its pool: read the connection list of the default httpcore transport if present
+        pool = getattr(getattr(self._client, "_transport", None), "_pool", None)
+        connections = getattr(pool, "connections", None)
+        return len(connections) if connections is not None else None
+
+
+# Shared by every job; opened and closed by the application lifespan
+models_client = ModelsServiceClient.from_settings()
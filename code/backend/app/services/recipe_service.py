@@ -2,9 +2,12 @@ from sqlalchemy.orm import Session
 from fastapi import HTTPException, status, UploadFile
 from datetime import datetime
 from pathlib import Path
+import os
 import secrets
 import shutil
+from app.models.job_queue import JOB_TYPE_INGREDIENTS, JOB_TYPE_RECIPE
 from app.models.recipe import Recipe
+from app.services.job_events import notify_job_deleted
 
 
 UPLOAD_DIR = Path("uploads/recipes")
@@ -54,6 +57,10 @@ def delete_recipe(db: Session, recipe_id: int, user_id: int) -> None:
         if image_path.exists():
             image_path.unlink()
 
+    # Every API process drops the deleted jobs from its job status cache
+    for job_type, job in ((JOB_TYPE_INGREDIENTS, recipe.ingredients_job), (JOB_TYPE_RECIPE, recipe.recipe_job)):
+        if job is not None:
+            notify_job_deleted(db, job_type, job)
     db.delete(recipe)
     db.commit()
 
@@ -70,8 +77,11 @@ def upload_recipe_image(db: Session, recipe_id: int, user_id: int, file: UploadF
     random_name = f"{secrets.token_hex(16)}{file_extension}"
     file_path = UPLOAD_DIR / random_name
 
-    with file_path.open("wb") as buffer:
+    # Written under a temporary name, so the models service never reads a partial image
+    partial_path = file_path.with_name(f"{random_name}.part")
+    with partial_path.open("wb") as buffer:
         shutil.copyfileobj(file.file, buffer)
+    os.replace(partial_path, file_path)
 
     recipe.image = random_name
     db.commit()
@@ -0,0 +1,197 @@
+"""
+Worker process running the queued jobs (JOB_QUEUE_MODE=queue):
+
+    python -m app.worker
+
+Run as many workers as needed, on any node that reaches the database: jobs are claimed with
+SELECT ... FOR UPDATE SKIP LOCKED, so each job runs on a single worker at a time.
+"""
+import asyncio
+import json
+import os
+import signal
+import socket
+from typing import Awaitable, Callable
+from app.config.settings import settings
+from app.db.database import SessionLocal
+from app.models.job_queue import JOB_TYPE_INGREDIENTS, JOB_TYPE_RECIPE, JOB_TYPE_SPECULATIVE
+from app.services import job_queue
+from app.services.job_service import process_ingredients_async, process_recipe_async, process_speculative_recipe_async
+from app.services.models_client import models_client
+
+
+async def run_ingredients_job(job_id: int, payload: dict, final_attempt: bool):
+    await process_ingredients_async(job_id, final_attempt=final_attempt)
+
+
+async def run_recipe_job(job_id: int, payload: dict, final_attempt: bool):
+    await process_recipe_async(job_id, payload.get("ingredients"), final_attempt=final_attempt)
+
+
+async def run_speculative_job(job_id: int, payload: dict, final_attempt: bool):
+    await process_speculative_recipe_async(job_id, payload.get("ingredients", []), final_attempt=final_attempt)
+
+
+# Function running each job type: (job id, payload, final attempt), raising to request a retry
+HANDLERS = {
+    JOB_TYPE_INGREDIENTS: run_ingredients_job,
+    JOB_TYPE_RECIPE: run_recipe_job,
+    JOB_TYPE_SPECULATIVE: run_speculative_job,
+}
+
+
+class Worker:
+    """
+    Claims queued jobs and runs them, at most `concurrency[job_type]` at a time per job type.
+
+    The lease of a running job is renewed every third of the visibility timeout, so only the jobs of a worker that
+    died become claimable again. A failed attempt is retried after an exponential backoff; the last attempt marks
+    the job failed.
+    """
+
+    def __init__(
+        self,
+        concurrency: dict[str, int],
+        handlers: dict[str, Callable[[int, dict, bool], Awaitable]] = HANDLERS,
+        session_factory=SessionLocal,
+        poll_interval: float = 1.0,
+        visibility_timeout: float = 60.0,
+    ):
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.concurrency = concurrency
+        self.handlers = handlers
+        self.session_factory = session_factory
+        self.poll_interval = poll_interval
+        self.visibility_timeout = visibility_timeout
+        self._stopping = asyncio.Event()
+        self._running: set[asyncio.Task] = set()
+
+    def stop(self):
+        """
+        Stops claiming jobs; the running ones finish first.
+        """
+        self._stopping.set()
+
+    async def run(self):
+        print(f"[Worker {self.worker_id}] Started, concurrency {self.concurrency}")
+        pollers = [
+            asyncio.create_task(self._poll(job_type, limit))
+            for job_type, limit in self.concurrency.items() if limit > 0
+        ]
+        await asyncio.gather(*pollers)
+        if self._running:
+            print(f"[Worker {self.worker_id}] Waiting for {len(self._running)} running jobs")
+            await asyncio.gather(*self._running, return_exceptions=True)
+        print(f"[Worker {self.worker_id}] Stopped")
+
+    def _db_call(self, fn, *args):
+        """
+        Runs a job queue function with its own session, on a thread so the event loop keeps running jobs.
+        """
+        def call():
+            db = self.session_factory()
+            try:
+                return fn(db, *args)
+            finally:
+                db.close()
+        return asyncio.to_thread(call)
+
+    def _claim(self, db, job_type: str) -> dict | None:
+        """
+        Claims a job, returning what running it needs (read while the session is open).
+        """
+        entry = job_queue.claim_job(db, job_type, self.worker_id, self.visibility_timeout)
+        if entry is None:
+            return None
+        return {
+            "id": entry.id,
+            "job_id": entry.job_id,
+            "payload": json.loads(entry.payload) if entry.payload else {},
+            "attempts": entry.attempts,
+            "max_attempts": entry.max_attempts,
+        }
+
+    async def _poll(self, job_type: str, limit: int):
+        slots = asyncio.Semaphore(limit)
+        while not self._stopping.is_set():
+            await slots.acquire()
+            try:
+                entry = await self._db_call(self._claim, job_type)
+            except Exception as e:
+                print(f"[Worker {self.worker_id}] Cannot claim {job_type} jobs: {e}")
+                entry = None
+            if entry is None:
+                slots.release()
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            task = asyncio.create_task(self._execute(job_type, entry))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+            task.add_done_callback(lambda _: slots.release())
+
+    async def _execute(self, job_type: str, entry: dict):
+        lease = asyncio.create_task(self._renew_lease(entry["id"]))
+        try:
+            if entry["attempts"] > entry["max_attempts"]:
+                # Every attempt ended with its worker dying (lease expired): do not run it again
+                await self._db_call(job_queue.fail_job, entry["id"], job_type, entry["job_id"], "attempts exhausted")
+                return
+
+            final_attempt = entry["attempts"] >= entry["max_attempts"]
+            try:
+                await self.handlers[job_type](entry["job_id"], entry["payload"], final_attempt)
+            except Exception as e:
+                run_at = await self._db_call(job_queue.retry_job, entry["id"], self.worker_id, f"{type(e).__name__}: {e}")
+                if run_at is None:
+                    print(f"[Worker {self.worker_id}] {job_type} job {entry['job_id']} attempt {entry['attempts']} failed after its lease was lost")
+                    return
+                print(f"[Worker {self.worker_id}] {job_type} job {entry['job_id']} attempt {entry['attempts']} failed, retry at {run_at}")
+                return
+            if not await self._db_call(job_queue.complete_job, entry["id"], self.worker_id):
+                print(f"[Worker {self.worker_id}] {job_type} job {entry['job_id']} finished after its lease was lost")
+                return
+            print(f"[Worker {self.worker_id}] {job_type} job {entry['job_id']} done (attempt {entry['attempts']})")
+        except Exception as e:
+            # The queue could not be updated: the lease expires and the job is claimed again
+            print(f"[Worker {self.worker_id}] Cannot update {job_type} job {entry['job_id']}: {e}")
+        finally:
+            lease.cancel()
+
+    async def _renew_lease(self, entry_id: int):
+        while True:
+            await asyncio.sleep(self.visibility_timeout / 3)
+            try:
+                if not await self._db_call(job_queue.extend_lease, entry_id, self.worker_id, self.visibility_timeout):
+                    print(f"[Worker {self.worker_id}] Lost the lease of queue entry {entry_id}")
+                    return
+            except Exception as e:
+                print(f"[Worker {self.worker_id}] Cannot renew the lease of queue entry {entry_id}: {e}")
+
+
+async def main():
+    worker = Worker(
+        concurrency={
+            JOB_TYPE_INGREDIENTS: settings.WORKER_INGREDIENTS_CONCURRENCY,
+            JOB_TYPE_RECIPE: settings.WORKER_RECIPE_CONCURRENCY,
+            JOB_TYPE_SPECULATIVE: settings.WORKER_SPECULATIVE_CONCURRENCY,
+        },
+        poll_interval=settings.WORKER_POLL_INTERVAL,
+        visibility_timeout=settings.JOB_VISIBILITY_TIMEOUT,
+    )
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, worker.stop)
+
+    models_client.start()
+    try:
+        await worker.run()
+    finally:
+        await models_client.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -12,7 +12,8 @@ from app.db.database import Base
 from app.models.user import User, UserAuth
 from app.models.recipe import Recipe
 from app.models.category import Category
-from app.models.job import IngredientsJob, RecipeJob
+from app.models.job import IngredientsJob, RecipeJob, SpeculativeRecipe
+from app.models.job_queue import QueuedJob
 
 # Alembic Config object
 config = context.config
@@ -0,0 +1,52 @@
+"""Add job queue table
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table('job_queue',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('job_type', sa.String(length=20), nullable=False),
+        sa.Column('job_id', sa.Integer(), nullable=False),
+        sa.Column('payload', sa.Text(), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('max_attempts', sa.Integer(), nullable=False),
+        sa.Column('run_at', sa.DateTime(), nullable=False),
+        sa.Column('locked_until', sa.DateTime(), nullable=True),
+        sa.Column('locked_by', sa.String(length=255), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('job_type', 'job_id', name='uq_job_queue_job')
+    )
+    op.create_index(op.f('ix_job_queue_id'), 'job_queue', ['id'], unique=False)
+    op.create_index('ix_job_queue_claim', 'job_queue', ['job_type', 'run_at'], unique=False)
+
+    # Jobs left running by the in-process background tasks are queued, so the workers finish them
+    # (recipe jobs without a payload read their ingredients from the ingredients job)
+    op.execute("""
+        INSERT INTO job_queue (job_type, job_id, attempts, max_attempts, run_at, created_at)
+        SELECT 'ingredients', id, 0, 3, now() at time zone 'utc', start_time FROM ingredients_jobs WHERE status = 'running'
+    """)
+    op.execute("""
+        INSERT INTO job_queue (job_type, job_id, attempts, max_attempts, run_at, created_at)
+        SELECT 'recipe', id, 0, 3, now() at time zone 'utc', start_time FROM recipe_jobs WHERE status = 'running'
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_job_queue_claim', table_name='job_queue')
+    op.drop_index(op.f('ix_job_queue_id'), table_name='job_queue')
+    op.drop_table('job_queue')
@@ -0,0 +1,43 @@
+"""Add speculative recipes table
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Reuse the job status enum created with the jobs tables
+    jobstatus = postgresql.ENUM('running', 'completed', 'failed', name='jobstatus', create_type=False)
+    op.create_table('speculative_recipes',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('recipe_id', sa.Integer(), nullable=False),
+        sa.Column('fingerprint', sa.String(length=64), nullable=False),
+        sa.Column('status', jobstatus, nullable=False),
+        sa.Column('recipe_json', sa.Text(), nullable=True),
+        sa.Column('start_time', sa.DateTime(), nullable=False),
+        sa.Column('end_time', sa.DateTime(), nullable=True),
+        sa.Column('outcome', sa.String(length=20), nullable=True),
+        sa.Column('recipe_job_id', sa.Integer(), nullable=True),
+        sa.Column('saved_seconds', sa.Float(), nullable=True),
+        sa.ForeignKeyConstraint(['recipe_id'], ['recipes.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['recipe_job_id'], ['recipe_jobs.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('recipe_id')
+    )
+    op.create_index(op.f('ix_speculative_recipes_id'), 'speculative_recipes', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_speculative_recipes_id'), table_name='speculative_recipes')
+    op.drop_table('speculative_recipes')
@@ -0,0 +1,27 @@
+"""Unique ingredients job per recipe
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from alembic import op
+
+
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Keep the first job of a recipe created twice by concurrent requests
+    op.execute("""
+        DELETE FROM ingredients_jobs a USING ingredients_jobs b
+        WHERE a.recipe_id = b.recipe_id AND a.id > b.id
+    """)
+    op.create_unique_constraint('uq_ingredients_jobs_recipe_id', 'ingredients_jobs', ['recipe_id'])
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_ingredients_jobs_recipe_id', 'ingredients_jobs', type_='unique')
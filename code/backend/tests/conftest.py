@@ -21,8 +21,10 @@ from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
 from app.main import app
+from app.config.settings import settings
 from app.db.database import Base, get_db
 from app.models.user import User, UserAuth
+from app.services.job_cache import job_cache
 
 # In-memory SQLite database for testing
 SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
@@ -50,6 +52,23 @@ def db_session():
         Base.metadata.drop_all(bind=engine)
 
 
+@pytest.fixture(autouse=True)
+def queued_jobs(monkeypatch):
+    """
+    Jobs are queued, not run: no worker, models service or LLM is reached by the tests.
+    """
+    monkeypatch.setattr(settings, "JOB_QUEUE_MODE", "queue")
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """
+    Job states are cached per process: ids are reused by the next test's database.
+    """
+    yield
+    job_cache.clear()
+
+
 @pytest.fixture(scope="function")
 def client(db_session):
     """
@@ -0,0 +1,99 @@
+import pytest
+from fastapi.testclient import TestClient
+from app.models.job import IngredientsJob, JobStatus
+from app.models.job_queue import JOB_TYPE_INGREDIENTS, JOB_TYPE_RECIPE
+from app.services.job_cache import JobStatusCache, job_cache
+from app.services.job_events import event_broker, notify_job_event
+
+
+@pytest.fixture(autouse=True)
+def in_memory_events(monkeypatch):
+    # SQLite: events are published in memory, the cache is usable without LISTEN
+    monkeypatch.setattr(event_broker, "dsn", None)
+
+
+def state(job_id: int, status: str = "running", job_type: str = JOB_TYPE_INGREDIENTS) -> dict:
+    return {"type": job_type, "recipe_id": 1, "job": {"id": job_id, "status": status}}
+
+
+def test_cache_is_bounded_and_follows_events(monkeypatch):
+    cache = JobStatusCache(max_entries=2, ttl=60)
+    cache.put(JOB_TYPE_INGREDIENTS, 1, 10, state(1))
+    cache.put(JOB_TYPE_INGREDIENTS, 2, 10, state(2))
+    cache.get(JOB_TYPE_INGREDIENTS, 1)
+    cache.put(JOB_TYPE_RECIPE, 1, 10, state(1, job_type=JOB_TYPE_RECIPE))
+
+    # Least recently used evicted
+    assert cache.get(JOB_TYPE_INGREDIENTS, 2) is None
+    assert cache.stats()["evictions"] == 1
+
+    # Events update cached jobs only, keeping their owner
+    cache.on_event(state(1, "completed"))
+    cache.on_event(state(3, "completed"))
+    assert cache.get(JOB_TYPE_INGREDIENTS, 1) == (10, state(1, "completed"))
+    assert cache.get(JOB_TYPE_INGREDIENTS, 3) is None
+
+    # A state read before an event is not cached: it may predate the change
+    generation = cache.generation
+    cache.on_event(state(1, "failed"))
+    cache.put(JOB_TYPE_INGREDIENTS, 1, 10, state(1, "completed"), generation)
+    assert cache.get(JOB_TYPE_INGREDIENTS, 1)[1]["job"]["status"] == "failed"
+
+    # Missed events clear everything, entries expire
+    cache.on_event(None)
+    assert cache.stats()["entries"] == 0 and cache.stats()["approx_bytes"] == 0
+    cache.put(JOB_TYPE_INGREDIENTS, 1, 10, state(1))
+    monkeypatch.setattr("app.services.job_cache.time.monotonic", lambda: 10 ** 9)
+    assert cache.get(JOB_TYPE_INGREDIENTS, 1) is None
+
+
+def test_polls_are_served_from_cache(client: TestClient, auth_headers: dict, db_session):
+    recipe_id = client.post("/recipes", headers=auth_headers).json()["id"]
+    job = IngredientsJob(recipe_id=recipe_id, status=JobStatus.running)
+    db_session.add(job)
+    db_session.commit()
+
+    assert client.get(f"/jobs/ingredients/{job.id}", headers=auth_headers).json()["status"] == "running"
+    hits = job_cache.stats()["hits"]
+    assert client.get(f"/jobs/ingredients/{job.id}", headers=auth_headers).json()["status"] == "running"
+    assert job_cache.stats()["hits"] == hits + 1
+
+    # Committed changes are written through
+    job.status = JobStatus.completed
+    job.ingredients_json = '[{"name": "tomato"}]'
+    notify_job_event(db_session, JOB_TYPE_INGREDIENTS, job)
+    db_session.commit()
+    response = client.get(f"/jobs/ingredients/{job.id}", headers=auth_headers).json()
+    assert (response["status"], response["ingredients_json"]) == ("completed", '[{"name": "tomato"}]')
+    assert job_cache.stats()["hits"] == hits + 2
+
+    status_cache = client.get("/health/queue").json()["status_cache"]
+    assert status_cache["entries"] == 1 and status_cache["approx_bytes"] > 0
+
+
+def test_cached_job_requires_owner(client: TestClient, auth_headers: dict, db_session):
+    recipe_id = client.post("/recipes", headers=auth_headers).json()["id"]
+    job_id = client.post(f"/jobs/ingredients/{recipe_id}", headers=auth_headers).json()["id"]
+    assert job_cache.get(JOB_TYPE_INGREDIENTS, job_id) is not None
+
+    other = client.post("/auth/signup", json={"email": "other@example.com", "password": "otherpassword123", "full_name": "Other"})
+    other_headers = {"Authorization": f"Bearer {other.json()['access_token']}"}
+    response = client.get(f"/jobs/ingredients/{job_id}", headers=other_headers)
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Ingredients job not found"
+
+
+def test_deleted_recipe_jobs_are_dropped(client: TestClient, auth_headers: dict):
+    recipe_id = client.post("/recipes", headers=auth_headers).json()["id"]
+    job_id = client.post(f"/jobs/ingredients/{recipe_id}", headers=auth_headers).json()["id"]
+    events = []
+    event_broker.add_listener(events.append)
+    try:
+        assert client.delete(f"/recipes/{recipe_id}", headers=auth_headers).status_code == 204
+    finally:
+        event_broker._listeners.remove(events.append)
+
+    # Broadcast like any job event, so other processes drop it too
+    assert events == [{"type": JOB_TYPE_INGREDIENTS, "recipe_id": recipe_id, "job": {"id": job_id}, "deleted": True}]
+    assert job_cache.get(JOB_TYPE_INGREDIENTS, job_id) is None
+    assert client.get(f"/jobs/ingredients/{job_id}", headers=auth_headers).status_code == 404
@@ -0,0 +1,95 @@
+import asyncio
+import json
+import pytest
+from datetime import datetime
+from fastapi.testclient import TestClient
+from app.models.job import IngredientsJob, RecipeJob, JobStatus
+from app.models.job_queue import JOB_TYPE_INGREDIENTS, JOB_TYPE_RECIPE
+from app.services.job_events import event_broker, job_event, notify_job_event, recipe_event_stream
+
+
+@pytest.fixture(autouse=True)
+def in_memory_events(monkeypatch):
+    # SQLite: events are published in memory, there is no Postgres to LISTEN to
+    monkeypatch.setattr(event_broker, "dsn", None)
+
+
+def parse_events(body: str) -> list[tuple[str, dict]]:
+    events = []
+    for block in body.split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines() if line.startswith(("event", "data")))
+        if "event" in lines:
+            events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_stream_sends_snapshot_and_ends(client: TestClient, create_user, db_session):
+    _, _, token = create_user
+    recipe_id = client.post("/recipes", headers={"Authorization": f"Bearer {token}"}).json()["id"]
+    db_session.add(IngredientsJob(recipe_id=recipe_id, status=JobStatus.completed, ingredients_json="[]"))
+    db_session.add(RecipeJob(recipe_id=recipe_id, status=JobStatus.failed, end_time=datetime.utcnow()))
+    db_session.commit()
+
+    # EventSource cannot send headers: the token goes in the query string
+    response = client.get(f"/jobs/by-recipe/{recipe_id}/events?token={token}")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+
+    events = parse_events(response.text)
+    assert [name for name, _ in events] == ["ingredients", "recipe", "end"]
+    assert events[0][1]["status"] == "completed"
+    assert events[1][1]["status"] == "failed"
+    assert event_broker.stats()["streams"] == 0
+
+
+def test_stream_requires_owner(client: TestClient, auth_headers: dict):
+    recipe_id = client.post("/recipes", headers=auth_headers).json()["id"]
+
+    assert client.get(f"/jobs/by-recipe/{recipe_id}/events").status_code == 401
+    assert client.get(f"/jobs/by-recipe/{recipe_id}/events?token=invalid").status_code == 401
+    assert client.get(f"/jobs/by-recipe/{recipe_id + 1}/events", headers=auth_headers).status_code == 404
+    assert event_broker.stats()["streams"] == 0
+
+
+def test_committed_changes_are_streamed(client: TestClient, auth_headers: dict, db_session):
+    recipe_id = client.post("/recipes", headers=auth_headers).json()["id"]
+    job = IngredientsJob(recipe_id=recipe_id, status=JobStatus.running)
+    db_session.add(job)
+    db_session.commit()
+
+    async def run() -> list[tuple[str, dict]]:
+        queue = await event_broker.subscribe(recipe_id)
+        stream = recipe_event_stream(recipe_id, queue, [job_event(JOB_TYPE_INGREDIENTS, job)], heartbeat=0.05)
+        chunks = [await stream.__anext__() for _ in range(2)]
+
+        # A rolled back change is not published
+        job.status = JobStatus.failed
+        notify_job_event(db_session, JOB_TYPE_INGREDIENTS, job)
+        db_session.rollback()
+        chunks.append(await stream.__anext__())
+        assert chunks[-1] == ": keep-alive\n\n"
+
+        job.status = JobStatus.completed
+        job.ingredients_json = '[{"name": "tomato"}]'
+        notify_job_event(db_session, JOB_TYPE_INGREDIENTS, job)
+        recipe_job = RecipeJob(recipe_id=recipe_id, status=JobStatus.running)
+        db_session.add(recipe_job)
+        db_session.flush()
+        notify_job_event(db_session, JOB_TYPE_RECIPE, recipe_job)
+        db_session.commit()
+
+        recipe_job.status = JobStatus.completed
+        notify_job_event(db_session, JOB_TYPE_RECIPE, recipe_job)
+        db_session.commit()
+        return parse_events("".join(chunks + [chunk async for chunk in stream]))
+
+    events = asyncio.run(asyncio.wait_for(run(), timeout=10))
+    assert [(name, data.get("status")) for name, data in events] == [
+        ("ingredients", "running"),
+        ("ingredients", "completed"),
+        ("recipe", "running"),
+        ("recipe", "completed"),
+        ("end", None),
+    ]
+    assert events[1][1]["ingredients_json"] == '[{"name": "tomato"}]'
+    assert event_broker.stats()["streams"] == 0
@@ -0,0 +1,122 @@
+import asyncio
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+from app.models.job import IngredientsJob, JobStatus
+from app.models.job_queue import QueuedJob, JOB_TYPE_INGREDIENTS
+from app.models.recipe import Recipe
+from app.services import job_queue
+from app.worker import Worker
+from tests.conftest import TestingSessionLocal
+
+
+def create_job(db_session, create_user) -> IngredientsJob:
+    user, _, _ = create_user
+    recipe = Recipe(user_id=user.id, title="Untitled")
+    db_session.add(recipe)
+    db_session.flush()
+    job = IngredientsJob(recipe_id=recipe.id, status=JobStatus.running)
+    db_session.add(job)
+    db_session.flush()
+    job_queue.enqueue_job(db_session, JOB_TYPE_INGREDIENTS, job.id)
+    db_session.commit()
+    return job
+
+
+def test_create_job_enqueues(client: TestClient, auth_headers: dict, db_session):
+    recipe_id = client.post("/recipes", headers=auth_headers).json()["id"]
+    job_id = client.post(f"/jobs/ingredients/{recipe_id}", headers=auth_headers).json()["id"]
+
+    entry = db_session.query(QueuedJob).filter(QueuedJob.job_id == job_id).one()
+    assert entry.job_type == JOB_TYPE_INGREDIENTS
+    assert entry.attempts == 0
+
+    response = client.get("/health/queue")
+    assert response.status_code == 200
+    assert response.json()["queues"][JOB_TYPE_INGREDIENTS]["ready"] == 1
+
+
+def test_claim_lease_and_retry(db_session, create_user):
+    job = create_job(db_session, create_user)
+
+    entry = job_queue.claim_job(db_session, JOB_TYPE_INGREDIENTS, "worker-a", visibility_timeout=60)
+    assert (entry.job_id, entry.attempts, entry.locked_by) == (job.id, 1, "worker-a")
+    # Leased: invisible to other workers
+    assert job_queue.claim_job(db_session, JOB_TYPE_INGREDIENTS, "worker-b") is None
+    assert job_queue.queue_stats(db_session)[JOB_TYPE_INGREDIENTS]["running"] == 1
+
+    # A failed attempt is retried after the backoff
+    run_at = job_queue.retry_job(db_session, entry.id, "worker-a", "ConnectError")
+    assert run_at > datetime.utcnow()
+    assert job_queue.claim_job(db_session, JOB_TYPE_INGREDIENTS, "worker-b") is None
+    assert job_queue.queue_stats(db_session)[JOB_TYPE_INGREDIENTS]["delayed"] == 1
+
+    # The lease of a dead worker expires and another worker takes the job over
+    entry.run_at = datetime.utcnow() - timedelta(seconds=1)
+    db_session.commit()
+    assert job_queue.claim_job(db_session, JOB_TYPE_INGREDIENTS, "worker-a", visibility_timeout=60).attempts == 2
+    entry.locked_until = datetime.utcnow() - timedelta(seconds=1)
+    db_session.commit()
+    assert not job_queue.extend_lease(db_session, entry.id, "worker-b")
+    assert job_queue.claim_job(db_session, JOB_TYPE_INGREDIENTS, "worker-b").locked_by == "worker-b"
+    assert not job_queue.extend_lease(db_session, entry.id, "worker-a")
+
+    # The previous owner can no longer release or remove the entry
+    assert job_queue.retry_job(db_session, entry.id, "worker-a", "ReadTimeout") is None
+    assert not job_queue.complete_job(db_session, entry.id, "worker-a")
+    db_session.refresh(entry)
+    assert (entry.locked_by, entry.last_error) == ("worker-b", "ConnectError")
+
+    assert job_queue.complete_job(db_session, entry.id, "worker-b")
+    assert db_session.query(QueuedJob).count() == 0
+
+
+def test_worker_retries_then_completes(db_session, create_user, monkeypatch):
+    monkeypatch.setattr("app.config.settings.settings.JOB_RETRY_BACKOFF", 0.0)
+    job = create_job(db_session, create_user)
+    calls = []
+
+    async def flaky(job_id: int, payload: dict, final_attempt: bool):
+        calls.append((job_id, final_attempt))
+        if len(calls) == 1:
+            raise ConnectionError("models service down")
+        worker.stop()
+
+    worker = Worker(
+        concurrency={JOB_TYPE_INGREDIENTS: 2},
+        handlers={JOB_TYPE_INGREDIENTS: flaky},
+        session_factory=TestingSessionLocal,
+        poll_interval=0.01,
+    )
+    asyncio.run(asyncio.wait_for(worker.run(), timeout=10))
+
+    assert calls == [(job.id, False), (job.id, False)]
+    assert db_session.query(QueuedJob).count() == 0
+
+
+def test_exhausted_job_fails(db_session, create_user):
+    job = create_job(db_session, create_user)
+    entry = db_session.query(QueuedJob).one()
+    entry.attempts = entry.max_attempts
+
+    async def crash(job_id: int, payload: dict, final_attempt: bool):
+        raise AssertionError("must not run again")
+
+    worker = Worker(
+        concurrency={JOB_TYPE_INGREDIENTS: 1},
+        handlers={JOB_TYPE_INGREDIENTS: crash},
+        session_factory=TestingSessionLocal,
+        poll_interval=0.01,
+    )
+    db_session.commit()
+
+    async def run():
+        task = asyncio.create_task(worker.run())
+        while db_session.query(QueuedJob).count():
+            db_session.commit()
+            await asyncio.sleep(0.01)
+        worker.stop()
+        await task
+
+    asyncio.run(asyncio.wait_for(run(), timeout=10))
+    db_session.refresh(job)
+    assert job.status == JobStatus.failed
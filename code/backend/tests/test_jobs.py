@@ -1,6 +1,11 @@
 import pytest
+from concurrent.futures import ThreadPoolExecutor
 from fastapi.testclient import TestClient
 import time
+from app.models.job import IngredientsJob, JobStatus
+from app.models.job_queue import JOB_TYPE_INGREDIENTS
+from app.services.job_events import event_broker, notify_job_event
+from tests.conftest import TestingSessionLocal
 
 
 def test_create_ingredients_job(client: TestClient, auth_headers: dict):
@@ -59,3 +64,55 @@ def test_ingredients_job_isolation(client: TestClient, auth_headers: dict):
     # Other user should not be able to access this job
     response = client.get(f"/jobs/ingredients/{job_id}", headers=other_headers)
     assert response.status_code == 404
+
+
+def test_ingredients_job_etag(client: TestClient, auth_headers: dict):
+    recipe_id = client.post("/recipes", headers=auth_headers).json()["id"]
+    job_id = client.post(f"/jobs/ingredients/{recipe_id}", headers=auth_headers).json()["id"]
+
+    response = client.get(f"/jobs/ingredients/{job_id}", headers=auth_headers)
+    etag = response.headers["etag"]
+
+    unchanged = client.get(f"/jobs/ingredients/{job_id}", headers={**auth_headers, "If-None-Match": etag})
+    assert unchanged.status_code == 304
+    assert unchanged.content == b""
+    assert unchanged.headers["etag"] == etag
+
+    stale = client.get(f"/jobs/ingredients/{job_id}", headers={**auth_headers, "If-None-Match": '"stale"'})
+    assert stale.status_code == 200
+    assert stale.json() == response.json()
+
+
+def test_ingredients_job_long_poll(client: TestClient, auth_headers: dict, monkeypatch):
+    # SQLite: job events are published in memory
+    monkeypatch.setattr(event_broker, "dsn", None)
+    recipe_id = client.post("/recipes", headers=auth_headers).json()["id"]
+    job_id = client.post(f"/jobs/ingredients/{recipe_id}", headers=auth_headers).json()["id"]
+    etag = client.get(f"/jobs/ingredients/{job_id}", headers=auth_headers).headers["etag"]
+    headers = {**auth_headers, "If-None-Match": etag}
+
+    # Unchanged until the timeout
+    start = time.monotonic()
+    response = client.get(f"/jobs/ingredients/{job_id}?wait=0.2", headers=headers)
+    assert response.status_code == 304
+    assert time.monotonic() - start >= 0.2
+
+    # Answered as soon as the job changes
+    with ThreadPoolExecutor(1) as executor:
+        start = time.monotonic()
+        future = executor.submit(client.get, f"/jobs/ingredients/{job_id}?wait=10", headers=headers)
+        time.sleep(0.3)
+        db = TestingSessionLocal()
+        job = db.query(IngredientsJob).filter(IngredientsJob.id == job_id).one()
+        job.status = JobStatus.completed
+        job.ingredients_json = "[]"
+        notify_job_event(db, JOB_TYPE_INGREDIENTS, job)
+        db.commit()
+        db.close()
+        response = future.result(timeout=10)
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "completed"
+    assert response.headers["etag"] != etag
+    assert time.monotonic() - start < 5
+    assert event_broker.stats()["streams"] == 0
@@ -0,0 +1,84 @@
+import asyncio
+import httpx
+import pytest
+from app.services.models_client import ModelsServiceClient, ModelsServiceUnavailable, CircuitBreaker
+
+
+def make_client(handler, retries: int = 2, threshold: int = 2, reset: float = 60.0) -> ModelsServiceClient:
+    return ModelsServiceClient(
+        "http://models:8001",
+        retries=retries,
+        backoff=0.0,
+        breaker=CircuitBreaker(failure_threshold=threshold, reset_timeout=reset),
+        transport=httpx.MockTransport(handler),
+    )
+
+
+def test_retries_transient_errors():
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        if len(calls) == 1:
+            raise httpx.ConnectError("connection refused")
+        if len(calls) == 2:
+            return httpx.Response(503)
+        return httpx.Response(200, json={"ingredients": [{"name": "tomato", "confidence": 0.9}]})
+
+    client = make_client(handler)
+    result = asyncio.run(client.predict_path("uploads/recipes/a.jpg"))
+
+    assert result["ingredients"][0]["name"] == "tomato"
+    assert calls == ["/predict/path"] * 3
+    stats = client.stats()
+    assert stats["retries"] == 2
+    assert stats["circuit"]["state"] == "closed"
+
+
+def test_client_errors_are_not_retried():
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        return httpx.Response(400, json={"detail": "Invalid image"})
+
+    client = make_client(handler)
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(client.predict_file("a.jpg", b"not an image"))
+    assert len(calls) == 1
+    assert client.stats()["circuit"]["consecutive_failures"] == 0
+
+
+def test_circuit_opens_and_recovers():
+    healthy = False
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        if not healthy:
+            raise httpx.ConnectError("connection refused")
+        return httpx.Response(200, json={"ingredients": []})
+
+    client = make_client(handler, retries=0, threshold=2, reset=0.05)
+
+    async def scenario():
+        nonlocal healthy
+        for _ in range(2):
+            with pytest.raises(ModelsServiceUnavailable):
+                await client.predict_path("a.jpg")
+        assert client.breaker.state == CircuitBreaker.OPEN
+
+        # Open circuit: fails fast without calling the service
+        with pytest.raises(ModelsServiceUnavailable):
+            await client.predict_path("a.jpg")
+        assert len(calls) == 2
+
+        # After the reset timeout a probe goes through and closes the circuit
+        healthy = True
+        await asyncio.sleep(0.06)
+        assert await client.predict_path("a.jpg") == {"ingredients": []}
+        assert client.breaker.state == CircuitBreaker.CLOSED
+        await client.aclose()
+
+    asyncio.run(scenario())
+    assert client.stats()["rejected"] == 1
@@ -77,6 +77,22 @@ def test_upload_recipe_image(client: TestClient, auth_headers: dict):
     assert data["image"].endswith(".jpg")
 
 
+def test_upload_starts_detection(client: TestClient, auth_headers: dict):
+    recipe_id = client.post("/recipes", headers=auth_headers).json()["id"]
+    files = {"file": ("test.jpg", BytesIO(b"fake image content"), "image/jpeg")}
+
+    response = client.post(f"/recipes/{recipe_id}/upload?detect=true", files=files, headers=auth_headers)
+    assert response.status_code == 200
+    job = response.json()["ingredients_job"]
+    assert (job["recipe_id"], job["status"]) == (recipe_id, "running")
+
+    # Idempotent: a retried upload returns the same job, the explicit job creation still reports it exists
+    files = {"file": ("test.jpg", BytesIO(b"fake image content"), "image/jpeg")}
+    retry = client.post(f"/recipes/{recipe_id}/upload?detect=true", files=files, headers=auth_headers)
+    assert retry.json()["ingredients_job"]["id"] == job["id"]
+    assert client.post(f"/jobs/ingredients/{recipe_id}", headers=auth_headers).status_code == 400
+
+
 def test_recipe_isolation_between_users(client: TestClient, auth_headers: dict):
     response1 = client.post("/recipes", headers=auth_headers)
     recipe_id = response1.json()["id"]
@@ -0,0 +1,89 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+from app.models.job import IngredientsJob, RecipeJob, JobStatus, SpeculativeRecipe
+from app.models.job_queue import QueuedJob, JOB_TYPE_RECIPE, JOB_TYPE_SPECULATIVE
+from app.models.recipe import Recipe
+from app.services import job_service
+from tests.conftest import TestingSessionLocal
+
+DETECTED = [{"name": "tomato", "confidence": 0.9}, {"name": "onion", "confidence": 0.8}]
+
+
+def detected_recipe(client: TestClient, auth_headers: dict, db_session) -> int:
+    recipe_id = client.post("/recipes", headers=auth_headers).json()["id"]
+    db_session.add(IngredientsJob(recipe_id=recipe_id, status=JobStatus.completed, ingredients_json=json.dumps(DETECTED)))
+    db_session.commit()
+    return recipe_id
+
+
+def test_fingerprint_ignores_order_case_and_confidence():
+    assert job_service.ingredients_fingerprint(DETECTED) == job_service.ingredients_fingerprint(
+        [{"name": "Onion "}, {"name": "TOMATO", "confidence": None}, {"name": "tomato"}]
+    )
+    assert job_service.ingredients_fingerprint(DETECTED) != job_service.ingredients_fingerprint(DETECTED[:1])
+
+
+def test_completed_speculation_is_adopted(client: TestClient, auth_headers: dict, db_session):
+    recipe_id = detected_recipe(client, auth_headers, db_session)
+    start = datetime.utcnow() - timedelta(seconds=10)
+    db_session.add(SpeculativeRecipe(
+        recipe_id=recipe_id,
+        fingerprint=job_service.ingredients_fingerprint(DETECTED),
+        status=JobStatus.completed,
+        recipe_json=json.dumps({"title": "Tomato soup"}),
+        start_time=start,
+        end_time=start + timedelta(seconds=4),
+    ))
+    db_session.commit()
+
+    response = client.post(f"/jobs/recipe/{recipe_id}", headers=auth_headers, json={"ingredients": [{"name": "Onion"}, {"name": "tomato"}]})
+    assert response.status_code == 201
+    assert response.json()["status"] == "completed"
+    assert json.loads(response.json()["recipe_json"]) == {"title": "Tomato soup"}
+    # Nothing left to generate
+    assert db_session.query(QueuedJob).filter(QueuedJob.job_type == JOB_TYPE_RECIPE).count() == 0
+    assert db_session.query(Recipe).filter(Recipe.id == recipe_id).one().title == "Tomato soup"
+
+    speculation = client.get("/health/queue").json()["speculation"]
+    assert (speculation["adopted"], speculation["hit_rate"], speculation["saved_seconds_total"]) == (1, 1.0, 4.0)
+
+
+def test_edited_ingredients_discard_speculation(client: TestClient, auth_headers: dict, db_session):
+    recipe_id = detected_recipe(client, auth_headers, db_session)
+    speculation = job_service.start_speculation(db_session, recipe_id, DETECTED)
+    db_session.commit()
+    assert db_session.query(QueuedJob).filter(QueuedJob.job_type == JOB_TYPE_SPECULATIVE).count() == 1
+
+    response = client.post(f"/jobs/recipe/{recipe_id}", headers=auth_headers, json={"ingredients": [{"name": "tomato"}]})
+    assert response.json()["status"] == "running"
+
+    # The speculative generation never runs, the recipe job is generated from the edited ingredients
+    assert db_session.query(QueuedJob).filter(QueuedJob.job_type == JOB_TYPE_SPECULATIVE).count() == 0
+    assert db_session.query(QueuedJob).filter(QueuedJob.job_type == JOB_TYPE_RECIPE).count() == 1
+    db_session.refresh(speculation)
+    assert speculation.outcome == "discarded"
+    assert client.get("/health/queue").json()["speculation"]["hit_rate"] == 0.0
+
+
+def test_running_speculation_completes_adopted_job(client: TestClient, auth_headers: dict, db_session, monkeypatch):
+    recipe_id = detected_recipe(client, auth_headers, db_session)
+    speculation = job_service.start_speculation(db_session, recipe_id, DETECTED)
+    db_session.commit()
+
+    response = client.post(f"/jobs/recipe/{recipe_id}", headers=auth_headers, json={"ingredients": DETECTED})
+    assert response.json()["status"] == "running"
+    assert db_session.query(QueuedJob).filter(QueuedJob.job_type == JOB_TYPE_RECIPE).count() == 0
+
+    async def generate(names: list[str]) -> dict:
+        return {"title": "Soup", "ingredients": names}
+
+    monkeypatch.setattr("app.services.job_service.generate_recipe_from_ingredients", generate)
+    monkeypatch.setattr("app.db.database.SessionLocal", TestingSessionLocal)
+    asyncio.run(job_service.process_speculative_recipe_async(speculation.id, DETECTED))
+
+    job = db_session.query(RecipeJob).filter(RecipeJob.id == response.json()["id"]).one()
+    db_session.refresh(job)
+    assert job.status == JobStatus.completed
+    assert json.loads(job.recipe_json)["title"] == "Soup"
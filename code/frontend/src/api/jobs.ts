@@ -25,6 +25,12 @@ export interface RecipeJobs {
   recipe_job: RecipeJob | null;
 }
 
+export interface RecipeJobsHandlers {
+  onIngredientsJob?: (job: IngredientsJob) => void;
+  onRecipeJob?: (job: RecipeJob) => void;
+  onError?: () => void;
+}
+
 const jobsApi = {
   createIngredientsJob: async (recipeId: number, token: string): Promise<IngredientsJob> => {
     const response = await axios.post(`${API_URL}/jobs/ingredients/${recipeId}`, {}, {
@@ -73,6 +79,28 @@ const jobsApi = {
     });
     return response.data;
   },
+
+  // Server-Sent Events of a recipe's jobs: their current state, then every change as it is committed.
+  // Returns a function closing the stream.
+  subscribeToRecipeJobs: (recipeId: number, token: string, handlers: RecipeJobsHandlers): (() => void) => {
+    // EventSource cannot send headers: the token goes in the query string
+    const source = new EventSource(`${API_URL}/jobs/by-recipe/${recipeId}/events?token=${encodeURIComponent(token)}`);
+
+    source.addEventListener('ingredients', (event) => {
+      handlers.onIngredientsJob?.(JSON.parse((event as MessageEvent).data));
+    });
+    source.addEventListener('recipe', (event) => {
+      handlers.onRecipeJob?.(JSON.parse((event as MessageEvent).data));
+    });
+    // The jobs cannot change any more: close instead of letting the browser reconnect
+    source.addEventListener('end', () => source.close());
+    source.onerror = () => {
+      // Dropped connections are reconnected by the browser; a closed source was refused (401/404)
+      if (source.readyState === EventSource.CLOSED) handlers.onError?.();
+    };
+
+    return () => source.close();
+  },
 };
 
 export default jobsApi;
@@ -1,4 +1,5 @@
 import axios from 'axios';
+import { IngredientsJob } from './jobs';
 
 const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000';
 
@@ -11,6 +12,11 @@ export interface Recipe {
   created_at: string;
 }
 
+export interface RecipeUpload extends Recipe {
+  // Set when the upload also started ingredient detection
+  ingredients_job: IngredientsJob | null;
+}
+
 export interface UpdateRecipeTitleRequest {
   title: string;
 }
@@ -57,11 +63,13 @@ const recipesApi = {
     return response.data;
   },
 
-  uploadImage: async (recipeId: number, file: File, token: string): Promise<Recipe> => {
+  // With detect, the upload also starts ingredient detection (no separate job request)
+  uploadImage: async (recipeId: number, file: File, token: string, detect = false): Promise<RecipeUpload> => {
     const formData = new FormData();
     formData.append('file', file);
 
     const response = await axios.post(`${API_URL}/recipes/${recipeId}/upload`, formData, {
+      params: detect ? { detect: true } : {},
       headers: {
         Authorization: `Bearer ${token}`,
         'Content-Type': 'multipart/form-data',
@@ -45,23 +45,18 @@ export const ImageUpload = ({ token, onJobComplete, onRecipeCreated }: ImageUplo
     },
   });
 
+  // The upload starts ingredient detection too
   const uploadImageMutation = useMutation({
     mutationFn: ({ recipeId, file }: { recipeId: number; file: File }) =>
-      recipesApi.uploadImage(recipeId, file, token),
-    onError: () => {
-      toast.error("Failed to upload image");
-      setIsProcessing(false);
-    },
-  });
-
-  const createJobMutation = useMutation({
-    mutationFn: (recipeId: number) => jobsApi.createIngredientsJob(recipeId, token),
-    onSuccess: (job) => {
-      setCurrentJob(job);
-      setIsProcessing(true);
+      recipesApi.uploadImage(recipeId, file, token, true),
+    onSuccess: (recipe) => {
+      if (recipe.ingredients_job) {
+        setCurrentJob(recipe.ingredients_job);
+        setIsProcessing(true);
+      }
     },
     onError: () => {
-      toast.error("Failed to start ML job");
+      toast.error("Failed to upload image");
       setIsProcessing(false);
     },
   });
@@ -77,32 +72,28 @@ export const ImageUpload = ({ token, onJobComplete, onRecipeCreated }: ImageUplo
     return () => clearInterval(interval);
   }, [isProcessing]);
 
-  // Polling for job status
+  // Job status pushed by the server as soon as it changes
   useEffect(() => {
     if (!currentJob || !isProcessing) return;
 
-    const pollInterval = setInterval(async () => {
-      try {
-        const job = await jobsApi.getIngredientsJob(currentJob.id, token);
+    const close = jobsApi.subscribeToRecipeJobs(currentJob.recipe_id, token, {
+      onIngredientsJob: (job) => {
+        if (job.status === 'running') return;
+        close();
         setCurrentJob(job);
+        setIsProcessing(false);
 
-        if (job.status !== 'running') {
-          setIsProcessing(false);
-          clearInterval(pollInterval);
-
-          if (job.status === 'completed') {
-            toast.success("Ingredients detected successfully!");
-            onJobComplete?.(job);
-          } else if (job.status === 'failed') {
-            toast.error("Failed to detect ingredients");
-          }
+        if (job.status === 'completed') {
+          toast.success("Ingredients detected successfully!");
+          onJobComplete?.(job);
+        } else if (job.status === 'failed') {
+          toast.error("Failed to detect ingredients");
         }
-      } catch (error) {
-        console.error("Polling error:", error);
-      }
-    }, 1000);
+      },
+      onError: () => console.error("Job status stream closed"),
+    });
 
-    return () => clearInterval(pollInterval);
+    return close;
   }, [currentJob, isProcessing, token, onJobComplete]);
 
   const handleFileSelect = (e: React.ChangeEvent<HTMLInputElement>) => {
@@ -123,12 +114,9 @@ export const ImageUpload = ({ token, onJobComplete, onRecipeCreated }: ImageUplo
     // Create recipe
     const recipe = await createRecipeMutation.mutateAsync();
 
-    // Upload image
+    // Upload image and start ML job
     await uploadImageMutation.mutateAsync({ recipeId: recipe.id, file: selectedFile });
 
-    // Start ML job
-    await createJobMutation.mutateAsync(recipe.id);
-
     // Clear file input
     if (fileInputRef.current) {
       fileInputRef.current.value = '';
@@ -238,10 +226,10 @@ export const ImageUpload = ({ token, onJobComplete, onRecipeCreated }: ImageUplo
             </Button>
             <Button
               onClick={handleConfirmUpload}
-              disabled={createRecipeMutation.isPending || uploadImageMutation.isPending || createJobMutation.isPending}
+              disabled={createRecipeMutation.isPending || uploadImageMutation.isPending}
             >
               <Check className="h-4 w-4 mr-2" />
-              {createRecipeMutation.isPending || uploadImageMutation.isPending || createJobMutation.isPending
+              {createRecipeMutation.isPending || uploadImageMutation.isPending
                 ? "Uploading..."
                 : "Start Detection"}
             </Button>
@@ -86,43 +86,34 @@ export const RecipeDetail = ({ recipe, token }: RecipeDetailProps) => {
 
   const queryClient = useQueryClient();
 
-  // Polling for recipe job status
+  // Recipe job status pushed by the server as soon as it changes
   useEffect(() => {
-    if (!recipeJobId || !isGeneratingRecipe) return;
+    const recipeId = recipe?.id;
+    if (!recipeJobId || !isGeneratingRecipe || !recipeId) return;
 
-    let pollInterval: NodeJS.Timeout;
+    const close = jobsApi.subscribeToRecipeJobs(recipeId, token, {
+      onRecipeJob: async (job) => {
+        if (job.id !== recipeJobId || job.status === 'running') return;
+        close();
+        setIsGeneratingRecipe(false);
 
-    const poll = async () => {
-      try {
-        const job = await jobsApi.getRecipeJob(recipeJobId, token);
-
-        if (job.status !== 'running') {
-          setIsGeneratingRecipe(false);
-          if (pollInterval) clearInterval(pollInterval);
-
-          if (job.status === 'completed') {
-            // Invalidate query to refetch jobs data and show the recipe
-            await queryClient.invalidateQueries({ queryKey: ["recipe-jobs", recipe?.id] });
-            // Also invalidate recipes list to update sidebar with new title
-            await queryClient.invalidateQueries({ queryKey: ["recipes"] });
-            toast.success("Recipe generated successfully!");
-          } else if (job.status === 'failed') {
-            toast.error("Failed to generate recipe");
-          }
+        if (job.status === 'completed') {
+          // Invalidate query to refetch jobs data and show the recipe
+          await queryClient.invalidateQueries({ queryKey: ["recipe-jobs", recipeId] });
+          // Also invalidate recipes list to update sidebar with new title
+          await queryClient.invalidateQueries({ queryKey: ["recipes"] });
+          toast.success("Recipe generated successfully!");
+        } else if (job.status === 'failed') {
+          toast.error("Failed to generate recipe");
         }
-      } catch (error) {
-        console.error("Polling error:", error);
-        if (pollInterval) clearInterval(pollInterval);
+      },
+      onError: () => {
         setIsGeneratingRecipe(false);
         toast.error("Error checking recipe status");
-      }
-    };
-
-    pollInterval = setInterval(poll, 1000);
+      },
+    });
 
-    return () => {
-      if (pollInterval) clearInterval(pollInterval);
-    };
+    return close;
   }, [recipeJobId, isGeneratingRecipe, token, queryClient, recipe?.id]);
 
   if (!recipe) {
@@ -3,12 +3,20 @@ FastAPI application for the Models Service.
 Provides ingredient detection as a microservice.
 """
 import sys
+import asyncio
+import hmac
+import json
 import logging
-import shutil
 import os
+import time
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from pathlib import Path
-from fastapi import FastAPI, HTTPException, status, UploadFile, File
+from fastapi import FastAPI, HTTPException, status, UploadFile, File, Form, Request, Response, Query, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
 # Add yolo directory to path for imports
@@ -16,7 +24,27 @@ yolo_path = Path(__file__).parent / "yolo"
 if str(yolo_path) not in sys.path:
     sys.path.insert(0, str(yolo_path))
 
-from detector import detect_ingredients  # type: ignore
+from detector import (  # type: ignore
+    detect_ingredients_with_paths, select_ingredients, get_active_version, warmup, registry, registry_stats, init_replica,
+    discover_versions, load_version, switch_version, unload_version, CONFIG_PATH
+)
+from inference_config import load_inference_config, reload_inference_config, ENGINE_ONNXRUNTIME  # type: ignore
+from image_io import decode_image  # type: ignore
+from batching import BatchScheduler  # type: ignore
+from result_cache import DetectionCache, cache_namespace, content_key, dhash  # type: ignore
+from admission import AdmissionController, AdmissionRejected  # type: ignore
+from shared_volume import read_shared_file  # type: ignore
+from replica_pool import ReplicaPool  # type: ignore
+from single_flight import SingleFlight  # type: ignore
+from stage_timing import StageStats, add_observer, timed, STAGE_UPLOAD_READ, STAGE_DECODE  # type: ignore
+from serving_settings import settings, available_cpus  # type: ignore
+from startup import StartupTimeline  # type: ignore
+import metrics  # type: ignore
+
+# Process age at each start-up milestone, reported by /ready.
+# Engine modules (torch, ultralytics, onnxruntime) are not imported yet: the model load imports the selected one.
+startup_timeline = StartupTimeline()
+startup_timeline.mark("imports")
 
 # Configure logging
 logging.basicConfig(
@@ -25,11 +53,172 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+def replica_engine_modules() -> tuple[str, ...]:
+    """Engine module of the configured engine, when importing it needs no torch (unsafe to import before forking)."""
+    return ("onnx_engine",) if load_inference_config(CONFIG_PATH).engine == ENGINE_ONNXRUNTIME else ()
+
+
+if settings.inference_replicas:
+    # Inference worker processes, each with its own model and its share of the CPUs.
+    # Their stage timings and detection metrics are shipped back with every batch.
+    replica_pool = ReplicaPool(
+        settings.inference_replicas,
+        initializer=init_replica,
+        initargs=(max(1, available_cpus() // settings.inference_replicas), settings.model_dir or None),
+        collect_events=metrics.drain,
+        on_events=metrics.replay,
+        # Imported once by the fork server rather than by every replica
+        preload=("detector", "metrics", *replica_engine_modules()),
+    )
+    inference_executor = replica_pool
+    concurrent_batches = settings.inference_replicas
+else:
+    # Bounded pool running the blocking forward passes, so the event loop (and /health) stays responsive
+    replica_pool = None
+    inference_executor = ThreadPoolExecutor(
+        max_workers=settings.inference_workers,
+        thread_name_prefix="inference"
+    )
+    concurrent_batches = settings.inference_workers
+
+# Groups concurrent requests into a single forward pass.
+# Results always carry boxes; per-request options (top_k, include_boxes) are applied afterwards.
+# Every image gets an (ingredients, inference path) tuple.
+batch_scheduler = BatchScheduler(
+    run_batch=partial(detect_ingredients_with_paths, include_boxes=True),
+    max_batch_size=settings.batch_max_size,
+    max_wait_ms=settings.batch_max_wait_ms,
+    executor=inference_executor,
+    max_concurrent_batches=concurrent_batches,
+)
+
+# Detection results of already seen images (exact bytes, optionally near-duplicates)
+result_cache = DetectionCache(
+    max_entries=settings.cache_max_entries,
+    near_duplicate_distance=settings.cache_near_duplicate_distance,
+    persist_path=settings.cache_persist_path or None,
+)
+
+# Concurrent requests for the same image and model version share one in-flight detection
+single_flight = SingleFlight()
+
+# Time spent in every stage of the predictions, reported by /stats
+stage_stats = StageStats()
+add_observer(stage_stats)
+
+# Caps in-flight predictions and sheds the excess with 429
+admission = AdmissionController(
+    max_in_flight=settings.max_in_flight,
+    max_queue=settings.max_queue,
+    queue_timeout_ms=settings.admission_timeout_ms,
+    retry_after_s=settings.retry_after_s,
+)
+
+
+# Readiness state, set once the model is loaded and warmed up
+readiness = {
+    "ready": False,
+    "error": None,
+    "model_version": None,
+    "model_load_seconds": None,
+    "warmup_seconds": None,
+    "startup_seconds": startup_timeline.as_dict()
+}
+
+
+def warmup_options() -> dict:
+    """Warmup passes run on every model version before it serves requests."""
+    return {
+        "runs": settings.warmup_runs,
+        "image_sizes": list(settings.warmup_sizes) or None,
+        "batch_sizes": sorted({1, settings.batch_max_size})
+    }
+
+
+async def on_every_model(fn, *args, rolling: bool = False, **kwargs) -> list:
+    """
+    Run a model management function (warmup, load, switch, unload) wherever models live:
+    in every inference replica, or on a worker thread of this process.
+
+    Args:
+        fn: Picklable module-level function
+        rolling: Run on one replica at a time, so the others keep serving batches (for slow loads)
+
+    Returns:
+        list: One result per replica (a single one without replicas)
+    """
+    if replica_pool is None:
+        return [await asyncio.to_thread(fn, *args, **kwargs)]
+    if rolling:
+        return [await asyncio.wrap_future(replica_pool.submit_to(index, fn, *args, **kwargs)) for index in range(len(replica_pool))]
+    return list(await asyncio.gather(*(asyncio.wrap_future(f) for f in replica_pool.broadcast(fn, *args, **kwargs))))
+
+
+def slowest(results: list[dict]) -> dict:
+    """Merge the load and warmup times of every replica, keeping the slowest one."""
+    return {
+        "model_load_seconds": max(result["model_load_seconds"] for result in results),
+        "warmup_seconds": {size: max(result["warmup_seconds"][size] for result in results) for size in results[0]["warmup_seconds"]}
+    }
+
+
+async def load_and_warmup():
+    """Load the model and run the warmup passes (in every replica), then preload the MODEL_PRELOAD versions."""
+    try:
+        # This process only tracks versions (cache namespaces, /models); with replicas it never loads a model
+        discover_versions(settings.model_dir or None)
+        result = slowest(await on_every_model(warmup, **warmup_options()))
+        readiness.update(result)
+        readiness["model_version"] = get_active_version().name
+        time_to_ready = startup_timeline.mark("ready")
+        readiness["startup_seconds"] = startup_timeline.as_dict()
+        readiness["ready"] = True
+        metrics.MODEL_LOAD_SECONDS.set(result["model_load_seconds"])
+        metrics.WARMUP_SECONDS.set(sum(result["warmup_seconds"].values()))
+        metrics.TIME_TO_READY_SECONDS.set(time_to_ready)
+        metrics.READY.set(1)
+        logger.info(
+            f"Models service ready {time_to_ready:.2f}s after process start "
+            f"(imports {startup_timeline.as_dict()['imports']:.2f}s, model loaded in {result['model_load_seconds']:.2f}s)"
+        )
+    except Exception as e:
+        readiness["error"] = str(e)
+        logger.error(f"Model warmup failed: {str(e)}", exc_info=True)
+        return
+
+    # Candidate versions load off the inference threads, so they do not delay predictions
+    for name in settings.model_preload:
+        try:
+            await on_every_model(load_version, name, rolling=True, **warmup_options())
+        except Exception as e:
+            logger.error(f"Preloading model version {name} failed: {str(e)}", exc_info=True)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Start the batch scheduler and load and warm up the model eagerly.
+    The warmup runs in the background so /health answers meanwhile; /ready reports when it is done.
+    """
+    # Parse the inference configuration once, failing fast if it is invalid
+    load_inference_config(CONFIG_PATH)
+    metrics.install()
+    await batch_scheduler.start()
+    startup_timeline.mark("serving")
+    warmup_task = asyncio.create_task(load_and_warmup())
+    yield
+    warmup_task.cancel()
+    await batch_scheduler.stop()
+    inference_executor.shutdown(wait=False, cancel_futures=True)
+    metrics.uninstall()
+
+
 # Create FastAPI app
 app = FastAPI(
     title="Recipe Suggester - Models Service",
     description="Ingredient detection service using YOLO",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -42,6 +231,20 @@ app.add_middleware(
 )
 
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Count requests and time them per route template, for /metrics."""
+    start = time.perf_counter()
+    status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        metrics.observe_request(request.method, route.path if route is not None else "unmatched", status_code, time.perf_counter() - start)
+
+
 # Request/Response models
 class PredictRequest(BaseModel):
     """Request model for ingredient detection."""
@@ -56,15 +259,18 @@ class PredictRequest(BaseModel):
 
 
 class Ingredient(BaseModel):
-    """Ingredient model with name and confidence."""
+    """Ingredient model with name, confidence and, on request, the box of its best detection."""
     name: str
     confidence: float
+    box: list[float] | None = None
 
 
 class PredictResponse(BaseModel):
     """Response model for ingredient detection."""
     ingredients: list[Ingredient]
     count: int
+    inference_path: str | None = None
+    model_version: str | None = None
 
     class Config:
         json_schema_extra = {
@@ -73,7 +279,9 @@ class PredictResponse(BaseModel):
                     {"name": "Tomato", "confidence": 0.95},
                     {"name": "Lettuce", "confidence": 0.87}
                 ],
-                "count": 2
+                "count": 2,
+                "inference_path": "low_res",
+                "model_version": "yolo_best.onnx"
             }
         }
 
@@ -87,7 +295,13 @@ async def root():
         "status": "running",
         "endpoints": {
             "health": "/health",
-            "predict": "/predict"
+            "ready": "/ready",
+            "predict": "/predict",
+            "predict_path": "/predict/path",
+            "predict_batch": "/predict/batch",
+            "stats": "/stats",
+            "metrics": "/metrics",
+            "models": "/models"
         }
     }
 
@@ -101,59 +315,551 @@ async def health_check():
     }
 
 
-@app.post("/predict", response_model=PredictResponse, status_code=status.HTTP_200_OK)
-async def predict(file: UploadFile = File(...)):
+@app.get("/ready", status_code=status.HTTP_200_OK)
+async def ready_check(response: Response):
+    """
+    Readiness endpoint: 200 only once the model is loaded and warmed up, 503 before.
+    Orchestration should gate traffic on this endpoint rather than on /health.
+    """
+    if not readiness["ready"]:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return {
+        "status": "ready" if readiness["ready"] else "warming_up",
+        "service": "models",
+        **readiness
+    }
+
+
+@app.get("/stats", status_code=status.HTTP_200_OK)
+async def stats():
+    """Serving metrics (batch sizes, wait times, queue depths, rejections, cache hits and stage timings) used for tuning."""
+    return {
+        "batching": batch_scheduler.stats(),
+        "admission": admission.stats(),
+        "cache": result_cache.stats(),
+        "single_flight": single_flight.stats(),
+        "stages": stage_stats.stats(),
+        "replicas": replica_pool.stats() if replica_pool is not None else None
+    }
+
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus metrics: per-route requests and latencies, stage timings, detections per image, model load time and RSS."""
+    if replica_pool is not None:
+        metrics.observe_replicas(replica_pool.stats()["replicas"])
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
+
+# Bearer token of the admin endpoints, checked by require_admin
+admin_bearer = HTTPBearer(auto_error=False)
+
+
+def require_admin(credentials: HTTPAuthorizationCredentials | None = Depends(admin_bearer)):
+    """
+    Guard of the endpoints changing what the service serves (inference configuration, model versions):
+    they need the ADMIN_TOKEN bearer token, and are disabled while no token is configured.
+
+    Raises:
+        HTTPException: If no admin token is configured (403) or the request does not carry it (401)
+    """
+    if not settings.admin_token:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin endpoints are disabled: set ADMIN_TOKEN to enable them"
+        )
+    if credentials is None or not hmac.compare_digest(credentials.credentials.encode(), settings.admin_token.encode()):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid admin token",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+
+
+@app.post("/config/reload", status_code=status.HTTP_200_OK, dependencies=[Depends(require_admin)])
+async def reload_config():
+    """
+    Reload the inference configuration from disk.
+
+    The configuration is also reloaded automatically when the file's mtime changes.
+    """
+    try:
+        config = reload_inference_config(CONFIG_PATH)
+    except (OSError, ValueError) as e:
+        logger.error(f"Inference config reload failed: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid inference configuration, keeping the previous one: {str(e)}"
+        )
+    return {
+        "status": "reloaded",
+        "config": config.to_dict()
+    }
+
+
+@app.get("/models", status_code=status.HTTP_200_OK)
+async def list_models():
+    """Registered model versions, whether they are loaded, and the active one."""
+    await on_every_model(discover_versions, settings.model_dir or None)
+    if replica_pool is None:
+        return registry_stats()
+
+    # Models live in the replicas: a version is loaded once every replica has loaded it
+    discover_versions(settings.model_dir or None)
+    stats = registry_stats()
+    replica_stats = await on_every_model(registry_stats)
+    for name, version in stats["versions"].items():
+        version["loaded_replicas"] = sum(name in r["versions"] and r["versions"][name]["loaded"] for r in replica_stats)
+        version["loaded"] = version["loaded_replicas"] == len(replica_stats)
+    return stats
+
+
+@app.post("/models/{name}/load", status_code=status.HTTP_200_OK, dependencies=[Depends(require_admin)])
+async def load_model(name: str):
+    """
+    Load and warm up a model version without activating it, e.g. ahead of a rollout.
+
+    Args:
+        name: Version name, i.e. the weights file name in MODEL_DIR (e.g. yolo_best.onnx)
+
+    Raises:
+        HTTPException: If the version is unknown (404) or fails to load (500)
+    """
+    result = await _run_model_admin(load_version, name, rolling=True, **warmup_options())
+    return {"status": "loaded", "model_version": name, **result}
+
+
+@app.post("/models/{name}/activate", status_code=status.HTTP_200_OK, dependencies=[Depends(require_admin)])
+async def activate_model(name: str):
+    """
+    Hot-swap the model: load and warm up a version if needed, then atomically make it serve all new batches.
+
+    In-flight batches finish on the previous version and no request is dropped. Each prediction reports the
+    `model_version` that served it. Editing `model_path` or `engine` in the inference configuration activates the
+    weights it points to again.
+
+    Args:
+        name: Version name, i.e. the weights file name in MODEL_DIR (e.g. yolo_best.onnx)
+
+    Raises:
+        HTTPException: If the version is unknown (404) or fails to load (500)
+    """
+    previous = get_active_version().name
+    result = await _run_model_admin(load_version, name, rolling=True, **warmup_options())
+    # The version is loaded in every replica before any of them switches, so they disagree only during a broadcast
+    await _run_model_admin(switch_version, name)
+    if replica_pool is not None:
+        registry.activate(name)
+    readiness["model_version"] = name
+    return {"status": "activated", "model_version": name, "previous_version": previous, **result}
+
+
+@app.post("/models/{name}/unload", status_code=status.HTTP_200_OK, dependencies=[Depends(require_admin)])
+async def unload_model(name: str):
+    """
+    Free the memory of an inactive model version. Batches still running on it finish normally.
+
+    Raises:
+        HTTPException: If the version is unknown (404) or active (409)
+    """
+    try:
+        await on_every_model(unload_version, name)
+        if replica_pool is not None:
+            registry.unload(name)
+    except KeyError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unknown model version: {name}"
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
+    return {"status": "unloaded", "model_version": name}
+
+
+async def _run_model_admin(action, name: str, **kwargs):
+    """
+    Run `load_version` or `switch_version` on every replica (one at a time for loads), or on a worker thread
+    without replicas, so predictions keep running meanwhile. New weights files in MODEL_DIR are registered first.
+    """
+    try:
+        await on_every_model(discover_versions, settings.model_dir or None)
+        if replica_pool is not None:
+            # This process tracks the versions too, for the cache namespaces and /models
+            discover_versions(settings.model_dir or None)
+        results = await on_every_model(action, name, **kwargs)
+        return slowest(results) if isinstance(results[0], dict) else results[0]
+    except KeyError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unknown model version: {name}"
+        )
+    except Exception as e:
+        logger.error(f"Loading model version {name} failed: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Loading model version {name} failed: {str(e)}"
+        )
+
+
+@app.post("/predict", response_model=PredictResponse, response_model_exclude_none=True, status_code=status.HTTP_200_OK)
+async def predict(
+    file: UploadFile = File(...),
+    top_k: int | None = Query(None, ge=1, description="Keep only the k most confident ingredients"),
+    include_boxes: bool = Query(False, description="Add the [x1, y1, x2, y2] box of each ingredient's best detection")
+):
     """
     Detect ingredients from an image using YOLO model.
 
-    The image should be accessible via a shared volume between backend and models service.
+    Images already on the volume shared with the backend can be sent by path to /predict/path instead.
 
     Args:
-        request: UploadFile containing the image
+        file: UploadFile containing the image
+        top_k: Keep only the k most confident ingredients
+        include_boxes: Add the box (in source image pixels) of each ingredient's best detection
 
     Returns:
         PredictResponse with detected ingredients and their confidence scores
 
     Raises:
-        HTTPException: If image not found or detection fails
+        HTTPException: If image not found, the service is overloaded (429) or detection fails
+    """
+    logger.info(f"Received file upload: {file.filename}")
+    return await _predict_admitted("/predict", file.filename, file.read, top_k, include_boxes)
+
+
+@app.post("/predict/path", response_model=PredictResponse, response_model_exclude_none=True, status_code=status.HTTP_200_OK)
+async def predict_path(
+    request: PredictRequest,
+    top_k: int | None = Query(None, ge=1, description="Keep only the k most confident ingredients"),
+    include_boxes: bool = Query(False, description="Add the [x1, y1, x2, y2] box of each ingredient's best detection")
+):
+    """
+    Detect ingredients from an image on the volume shared with the backend, without uploading it.
+
+    The file is memory-mapped and decoded in place. The path is sandboxed to the shared volume.
+
+    Args:
+        request: PredictRequest with the relative path of the image, e.g. uploads/recipes/fridge_photo.jpg
+        top_k: Keep only the k most confident ingredients
+        include_boxes: Add the box (in source image pixels) of each ingredient's best detection
+
+    Returns:
+        PredictResponse with detected ingredients and their confidence scores
+
+    Raises:
+        HTTPException: If the path is not allowed (400), the image is not found (404),
+            the service is overloaded (429) or detection fails
+    """
+    logger.info(f"Received shared-volume path: {request.image_path}")
+    load = partial(_read_shared_path, request.image_path)
+    return await _predict_admitted("/predict/path", request.image_path, load, top_k, include_boxes)
+
+
+@app.post("/predict/batch", status_code=status.HTTP_200_OK)
+async def predict_batch(
+    files: list[UploadFile] | None = File(None, description="Images to detect ingredients in"),
+    paths: list[str] | None = Form(None, description="Paths of images on the shared volume, e.g. uploads/recipes/a.jpg"),
+    top_k: int | None = Query(None, ge=1, description="Keep only the k most confident ingredients"),
+    include_boxes: bool = Query(False, description="Add the [x1, y1, x2, y2] box of each ingredient's best detection")
+):
     """
+    Detect ingredients in many images with a single request, e.g. to backfill historical recipes.
+
+    Images are sent as multipart `files`, as shared-volume `paths`, or both. They go through the same
+    batched inference as /predict, and results are streamed back as NDJSON as soon as each image is done,
+    in completion order. Each line carries the `index` of the image in the request (files first, then paths)
+    and either its `ingredients` and `count` or an `error` and `status`: a bad image never fails the batch.
+    A final `{"done": true, ...}` line summarizes the batch.
 
-    temp_filename = f"temp_{file.filename}" if file.filename else "temp_image.jpg"
-    temp_path = f"/tmp/{temp_filename}"
-    logger.info(f"Received file upload. Saving to: {temp_path}")
+    Args:
+        files: Uploaded images
+        paths: Relative paths of images on the shared volume
+        top_k: Keep only the k most confident ingredients
+        include_boxes: Add the box (in source image pixels) of each ingredient's best detection
 
+    Returns:
+        StreamingResponse: application/x-ndjson stream, one line per image
+
+    Each image is admitted on its own, like a /predict request, so a batch weighs on the in-flight and queue
+    limits as many requests: an image not admitted in time gets an error line with status 429.
+
+    Raises:
+        HTTPException: If no image is sent (400), too many are sent (413) or the service is overloaded (429)
+    """
+    files, paths = files or [], paths or []
+    total = len(files) + len(paths)
+    if total == 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Send at least one image in `files` or `paths`"
+        )
+    if total > settings.batch_request_max_images:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {settings.batch_request_max_images} images per batch, got {total}"
+        )
 
+    # Overloaded: answer before reading the uploads
     try:
-        with open(temp_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        # Call the detector
-        ingredients_list = detect_ingredients(temp_path)
-
-        # Format response
-        response = PredictResponse(
-            ingredients=ingredients_list,
-            count=len(ingredients_list)
+        admission.check()
+    except AdmissionRejected as e:
+        logger.warning(f"Shedding /predict/batch request: {e.reason}")
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Models service is overloaded, retry later",
+            headers={"Retry-After": str(e.retry_after)}
         )
 
-        logger.info(f"Successfully detected {response.count} ingredients")
-        return response
+    # Uploaded files are closed once this handler returns, before the response is streamed
+    sources = []
+    for file in files:
+        with timed(STAGE_UPLOAD_READ):
+            sources.append((file.filename, await file.read()))
+    sources += [(path, path) for path in paths]
 
+    logger.info(f"Received batch of {total} images")
+    return StreamingResponse(
+        _stream_batch(sources, top_k, include_boxes),
+        media_type="application/x-ndjson"
+    )
+
+
+# Inference path reported for results served from the result cache
+PATH_CACHED = "cached"
+# Inference path reported for requests that shared the in-flight detection of an identical request
+PATH_COALESCED = "coalesced"
+
+
+class InvalidImageError(ValueError):
+    """Raised when an image cannot be read or decoded."""
+
+
+def _decode(data: bytes, image_size: int, with_phash: bool):
+    """Decode an upload and compute its perceptual hash, on a worker thread."""
+    with timed(STAGE_DECODE):
+        image, scale = decode_image(data, image_size)
+    return image, scale, dhash(image) if with_phash else None
+
+
+async def _detect_uncached(data: bytes, config, version, namespace: str, key: str) -> tuple[list[dict], str, object]:
+    """
+    Decode an image missing from the exact-match cache, then answer it from a near-duplicate or run the detector.
+
+    Returns:
+        tuple: (ingredients with boxes, inference path, ModelVersion that produced the result)
+
+    Raises:
+        InvalidImageError: If the image cannot be decoded
+    """
+    try:
+        # Decode straight from the request body, without a round trip through /tmp
+        with_phash = result_cache.enabled and result_cache.near_duplicate_distance > 0
+        image, scale, phash = await asyncio.to_thread(_decode, data, config.image_size, with_phash)
+    except ValueError as e:
+        raise InvalidImageError(str(e))
+
+    # Scans every cached hash: off the event loop, like the decode and the hashing
+    ingredients_list = await asyncio.to_thread(result_cache.get_near, phash, namespace) if phash is not None else None
+    if ingredients_list is not None:
+        return ingredients_list, PATH_CACHED, version
+
+    # Call the detector, batched together with concurrent requests
+    ingredients_list, inference_path, served_by = await batch_scheduler.submit(image)
+    if served_by != version:
+        # The active version was switched while the image was queued: cache under the version that served it
+        version = served_by
+        namespace = cache_namespace(version.fingerprint, config)
+        key = await asyncio.to_thread(content_key, data, namespace)
+    if scale != 1:
+        # Boxes refer to the reduced-resolution decode: map them back to the uploaded image
+        ingredients_list = [{**ingredient, "box": [v * scale for v in ingredient["box"]]} for ingredient in ingredients_list]
+    result_cache.record_miss()
+    # May write to the SQLite file of a persistent cache
+    await asyncio.to_thread(result_cache.put, key, namespace, phash, ingredients_list)
+    return ingredients_list, inference_path, version
+
+
+async def _detect(data: bytes, top_k: int | None, include_boxes: bool) -> tuple[list[dict], str, str]:
+    """
+    Detect the ingredients of an encoded image, through the result cache and the batch scheduler.
+
+    Args:
+        data: Encoded image bytes, or any buffer such as a memory-mapped file
+        top_k: Keep only the k most confident ingredients
+        include_boxes: Add the box (in source image pixels) of each ingredient's best detection
+
+    Returns:
+        tuple: (ingredients by decreasing confidence, inference path: "full", "low_res", "escalated", "cached" or
+            "coalesced", name of the model version that produced the result)
+
+    Raises:
+        InvalidImageError: If the image cannot be decoded
+    """
+    config = load_inference_config(CONFIG_PATH)
+    version = get_active_version()
+    namespace = cache_namespace(version.fingerprint, config)
+    # Hashing a multi-megabyte upload would stall every other request on the event loop
+    key = await asyncio.to_thread(content_key, data, namespace)
+
+    # Identical image already processed with the same model and configuration
+    ingredients_list = result_cache.get(key)
+    inference_path = PATH_CACHED
+
+    if ingredients_list is None:
+        # Identical images arriving together (double submits, client retries) share one decode and inference
+        (ingredients_list, inference_path, version), shared = await single_flight.run(
+            key, partial(_detect_uncached, data, config, version, namespace, key)
+        )
+        if shared:
+            inference_path = PATH_COALESCED
+            metrics.COALESCED_REQUESTS.inc()
+
+    if "first_prediction" not in readiness["startup_seconds"]:
+        startup_timeline.mark("first_prediction")
+        readiness["startup_seconds"] = startup_timeline.as_dict()
+    return select_ingredients(ingredients_list, top_k, include_boxes), inference_path, version.name
+
+
+async def _predict_admitted(route: str, name: str, load, top_k: int | None, include_boxes: bool) -> PredictResponse:
+    """
+    Admit a prediction request, then read its image with `load` and detect its ingredients.
+    /predict and /predict/path only differ by how the image is read.
+
+    Args:
+        route: Route of the request, for the load-shedding log
+        name: File name or path of the image, for the logs
+        load: Coroutine function returning the encoded image, raising HTTPException if it cannot be read
+        top_k: Keep only the k most confident ingredients
+        include_boxes: Add the box (in source image pixels) of each ingredient's best detection
+
+    Returns:
+        PredictResponse with detected ingredients and their confidence scores
+
+    Raises:
+        HTTPException: If the service is overloaded (429), the image is invalid (400) or detection fails (500)
+    """
+    try:
+        async with admission.slot():
+            with timed(STAGE_UPLOAD_READ):
+                data = await load()
+            try:
+                ingredients_list, inference_path, model_version = await _detect(data, top_k, include_boxes)
+            except InvalidImageError as e:
+                logger.error(f"Invalid image {name}: {str(e)}")
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Invalid image: {str(e)}"
+                )
+            except Exception as e:
+                logger.error(f"Error during prediction: {str(e)}", exc_info=True)
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail=f"Prediction failed: {str(e)}"
+                )
+    except AdmissionRejected as e:
+        logger.warning(f"Shedding {route} request: {e.reason}")
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Models service is overloaded, retry later",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+    # Format response
+    response = PredictResponse(
+        ingredients=ingredients_list,
+        count=len(ingredients_list),
+        inference_path=inference_path,
+        model_version=model_version
+    )
+
+    logger.info(f"Successfully detected {response.count} ingredients")
+    return response
+
+
+async def _read_shared_path(image_path: str):
+    """
+    Memory-map an image of the shared volume.
+
+    Raises:
+        HTTPException: If the image is not found (404) or the path is not allowed (400)
+    """
+    try:
+        return await asyncio.to_thread(read_shared_file, image_path, settings.shared_volume_root)
     except FileNotFoundError as e:
-        logger.error(f"Image not found: {request.image_path}")
+        logger.error(str(e))
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Image not found: {str(e)}"
+            detail=str(e)
         )
-    except Exception as e:
-        logger.error(f"Error during prediction: {str(e)}", exc_info=True)
+    except (OSError, ValueError) as e:
+        logger.error(f"Rejected path {image_path}: {str(e)}")
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Prediction failed: {str(e)}"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid path: {str(e)}"
         )
+
+
+async def _predict_batch_item(index: int, name: str, source: bytes | str, top_k: int | None, include_boxes: bool) -> dict:
+    """Detect the ingredients of one image of a batch, turning its errors into a result line."""
+    line = {"index": index, "source": name}
+    try:
+        if isinstance(source, str):
+            with timed(STAGE_UPLOAD_READ):
+                source = await asyncio.to_thread(read_shared_file, source, settings.shared_volume_root)
+    except FileNotFoundError as e:
+        return {**line, "error": str(e), "status": status.HTTP_404_NOT_FOUND}
+    except (OSError, ValueError) as e:
+        return {**line, "error": f"Invalid path: {str(e)}", "status": status.HTTP_400_BAD_REQUEST}
+
+    try:
+        ingredients_list, inference_path, model_version = await _detect(source, top_k, include_boxes)
+    except InvalidImageError as e:
+        return {**line, "error": f"Invalid image: {str(e)}", "status": status.HTTP_400_BAD_REQUEST}
+    except Exception as e:
+        logger.error(f"Error during prediction of {name}: {str(e)}", exc_info=True)
+        return {**line, "error": f"Prediction failed: {str(e)}", "status": status.HTTP_500_INTERNAL_SERVER_ERROR}
+
+    ingredients = [Ingredient(**ingredient).model_dump(exclude_none=True) for ingredient in ingredients_list]
+    return {**line, "ingredients": ingredients, "count": len(ingredients), "inference_path": inference_path, "model_version": model_version}
+
+
+async def _stream_batch(sources: list[tuple[str, bytes | str]], top_k: int | None, include_boxes: bool):
+    """Yield one NDJSON line per image as it completes, then a summary line."""
+    # Enough images in flight to fill the concurrent batches, without flooding the scheduler queue
+    window = asyncio.Semaphore(settings.batch_max_size * concurrent_batches)
+
+    async def run(index: int, name: str, source: bytes | str) -> dict:
+        async with window:
+            # Every image holds its own admission slot, like a /predict request
+            try:
+                async with admission.slot():
+                    return await _predict_batch_item(index, name, source, top_k, include_boxes)
+            except AdmissionRejected as e:
+                return {
+                    "index": index,
+                    "source": name,
+                    "error": "Models service is overloaded, retry later",
+                    "status": status.HTTP_429_TOO_MANY_REQUESTS,
+                    "retry_after": e.retry_after,
+                }
+
+    tasks = [asyncio.create_task(run(index, name, source)) for index, (name, source) in enumerate(sources)]
+    failed = 0
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            line = await next_done
+            failed += "error" in line
+            yield json.dumps(line) + "\n"
+        logger.info(f"Batch done: {len(tasks) - failed} images succeeded, {failed} failed")
+        yield json.dumps({"done": True, "total": len(tasks), "succeeded": len(tasks) - failed, "failed": failed}) + "\n"
     finally:
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
+        # Client disconnected or batch done: stop the remaining images, freeing their admission slots
+        for task in tasks:
+            task.cancel()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,108 @@
+"""
+Admission control for the Models Service.
+Bounds the number of in-flight inferences and sheds load that cannot be served in time.
+"""
+import asyncio
+from contextlib import asynccontextmanager
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request cannot be admitted; the client should retry after `retry_after` seconds."""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(f"Request not admitted: {reason}")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Limits concurrent inferences with a bounded wait queue.
+
+    At most `max_in_flight` requests hold a slot at any time. Up to `max_queue` further
+    requests may wait for a slot, each for at most `queue_timeout_ms`. Everything else is
+    rejected immediately so that the service answers fast instead of piling up work.
+    """
+
+    def __init__(self, max_in_flight: int = 32, max_queue: int = 64, queue_timeout_ms: float = 2000.0, retry_after_s: int = 1):
+        """
+        Args:
+            max_in_flight: Maximum number of admitted requests
+            max_queue: Maximum number of requests waiting for a slot
+            queue_timeout_ms: Maximum time a request waits for a slot
+            retry_after_s: Value suggested to rejected clients in the Retry-After header
+        """
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = max(0.0, queue_timeout_ms) / 1000.0
+        self.retry_after_s = retry_after_s
+
+        self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        self._in_flight = 0
+        self._waiting = 0
+
+        # Metrics
+        self._admitted_total = 0
+        self._rejected_queue_full = 0
+        self._rejected_timeout = 0
+        self._waiting_max = 0
+
+    @asynccontextmanager
+    async def slot(self):
+        """
+        Hold an inference slot for the duration of the `async with` block.
+
+        Raises:
+            AdmissionRejected: If the wait queue is full or no slot frees up in time
+        """
+        self.check()
+
+        self._waiting += 1
+        self._waiting_max = max(self._waiting_max, self._waiting)
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._rejected_timeout += 1
+            raise AdmissionRejected("queue timeout", self.retry_after_s)
+        finally:
+            self._waiting -= 1
+
+        self._in_flight += 1
+        self._admitted_total += 1
+        try:
+            yield
+        finally:
+            self._in_flight -= 1
+            self._semaphore.release()
+
+    def check(self):
+        """
+        Reject a request that could not even wait for a slot right now, before spending anything on it
+        (e.g. reading a large upload). Does not hold a slot.
+
+        Raises:
+            AdmissionRejected: If every slot is taken and the wait queue is full
+        """
+        if self._semaphore.locked() and self._waiting >= self.max_queue:
+            self._rejected_queue_full += 1
+            raise AdmissionRejected("queue full", self.retry_after_s)
+
+    def stats(self) -> dict:
+        """
+        Snapshot of the admission metrics.
+
+        Returns:
+            dict: Limits, current occupancy and rejection counters
+        """
+        return {
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "queue_timeout_ms": self.queue_timeout * 1000.0,
+            "in_flight": self._in_flight,
+            "queue_depth": self._waiting,
+            "queue_depth_max": self._waiting_max,
+            "admitted_total": self._admitted_total,
+            "rejected_total": self._rejected_queue_full + self._rejected_timeout,
+            "rejected_queue_full": self._rejected_queue_full,
+            "rejected_timeout": self._rejected_timeout,
+        }
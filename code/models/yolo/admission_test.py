@@ -0,0 +1,81 @@
+# External imports
+import asyncio
+import unittest
+from admission import AdmissionController, AdmissionRejected
+
+
+class TestAdmissionController(unittest.TestCase):
+    """
+    This class tests the admission control and load shedding of prediction requests.
+    """
+
+
+    def test_queue_full_is_rejected(self):
+        """
+        Tests that requests beyond in-flight slots and queue capacity are rejected immediately.
+        """
+
+        controller = AdmissionController(max_in_flight=1, max_queue=1, queue_timeout_ms=1000)
+        release = None
+
+        async def hold():
+            async with controller.slot():
+                await release.wait()
+
+        async def main():
+            nonlocal release
+            release = asyncio.Event()
+            holder = asyncio.create_task(hold())
+            waiter = asyncio.create_task(hold())
+            await asyncio.sleep(0.01)
+            with self.assertRaises(AdmissionRejected) as ctx:
+                async with controller.slot():
+                    pass
+            self.assertEqual(ctx.exception.reason, "queue full")
+            release.set()
+            await asyncio.gather(holder, waiter)
+
+        asyncio.run(main())
+        stats = controller.stats()
+        self.assertEqual(stats["admitted_total"], 2)
+        self.assertEqual(stats["rejected_queue_full"], 1)
+        self.assertEqual(stats["in_flight"], 0)
+
+
+    def test_queue_timeout_is_rejected(self):
+        """
+        Tests that a queued request is rejected when no slot frees up in time.
+        """
+
+        controller = AdmissionController(max_in_flight=1, max_queue=4, queue_timeout_ms=20)
+
+        async def main():
+            async with controller.slot():
+                with self.assertRaises(AdmissionRejected) as ctx:
+                    async with controller.slot():
+                        pass
+                self.assertEqual(ctx.exception.reason, "queue timeout")
+
+        asyncio.run(main())
+        self.assertEqual(controller.stats()["rejected_timeout"], 1)
+        self.assertEqual(controller.stats()["queue_depth"], 0)
+
+
+    def test_check_before_admission(self):
+        """
+        Tests that check rejects a request that could not queue, without holding a slot.
+        """
+
+        controller = AdmissionController(max_in_flight=1, max_queue=0, queue_timeout_ms=20)
+
+        async def main():
+            controller.check()
+            async with controller.slot():
+                with self.assertRaises(AdmissionRejected):
+                    controller.check()
+            controller.check()
+
+        asyncio.run(main())
+        stats = controller.stats()
+        self.assertEqual(stats["rejected_queue_full"], 1)
+        self.assertEqual(stats["admitted_total"], 1)
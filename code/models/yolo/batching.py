@@ -0,0 +1,188 @@
+"""
+Dynamic micro-batching for the Models Service.
+Concurrent requests are grouped into a single forward pass of the detection model.
+"""
+import asyncio
+import logging
+import time
+from collections import Counter
+from concurrent.futures import Executor
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class BatchScheduler:
+    """
+    Collects concurrent inference requests and runs them as batches.
+
+    A batch is dispatched as soon as it holds `max_batch_size` items or the first item
+    in it has waited `max_wait_ms`, whichever comes first. The batch function receives the
+    list of inputs and must return one result per input, in the same order. A result that
+    is an Exception instance is raised to the caller of that single item only.
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[[list], list],
+        max_batch_size: int = 8,
+        max_wait_ms: float = 15.0,
+        executor: Executor | None = None,
+        max_concurrent_batches: int = 1,
+    ):
+        """
+        Args:
+            run_batch: Blocking function running the model on a list of inputs
+            max_batch_size: Maximum number of items per batch
+            max_wait_ms: Maximum time an item waits for the batch to fill up
+            executor: Executor where batches run (None uses the loop default executor)
+            max_concurrent_batches: Number of batches allowed to run at the same time
+        """
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.executor = executor
+        self.max_concurrent_batches = max(1, max_concurrent_batches)
+
+        self._queue: asyncio.Queue | None = None
+        self._worker: asyncio.Task | None = None
+        self._slots: asyncio.Semaphore | None = None
+        self._running: set[asyncio.Task] = set()
+
+        # Metrics
+        self._batches_total = 0
+        self._items_total = 0
+        self._batch_sizes: Counter = Counter()
+        self._wait_seconds_total = 0.0
+        self._wait_seconds_max = 0.0
+        self._queue_depth_max = 0
+
+    async def start(self):
+        """Start the background task that forms and runs batches."""
+        if self._worker is None:
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.max_concurrent_batches)
+            self._worker = asyncio.create_task(self._run(), name="batch-scheduler")
+
+    async def stop(self):
+        """Stop the scheduler, failing any request still waiting in the queue."""
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+        if self._running:
+            await asyncio.gather(*self._running, return_exceptions=True)
+
+        while not self._queue.empty():
+            _, future, _ = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Batch scheduler stopped"))
+
+    async def submit(self, item: Any) -> Any:
+        """
+        Queue one input and wait for its own result.
+
+        Args:
+            item: Single model input (image path or array)
+
+        Returns:
+            The result produced by `run_batch` for this input
+        """
+        if self._worker is None:
+            raise RuntimeError("Batch scheduler is not running")
+
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((item, future, time.perf_counter()))
+        self._queue_depth_max = max(self._queue_depth_max, self._queue.qsize())
+        return await future
+
+    async def _collect(self) -> list:
+        """Wait for the first item, then fill the batch until it is full or the window closes."""
+        batch = [await self._queue.get()]
+        deadline = batch[0][2] + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+
+        # Callers that went away while waiting do not need a forward pass
+        return [entry for entry in batch if not entry[1].done()]
+
+    async def _run(self):
+        while True:
+            # Items keep accumulating in the queue while all batch slots are busy
+            await self._slots.acquire()
+            try:
+                batch = await self._collect()
+            except BaseException:
+                self._slots.release()
+                raise
+            if not batch:
+                self._slots.release()
+                continue
+
+            task = asyncio.create_task(self._run_batch(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run_batch(self, batch: list):
+        loop = asyncio.get_running_loop()
+        try:
+            dispatched_at = time.perf_counter()
+            for _, _, enqueued_at in batch:
+                waited = dispatched_at - enqueued_at
+                self._wait_seconds_total += waited
+                self._wait_seconds_max = max(self._wait_seconds_max, waited)
+            self._batches_total += 1
+            self._items_total += len(batch)
+            self._batch_sizes[len(batch)] += 1
+
+            inputs = [item for item, _, _ in batch]
+            try:
+                results = await loop.run_in_executor(self.executor, self.run_batch, inputs)
+                if len(results) != len(inputs):
+                    raise RuntimeError(f"Batch returned {len(results)} results for {len(inputs)} inputs")
+            except Exception as e:
+                logger.error(f"Batch of {len(inputs)} failed: {e}", exc_info=True)
+                results = [e] * len(inputs)
+
+            for (_, future, _), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+        finally:
+            self._slots.release()
+
+    def stats(self) -> dict:
+        """
+        Snapshot of the scheduler metrics, used to tune batch size and wait window.
+
+        Returns:
+            dict: Configuration, queue depth and batch size/wait statistics
+        """
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "max_concurrent_batches": self.max_concurrent_batches,
+            "running_batches": len(self._running),
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "queue_depth_max": self._queue_depth_max,
+            "batches_total": self._batches_total,
+            "items_total": self._items_total,
+            "avg_batch_size": self._items_total / self._batches_total if self._batches_total else 0.0,
+            "batch_size_counts": dict(sorted(self._batch_sizes.items())),
+            "avg_wait_ms": 1000.0 * self._wait_seconds_total / self._items_total if self._items_total else 0.0,
+            "max_wait_ms_observed": 1000.0 * self._wait_seconds_max,
+        }
@@ -0,0 +1,74 @@
+# External imports
+import asyncio
+import unittest
+from batching import BatchScheduler
+
+
+class TestBatchScheduler(unittest.TestCase):
+    """
+    This class tests the grouping of concurrent requests into batches.
+    """
+
+
+    def run_requests(self, scheduler, items):
+        """
+        Submit all the items concurrently and return their results.
+        """
+
+        async def main():
+            await scheduler.start()
+            try:
+                return await asyncio.gather(*(scheduler.submit(item) for item in items), return_exceptions=True)
+            finally:
+                await scheduler.stop()
+
+        return asyncio.run(main())
+
+
+    def test_concurrent_requests_are_batched(self):
+        """
+        Tests that concurrent requests share a forward pass and get their own result back.
+        """
+
+        batches = []
+        def run_batch(inputs):
+            batches.append(list(inputs))
+            return [item * 2 for item in inputs]
+
+        scheduler = BatchScheduler(run_batch, max_batch_size=4, max_wait_ms=50)
+        results = self.run_requests(scheduler, list(range(10)))
+
+        self.assertEqual(results, [item * 2 for item in range(10)])
+        self.assertEqual([len(batch) for batch in batches], [4, 4, 2])
+        self.assertEqual(scheduler.stats()["items_total"], 10)
+        self.assertEqual(scheduler.stats()["batches_total"], 3)
+
+
+    def test_per_item_errors(self):
+        """
+        Tests that an error on one input does not fail the other inputs of the batch.
+        """
+
+        def run_batch(inputs):
+            return [ValueError("bad image") if item < 0 else item for item in inputs]
+
+        scheduler = BatchScheduler(run_batch, max_batch_size=8, max_wait_ms=20)
+        results = self.run_requests(scheduler, [1, -1, 2])
+
+        self.assertEqual(results[0], 1)
+        self.assertIsInstance(results[1], ValueError)
+        self.assertEqual(results[2], 2)
+
+
+    def test_batch_failure(self):
+        """
+        Tests that an exception raised by the model is propagated to every caller of the batch.
+        """
+
+        def run_batch(inputs):
+            raise RuntimeError("model crashed")
+
+        scheduler = BatchScheduler(run_batch, max_batch_size=8, max_wait_ms=20)
+        results = self.run_requests(scheduler, [1, 2])
+
+        self.assertTrue(all(isinstance(result, RuntimeError) for result in results))
@@ -0,0 +1,520 @@
+"""
+Latency and throughput benchmark of the Models Service.
+
+Targets:
+- "detector": the in-process pipeline of the service (file read, decode_image, detect_ingredients_batch)
+- "endpoint": POST /predict of a running service, over HTTP
+- "cascade": the cascade (low-resolution pass, escalated when ambiguous) against a single full-resolution pass
+- "startup": cold starts of the service (uvicorn app:app), timing /health, /ready and the first prediction
+
+Inputs are yolo/test_images plus synthetic images at several resolutions. The detector and endpoint targets run
+at several concurrency levels and report p50/p95/p99 latency, throughput and the time spent in each stage; the
+cascade target reports the inference path of each image, the latency saving and the recall. The startup target
+reports the time from launch to each milestone and, with --profile-imports, the import time of every package.
+Results are written as JSON so runs can be compared across commits and engines.
+
+Usage:
+    python benchmark.py --target detector --concurrency 1,4 --requests 50 --output bench_detector.json
+    python benchmark.py --target endpoint --url http://localhost:8001 --concurrency 1,8,32 --output bench_endpoint.json
+    python benchmark.py --target cascade --cascade-size 320 --output bench_cascade.json
+    python benchmark.py --target startup --repeats 5 --clear-graph-cache --profile-imports --output bench_startup.json
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from datetime import datetime, timezone
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+import stage_timing
+from stage_timing import STAGES, STAGE_UPLOAD_READ, STAGE_DECODE
+
+logger = logging.getLogger(__name__)
+
+TEST_IMAGES_DIR = Path(__file__).parent / "test_images"
+
+# Synthetic inputs: phone photos are typically 4:3, from thumbnails to 12 MP
+DEFAULT_RESOLUTIONS = ((640, 480), (1280, 960), (1920, 1440), (4032, 3024))
+
+PERCENTILES = (50, 95, 99)
+
+
+def synthetic_image(width: int, height: int, seed: int = 0) -> np.ndarray:
+    """
+    Fridge-like synthetic image: a smooth background with coloured boxes, which compresses like a photo
+    (unlike random noise, which would make JPEG decoding unrealistically slow).
+
+    Args:
+        width: Image width
+        height: Image height
+        seed: Random seed
+
+    Returns:
+        np.ndarray: BGR image
+    """
+    rng = np.random.default_rng(seed)
+    gradient = np.linspace(90, 200, width, dtype=np.float32)[None, :, None]
+    image = np.broadcast_to(gradient, (height, width, 3)).astype(np.uint8).copy()
+    for _ in range(12):
+        x, y = int(rng.integers(0, width - width // 6)), int(rng.integers(0, height - height // 6))
+        w, h = int(rng.integers(width // 20, width // 6)), int(rng.integers(height // 20, height // 6))
+        cv2.rectangle(image, (x, y), (x + w, y + h), tuple(int(c) for c in rng.integers(0, 256, 3)), -1)
+    return image
+
+
+def prepare_inputs(folder: str, resolutions=DEFAULT_RESOLUTIONS) -> list[dict]:
+    """
+    Collect the test images and write the synthetic ones as JPEG files.
+
+    Args:
+        folder: Folder where the synthetic images are written
+        resolutions: (width, height) of the synthetic images
+
+    Returns:
+        list: Inputs as {"name", "path", "width", "height", "bytes"}
+    """
+    paths = sorted(p for p in TEST_IMAGES_DIR.iterdir() if p.suffix.lower() in {".jpg", ".jpeg", ".png", ".bmp"})
+    for i, (width, height) in enumerate(resolutions):
+        path = Path(folder) / f"synthetic_{width}x{height}.jpg"
+        cv2.imwrite(str(path), synthetic_image(width, height, seed=i), [cv2.IMWRITE_JPEG_QUALITY, 90])
+        paths.append(path)
+
+    inputs = []
+    for path in paths:
+        image = cv2.imread(str(path))
+        inputs.append({
+            "name": path.name,
+            "path": str(path),
+            "width": image.shape[1],
+            "height": image.shape[0],
+            "bytes": path.stat().st_size,
+        })
+    return inputs
+
+
+def percentiles(values_ms: list[float]) -> dict:
+    """
+    Summary of a latency distribution.
+
+    Args:
+        values_ms: Latencies in milliseconds
+
+    Returns:
+        dict: count, mean, max and p50/p95/p99, in milliseconds
+    """
+    if not values_ms:
+        return {"count": 0}
+    values = np.asarray(values_ms)
+    summary = {"count": len(values), "mean_ms": float(values.mean()), "max_ms": float(values.max())}
+    for p in PERCENTILES:
+        summary[f"p{p}_ms"] = float(np.percentile(values, p))
+    return summary
+
+
+class StageSamples:
+    """
+    Stage observer keeping every sample, so the benchmark can report stage percentiles.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {stage: [] for stage in STAGES}
+
+    def __call__(self, stage: str, seconds: float):
+        with self._lock:
+            self.samples.setdefault(stage, []).append(seconds * 1000)
+
+    def summary(self) -> dict:
+        return {stage: percentiles(values) for stage, values in self.samples.items() if values}
+
+
+def run_load(request, inputs: list[dict], concurrency: int, requests: int) -> dict:
+    """
+    Send `requests` requests with `concurrency` workers, cycling through the inputs.
+
+    Args:
+        request: Callable taking an input and running one request
+        inputs: Benchmark inputs
+        concurrency: Number of concurrent workers
+        requests: Total number of requests
+
+    Returns:
+        dict: Overall and per-input latencies, throughput and error count
+    """
+    latencies = [None] * requests
+    errors = []
+
+    def worker(index: int):
+        item = inputs[index % len(inputs)]
+        start = time.perf_counter()
+        try:
+            request(item)
+        except Exception as e:
+            errors.append(f"{item['name']}: {e}")
+            return
+        latencies[index] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(worker, range(requests)))
+    wall_seconds = time.perf_counter() - start
+
+    succeeded = [latency for latency in latencies if latency is not None]
+    by_input = {
+        item["name"]: percentiles([latencies[i] for i in range(idx, requests, len(inputs)) if latencies[i] is not None])
+        for idx, item in enumerate(inputs)
+    }
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": len(errors),
+        "error_samples": errors[:5],
+        "wall_seconds": wall_seconds,
+        "throughput_rps": len(succeeded) / wall_seconds if wall_seconds else 0.0,
+        "latency": percentiles(succeeded),
+        "latency_by_input": by_input,
+    }
+
+
+def benchmark_detector(inputs: list[dict], concurrency_levels: list[int], requests: int) -> tuple[dict, list[dict]]:
+    """
+    Benchmark the in-process pipeline used by /predict: read the file, decode it, run detect_ingredients_batch.
+
+    Returns:
+        tuple: (model description, one result per concurrency level)
+    """
+    from detector import detect_ingredients_batch, get_model_version, warmup, CONFIG_PATH
+    from image_io import decode_image
+    from inference_config import load_inference_config
+
+    config = load_inference_config(CONFIG_PATH)
+    warmup(runs=2)
+
+    def request(item: dict):
+        with stage_timing.timed(STAGE_UPLOAD_READ):
+            with open(item["path"], "rb") as f:
+                data = f.read()
+        with stage_timing.timed(STAGE_DECODE):
+            image, _ = decode_image(data, config.image_size)
+        result = detect_ingredients_batch([image])[0]
+        if isinstance(result, Exception):
+            raise result
+
+    runs = []
+    for concurrency in concurrency_levels:
+        samples = StageSamples()
+        stage_timing.add_observer(samples)
+        try:
+            result = run_load(request, inputs, concurrency, requests)
+        finally:
+            stage_timing.remove_observer(samples)
+        result["stages"] = samples.summary()
+        runs.append(result)
+        logger.info(f"detector c={concurrency}: p50 {result['latency'].get('p50_ms', 0):.1f} ms, {result['throughput_rps']:.1f} req/s")
+
+    return {"engine": config.engine, "model_version": get_model_version(), "config": config.to_dict()}, runs
+
+
+def benchmark_cascade(inputs: list[dict], repeats: int, cascade_image_size: int | None = None) -> tuple[dict, list[dict]]:
+    """
+    Compare the cascade with a single full-resolution pass on every input.
+
+    Recall is measured against the full-resolution pass: the share of the ingredients it finds that the cascade
+    also finds. The latency saving is 1 - (mean cascade latency / mean full-resolution latency).
+
+    Args:
+        inputs: Benchmark inputs
+        repeats: Timed runs of each path per input (the median is kept)
+        cascade_image_size: Overrides the configured cascade_image_size
+
+    Returns:
+        tuple: (model and cascade description, a single result with per-input details)
+    """
+    from detector import get_model, get_model_version, run_cascade, summarize_detections, warmup, CONFIG_PATH
+    from inference_config import load_inference_config
+
+    config = load_inference_config(CONFIG_PATH)
+    if cascade_image_size:
+        config = replace(config, cascade_image_size=cascade_image_size)
+    if not config.cascade_enabled:
+        raise SystemExit("Set cascade_image_size (or --cascade-size) below image_size to benchmark the cascade")
+    full_config = replace(config, cascade_image_size=0)
+
+    model = get_model()
+    warmup(runs=2, image_sizes=[config.cascade_image_size, config.image_size])
+
+    def timed_run(image: np.ndarray, run_config) -> tuple[float, set, str]:
+        start = time.perf_counter()
+        results, paths = run_cascade(model, [image], run_config)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        return elapsed_ms, {ingredient["name"] for ingredient in summarize_detections(results[0])}, paths[0]
+
+    details = []
+    for item in inputs:
+        image = cv2.imread(item["path"])
+        full_runs = [timed_run(image, full_config) for _ in range(repeats)]
+        cascade_runs = [timed_run(image, config) for _ in range(repeats)]
+        full_names, cascade_names, path = full_runs[0][1], cascade_runs[0][1], cascade_runs[0][2]
+        details.append({
+            "name": item["name"],
+            "path": path,
+            "full_ms": float(np.median([run[0] for run in full_runs])),
+            "cascade_ms": float(np.median([run[0] for run in cascade_runs])),
+            "recall": len(full_names & cascade_names) / len(full_names) if full_names else 1.0,
+            "missed": sorted(full_names - cascade_names),
+        })
+        logger.info(f"cascade {item['name']}: {path}, {details[-1]['cascade_ms']:.1f} ms vs {details[-1]['full_ms']:.1f} ms")
+
+    mean_full = float(np.mean([d["full_ms"] for d in details]))
+    mean_cascade = float(np.mean([d["cascade_ms"] for d in details]))
+    result = {
+        "images": len(details),
+        "paths": dict(Counter(d["path"] for d in details)),
+        "mean_full_ms": mean_full,
+        "mean_cascade_ms": mean_cascade,
+        "latency_saving": 1 - mean_cascade / mean_full if mean_full else 0.0,
+        "mean_recall": float(np.mean([d["recall"] for d in details])),
+        "inputs": details,
+    }
+    cascade = {key: getattr(config, key) for key in ("image_size", "cascade_image_size", "cascade_accept_confidence", "cascade_max_detections", "cascade_escalate_empty")}
+    return {"engine": config.engine, "model_version": get_model_version(), "config": config.to_dict(), "cascade": cascade}, [result]
+
+
+def _multipart(filename: str, data: bytes) -> tuple[bytes, str]:
+    boundary = uuid.uuid4().hex
+    body = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        "Content-Type: application/octet-stream\r\n\r\n"
+    ).encode() + data + f"\r\n--{boundary}--\r\n".encode()
+    return body, f"multipart/form-data; boundary={boundary}"
+
+
+def _get_json(url: str) -> dict:
+    with urllib.request.urlopen(url, timeout=30) as response:
+        return json.loads(response.read())
+
+
+def benchmark_endpoint(url: str, inputs: list[dict], concurrency_levels: list[int], requests: int) -> tuple[dict, list[dict]]:
+    """
+    Benchmark POST /predict of a running service.
+
+    Stage timings are measured by the service: the difference of its /stats "stages" counters before and
+    after each run gives the mean time per stage call (batched stages count once per batch).
+
+    Returns:
+        tuple: (service description, one result per concurrency level)
+    """
+    url = url.rstrip("/")
+    payloads = {}
+    for item in inputs:
+        with open(item["path"], "rb") as f:
+            payloads[item["name"]] = _multipart(item["name"], f.read())
+
+    def request(item: dict):
+        body, content_type = payloads[item["name"]]
+        http_request = urllib.request.Request(f"{url}/predict", data=body, headers={"Content-Type": content_type}, method="POST")
+        with urllib.request.urlopen(http_request, timeout=120) as response:
+            response.read()
+
+    # One untimed pass, so the first run does not pay for lazy initialisation
+    for item in inputs:
+        request(item)
+
+    runs = []
+    for concurrency in concurrency_levels:
+        before = _get_json(f"{url}/stats")
+        result = run_load(request, inputs, concurrency, requests)
+        after = _get_json(f"{url}/stats")
+        result["stages"] = _stage_delta(before.get("stages", {}), after.get("stages", {}))
+        result["batching"] = {key: after["batching"].get(key) for key in ("avg_batch_size", "avg_wait_ms")} if "batching" in after else {}
+        runs.append(result)
+        logger.info(f"endpoint c={concurrency}: p50 {result['latency'].get('p50_ms', 0):.1f} ms, {result['throughput_rps']:.1f} req/s")
+
+    ready = _get_json(f"{url}/ready")
+    return {"url": url, "service": {key: ready.get(key) for key in ("model_load_seconds", "warmup_seconds")}}, runs
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_until_ok(url: str, process: subprocess.Popen, timeout: float) -> None:
+    """Poll a GET endpoint until it answers 200, failing if the service exits or the timeout expires."""
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Service exited with code {process.returncode} before {url} answered")
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    return
+        except OSError:
+            pass
+        time.sleep(0.01)
+    raise TimeoutError(f"{url} did not answer 200 within {timeout:.0f}s")
+
+
+def benchmark_startup(inputs: list[dict], repeats: int, profile_imports: bool = False, clear_graph_cache: bool = False,
+                      timeout: float = 300.0) -> tuple[dict, list[dict]]:
+    """
+    Benchmark cold starts: launch `uvicorn app:app` `repeats` times and time, from the launch, the first 200 of
+    /health (imports done, server listening), of /ready (model loaded and warmed up) and of POST /predict.
+
+    Args:
+        inputs: Images; the first one is used for the first prediction
+        repeats: Number of starts
+        profile_imports: Run the service under `python -X importtime` and report the import time per package
+            (the profiler itself slows the imports down a little)
+        clear_graph_cache: Empty the optimized graph cache before the first start, so it measures a cold cache
+        timeout: Seconds to wait for each milestone
+
+    Returns:
+        tuple: (service description with the median of each milestone, one result per start)
+    """
+    from detector import CONFIG_PATH
+    from engines import resolve_config_relative
+    from inference_config import load_inference_config
+    from startup import parse_importtime
+
+    config = load_inference_config(CONFIG_PATH)
+    graph_cache_dir = resolve_config_relative(config.graph_cache_dir, CONFIG_PATH) if config.graph_cache_dir else None
+    if clear_graph_cache and graph_cache_dir:
+        shutil.rmtree(graph_cache_dir, ignore_errors=True)
+    with open(inputs[0]["path"], "rb") as f:
+        body, content_type = _multipart(inputs[0]["name"], f.read())
+
+    runs = []
+    for index in range(repeats):
+        port = _free_port()
+        url = f"http://127.0.0.1:{port}"
+        command = [sys.executable, *(["-X", "importtime"] if profile_imports else []),
+                   "-m", "uvicorn", "app:app", "--host", "127.0.0.1", "--port", str(port)]
+        warm_cache = bool(graph_cache_dir and os.path.isdir(graph_cache_dir) and os.listdir(graph_cache_dir))
+        # stderr goes to a file: a pipe nobody reads would block the service once full
+        with tempfile.TemporaryFile(mode="w+") as stderr:
+            launched = time.perf_counter()
+            process = subprocess.Popen(command, cwd=Path(__file__).parent.parent, stdout=subprocess.DEVNULL, stderr=stderr)
+            try:
+                _wait_until_ok(f"{url}/health", process, timeout)
+                health_s = time.perf_counter() - launched
+                _wait_until_ok(f"{url}/ready", process, timeout)
+                ready_s = time.perf_counter() - launched
+                request = urllib.request.Request(f"{url}/predict", data=body, headers={"Content-Type": content_type}, method="POST")
+                with urllib.request.urlopen(request, timeout=timeout) as response:
+                    response.read()
+                first_prediction_s = time.perf_counter() - launched
+                ready = _get_json(f"{url}/ready")
+            finally:
+                process.terminate()
+                process.wait(timeout=30)
+            stderr.seek(0)
+            log = stderr.read()
+
+        result = {
+            "run": index,
+            "graph_cache_warm": warm_cache,
+            "time_to_health_s": health_s,
+            "time_to_ready_s": ready_s,
+            "time_to_first_prediction_s": first_prediction_s,
+            # Process age at each milestone, measured by the service itself
+            "service": {key: ready.get(key) for key in ("startup_seconds", "model_load_seconds", "warmup_seconds")},
+        }
+        if profile_imports:
+            result["imports"] = parse_importtime(log, top=15)
+        runs.append(result)
+        logger.info(f"startup {index}: health {health_s:.2f}s, ready {ready_s:.2f}s, first prediction {first_prediction_s:.2f}s"
+                    f"{' (warm graph cache)' if warm_cache else ''}")
+
+    medians = {
+        key: float(np.median([run[key] for run in runs]))
+        for key in ("time_to_health_s", "time_to_ready_s", "time_to_first_prediction_s")
+    }
+    return {"engine": config.engine, "graph_cache_dir": graph_cache_dir, "median": medians}, runs
+
+
+def _stage_delta(before: dict, after: dict) -> dict:
+    delta = {}
+    for stage, stats in after.items():
+        count = stats["count"] - before.get(stage, {}).get("count", 0)
+        total_ms = stats["total_ms"] - before.get(stage, {}).get("total_ms", 0.0)
+        if count > 0:
+            delta[stage] = {"count": count, "mean_ms": total_ms / count}
+    return delta
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=Path(__file__).parent, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Models Service")
+    parser.add_argument("--target", choices=("detector", "endpoint", "cascade", "startup"), default="detector")
+    parser.add_argument("--url", default="http://localhost:8001", help="Service URL (endpoint target)")
+    parser.add_argument("--concurrency", default="1,4", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=50, help="Requests per concurrency level")
+    parser.add_argument("--resolutions", default=",".join(f"{w}x{h}" for w, h in DEFAULT_RESOLUTIONS),
+                        help="Comma-separated WIDTHxHEIGHT of the synthetic images")
+    parser.add_argument("--repeats", type=int, default=5, help="Timed runs per input and path (cascade target), starts (startup target)")
+    parser.add_argument("--cascade-size", type=int, default=None, help="Override cascade_image_size (cascade target)")
+    parser.add_argument("--profile-imports", action="store_true", help="Report the import time per package (startup target)")
+    parser.add_argument("--clear-graph-cache", action="store_true", help="Start with an empty optimized graph cache (startup target)")
+    parser.add_argument("--output", default=None, help="JSON file to write (default: benchmark_<target>_<timestamp>.json)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    concurrency_levels = [int(c) for c in args.concurrency.split(",") if c.strip()]
+    resolutions = [tuple(int(v) for v in r.split("x")) for r in args.resolutions.split(",") if r.strip()]
+    started_at = datetime.now(timezone.utc)
+
+    with tempfile.TemporaryDirectory() as folder:
+        inputs = prepare_inputs(folder, resolutions)
+        if args.target == "detector":
+            target, runs = benchmark_detector(inputs, concurrency_levels, args.requests)
+        elif args.target == "cascade":
+            target, runs = benchmark_cascade(inputs, args.repeats, args.cascade_size)
+        elif args.target == "startup":
+            target, runs = benchmark_startup(inputs, args.repeats, args.profile_imports, args.clear_graph_cache)
+        else:
+            target, runs = benchmark_endpoint(args.url, inputs, concurrency_levels, args.requests)
+
+    report = {
+        "target": args.target,
+        "started_at": started_at.isoformat(),
+        "git_commit": git_commit(),
+        "host": {"python": platform.python_version(), "machine": platform.machine(), "cpus": os.cpu_count()},
+        **target,
+        "inputs": [{key: item[key] for key in ("name", "width", "height", "bytes")} for item in inputs],
+        "runs": runs,
+    }
+    output = args.output or f"benchmark_{args.target}_{started_at.strftime('%Y%m%dT%H%M%S')}.json"
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"Benchmark written to {output}")
+
+
+if __name__ == "__main__":
+    main()
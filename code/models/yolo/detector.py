@@ -4,32 +4,248 @@ This module provides a clean interface to detect ingredients from images.
 """
 import logging
 import os
+import threading
+import time
+import weakref
+from dataclasses import replace
 from pathlib import Path
-from yolo_model import YOLOClass
+
+import numpy as np
+from engines import Detections, build_engine, resolve_model_path, resolve_config_relative
+from inference_config import load_inference_config
+from model_registry import ModelRegistry, ModelVersion
+from stage_timing import timed, STAGE_POSTPROCESS
+import metrics
 
 logger = logging.getLogger(__name__)
 
-# Global model instance 
-_model_instance = None
+# Inference configuration file, parsed once and reloaded only when it changes
+CONFIG_PATH = str(Path(__file__).parent / "config" / "config_yolo_inf.yaml")
+
+# Weights used by the ultralytics engine
+DEFAULT_MODEL_PATH = str(Path(__file__).parent / "model_weights" / "yolo_best.pt")
+
+# Folder scanned for model versions by default
+MODEL_WEIGHTS_DIR = str(Path(__file__).parent / "model_weights")
+
+# Inference path taken by an image: single full-resolution pass (cascade disabled),
+# accepted after the low-resolution pass, or escalated to full resolution
+PATH_FULL = "full"
+PATH_LOW_RES = "low_res"
+PATH_ESCALATED = "escalated"
+
+
+
+# Intra-op threads of an inference replica when the configuration leaves them automatic, see init_replica
+_replica_threads = 0
+
+
+def _build_version(version: ModelVersion):
+    """Build the engine of a model version, with the thread settings of the current configuration."""
+    config = load_inference_config(CONFIG_PATH)
+    intra_op_threads = config.intra_op_threads or _replica_threads
+    graph_cache_dir = resolve_config_relative(config.graph_cache_dir, CONFIG_PATH) if config.graph_cache_dir else None
+    return build_engine(replace(config, engine=version.engine, intra_op_threads=intra_op_threads), version.path, graph_cache_dir)
+
+
+# Model versions, and the one serving predictions
+registry = ModelRegistry(build=_build_version)
+
+# (engine, weights) selected by the configuration file the last time it was read
+_config_key = None
+_config_lock = threading.Lock()
+
+
+def _sync_config():
+    """
+    Register and activate the weights selected by the configuration file when it switches to another
+    engine or weights file, so editing the configuration still changes the model, like a call to `activate_version`.
+
+    Returns:
+        InferenceConfig: Current configuration
+    """
+    global _config_key
+    config = load_inference_config(CONFIG_PATH)
+    key = (config.engine, resolve_model_path(config, CONFIG_PATH, DEFAULT_MODEL_PATH))
+    if key != _config_key:
+        with _config_lock:
+            if key != _config_key:
+                engine, model_path = key
+                registry.activate(registry.register(model_path, engine).name)
+                _config_key = key
+    return config
 
 
 def get_model():
     """
-    Get or initialize the YOLO model instance (singleton pattern).
+    Get the inference engine of the active model version, loading it on first use.
+
+    Returns:
+        UltralyticsEngine or OnnxEngine: Initialized engine
+    """
+    _sync_config()
+    return registry.active()[1]
+
+
+def get_active_version() -> ModelVersion:
+    """
+    Active model version, without loading it.
+
+    Returns:
+        ModelVersion: Name, engine, path and fingerprint of the active weights
+    """
+    _sync_config()
+    return registry.active_version()
+
+
+def get_model_version() -> str:
+    """
+    Fingerprint of the active weights, without loading them.
+    Derived from the engine, the weights file name, its size and its mtime.
+
+    Returns:
+        str: Model version, e.g. "onnxruntime:yolo_best.onnx:10512345:1718000000"
+    """
+    return get_active_version().fingerprint
+
+
+def discover_versions(folder: str | None = None) -> list[str]:
+    """
+    Register the .pt and .onnx files of a folder as model versions, named after their file name.
+
+    Args:
+        folder: Folder to scan (defaults to MODEL_WEIGHTS_DIR)
+
+    Returns:
+        list: Names of the registered versions
+    """
+    _sync_config()
+    return registry.discover(folder or MODEL_WEIGHTS_DIR)
+
+
+def init_replica(threads: int, model_dir: str | None = None):
+    """
+    Prepare an inference replica process: size its thread pools to its share of the CPUs,
+    register the model versions and ship its metrics to the HTTP front end.
+
+    Args:
+        threads: Intra-op threads of the replica, used unless the configuration sets intra_op_threads
+        model_dir: Folder of the model versions (defaults to MODEL_WEIGHTS_DIR)
+    """
+    global _replica_threads
+    _replica_threads = threads
+    # Read by torch when the ultralytics engine is first imported
+    os.environ.setdefault("OMP_NUM_THREADS", str(threads))
+    metrics.start_capture()
+    discover_versions(model_dir)
+
+
+def load_version(name: str, runs: int = 1, image_sizes: list[int] | None = None, batch_sizes: list[int] | None = None) -> dict:
+    """
+    Load and warm up a model version without activating it.
+
+    Args:
+        name: Version name
+        runs: Number of warmup inferences per image size and batch size
+        image_sizes: Input sizes to warm up (see `warmup`)
+        batch_sizes: Batch sizes to warm up (defaults to 1)
 
     Returns:
-        YOLOClass: Initialized YOLO model
+        dict: Model load time and warmup time per image size, in seconds
+
+    Raises:
+        KeyError: If the version is not registered
     """
-    global _model_instance
-    if _model_instance is None:
-        # Get the path to this file's directory
-        current_dir = Path(__file__).parent
-        model_path = current_dir / "model_weights" / "yolo_best.pt"
-        _model_instance = YOLOClass(str(model_path))
-    return _model_instance
+    start = time.perf_counter()
+    model = registry.load(name)
+    load_seconds = time.perf_counter() - start
+    if load_inference_config(CONFIG_PATH).cascade_enabled:
+        # Warn when the version is loaded rather than at its first batch
+        supports_cascade(model)
 
+    return {
+        "model_load_seconds": load_seconds,
+        "warmup_seconds": _warmup_engine(model, runs, image_sizes, batch_sizes)
+    }
+
+
+def switch_version(name: str) -> str:
+    """
+    Atomically make a model version serve the next batches, once loaded and warmed up with `load_version`.
+    Batches already running finish on the previous version, so no request is dropped.
+
+    Args:
+        name: Version name
 
-def detect_ingredients(image_path: str) -> dict:
+    Returns:
+        str: Name of the activated version
+
+    Raises:
+        KeyError: If the version is not registered
+    """
+    _sync_config()
+    return registry.activate(name).name
+
+
+def registry_stats() -> dict:
+    """Snapshot of the model registry of this process, see ModelRegistry.stats."""
+    _sync_config()
+    return registry.stats()
+
+
+def unload_version(name: str):
+    """
+    Free the engine of an inactive model version.
+
+    Raises:
+        KeyError: If the version is not registered
+        ValueError: If the version is active
+    """
+    registry.unload(name)
+
+
+def warmup(runs: int = 1, image_sizes: list[int] | None = None, batch_sizes: list[int] | None = None) -> dict:
+    """
+    Load the model and run inferences on synthetic images, so the first real request
+    does not pay for weight loading and graph setup.
+
+    Args:
+        runs: Number of warmup inferences per image size and batch size
+        image_sizes: Input sizes to warm up (defaults to the configured image_size, and cascade_image_size if enabled)
+        batch_sizes: Batch sizes to warm up (defaults to 1)
+
+    Returns:
+        dict: Model load time and warmup time per image size, in seconds
+    """
+    start = time.perf_counter()
+    model = get_model()
+    load_seconds = time.perf_counter() - start
+
+    return {
+        "model_load_seconds": load_seconds,
+        "warmup_seconds": _warmup_engine(model, runs, image_sizes, batch_sizes)
+    }
+
+
+def _warmup_engine(model, runs: int, image_sizes: list[int] | None, batch_sizes: list[int] | None) -> dict:
+    """Run warmup inferences on synthetic images, returning the time spent per image size."""
+    config = load_inference_config(CONFIG_PATH)
+    rng = np.random.default_rng(0)
+    timings = {}
+    default_sizes = [config.cascade_image_size, config.image_size] if config.cascade_enabled else [config.image_size]
+    for image_size in image_sizes or default_sizes:
+        size_config = replace(config, image_size=image_size, save=False)
+        size_start = time.perf_counter()
+        for batch_size in batch_sizes or [1]:
+            images = [rng.integers(0, 256, (image_size, image_size, 3), dtype=np.uint8) for _ in range(batch_size)]
+            for _ in range(runs):
+                model.predict(images, size_config)
+        timings[image_size] = time.perf_counter() - size_start
+        logger.info(f"Warmed up image size {image_size} in {timings[image_size]:.2f}s")
+    return timings
+
+
+def detect_ingredients(image_path: str, top_k: int | None = None, include_boxes: bool = False) -> list:
     """
     Detect ingredients from an image using YOLO model.
 
@@ -37,9 +253,12 @@ def detect_ingredients(image_path: str) -> dict:
 
     Args:
         image_path: Path to the image file (absolute or relative)
+        top_k: Keep only the k most confident ingredients (None keeps all)
+        include_boxes: Add the xyxy box of the most confident detection of each ingredient
 
     Returns:
-        dict: Detected ingredients with confidence scores in the format:
+        list: Detected ingredients with confidence scores, by decreasing confidence:
+            [{"name": "Tomato", "confidence": 0.95}, ...]
 
     Raises:
         FileNotFoundError: If the image file doesn't exist
@@ -51,46 +270,210 @@ def detect_ingredients(image_path: str) -> dict:
     if not os.path.exists(image_path):
         raise FileNotFoundError(f"Image not found at path: {image_path}")
 
+    result = detect_ingredients_batch([image_path], top_k=top_k, include_boxes=include_boxes)[0]
+    if isinstance(result, Exception):
+        print(f"Error in detect_ingredients: {result}")
+        raise result
+    return result
+
+
+def detect_ingredients_batch(images: list, top_k: int | None = None, include_boxes: bool = False) -> list:
+    """
+    Detect ingredients from several images with a single batched forward pass.
+
+    Args:
+        images: Paths to image files, or already decoded BGR arrays (np.ndarray)
+        top_k: Keep only the k most confident ingredients per image (None keeps all)
+        include_boxes: Add the box of the most confident detection of each ingredient
+
+    Returns:
+        list: One entry per image, in the same order as the input: its ingredients list (same format as
+            `detect_ingredients`), or the exception it raised (FileNotFoundError for a missing file), so a bad
+            image does not fail the others
+    """
+    results: list = [None] * len(images)
+    valid = []
+    for index, image in enumerate(images):
+        if isinstance(image, (str, os.PathLike)) and not os.path.exists(image):
+            results[index] = FileNotFoundError(f"Image not found at path: {image}")
+        else:
+            valid.append(index)
+    if not valid:
+        return results
+
     try:
-        # Get model instance
-        model = get_model()
-
-        # Get config path
-        current_dir = Path(__file__).parent
-        config_path = current_dir / "config" / "config_yolo_inf.yaml"
-        
-        # Run prediction
-        logger.info(f"Loading config from {config_path}")
-        results = model.predict(
-            config_path=str(config_path),
-            image_path=image_path,
-            project_folder=None  # Don't save results
-        )
-
-        # Parse results
-        ingredients_map = {}
-        if results and len(results) > 0:
-            result = results[0]
-            if hasattr(result, 'boxes') and len(result.boxes) > 0:
-                boxes = result.boxes
-                class_ids = boxes.cls.cpu().numpy()
-                confidences = boxes.conf.cpu().numpy()
-                names = result.names
-
-                for i, class_id in enumerate(class_ids):
-                    ingredient_name = names[int(class_id)]
-                    confidence = float(confidences[i])
-                    if ingredient_name not in ingredients_map or confidence > ingredients_map[ingredient_name]:
-                        ingredients_map[ingredient_name] = confidence
-
-        # Convert the dictionary into a list of dictionaries to return
-        unique_ingredients_list = [
-            {"name": name, "confidence": conf} 
-            for name, conf in ingredients_map.items()
+        batch = detect_ingredients_with_paths([images[i] for i in valid], top_k, include_boxes)
+        for index, (ingredients, _, _) in zip(valid, batch):
+            results[index] = ingredients
+    except Exception as e:
+        # A corrupt file fails the whole forward pass: run the images one by one to find it
+        logger.warning(f"Batch of {len(valid)} images failed ({e}), retrying them one by one")
+        for index in valid:
+            try:
+                results[index] = detect_ingredients_with_paths([images[index]], top_k, include_boxes)[0][0]
+            except Exception as image_error:
+                results[index] = image_error
+    return results
+
+
+def detect_ingredients_with_paths(images: list, top_k: int | None = None, include_boxes: bool = False) -> list:
+    """
+    Same as `detect_ingredients_batch`, also reporting the inference path taken by every image
+    and the model version that served the batch.
+
+    Args:
+        images: Paths to image files, or already decoded BGR arrays (np.ndarray)
+        top_k: Keep only the k most confident ingredients per image (None keeps all)
+        include_boxes: Add the box of the most confident detection of each ingredient
+
+    Returns:
+        list: One (ingredients, path, ModelVersion) tuple per image, path being PATH_FULL, PATH_LOW_RES or PATH_ESCALATED
+    """
+    # Get the cached configuration, then the active version once, so the whole batch runs on it
+    config = _sync_config()
+    version, model = registry.active()
+
+    # Run prediction
+    results, paths = run_cascade(model, list(images), config)
+
+    with timed(STAGE_POSTPROCESS):
+        batch_ingredients = [summarize_detections(result, top_k, include_boxes) for result in results]
+    metrics.observe_batch([len(result) for result in results], paths)
+    logger.info(f"Detected ingredients on a batch of {len(batch_ingredients)} images with model {version.name}")
+    return [(ingredients, path, version) for ingredients, path in zip(batch_ingredients, paths)]
+
+
+def needs_escalation(result: Detections, config) -> bool:
+    """
+    Whether the low-resolution detections of an image are too ambiguous to be kept.
+
+    Args:
+        result: Detections of the low-resolution pass
+        config: Inference configuration, with the cascade thresholds
+
+    Returns:
+        bool: True if the image must be run again at full resolution
+    """
+    if len(result) == 0:
+        return config.cascade_escalate_empty
+    if len(result) > config.cascade_max_detections:
+        return True
+    return bool((result.scores < config.cascade_accept_confidence).any())
+
+
+# Engines already warned about running without the cascade
+_cascade_warned = weakref.WeakSet()
+
+
+def supports_cascade(model) -> bool:
+    """
+    Whether an engine can run the low-resolution pass of the cascade. An ONNX model exported with a fixed input
+    size runs every pass at that size: the cascade would only run ambiguous images twice at full resolution.
+
+    Args:
+        model: Inference engine
+
+    Returns:
+        bool: False for engines with a fixed input size (a warning is logged once per engine)
+    """
+    fixed_size = getattr(model, "fixed_size", None)
+    if fixed_size is None:
+        return True
+    if model not in _cascade_warned:
+        _cascade_warned.add(model)
+        logger.warning(f"Model has a fixed input size {fixed_size}: cascade disabled, export it with dynamic=True to use it")
+    return False
+
+
+def run_cascade(model, images: list, config) -> tuple[list, list]:
+    """
+    Run the model at `cascade_image_size` first, and again at `image_size` only on the ambiguous images.
+    With the cascade disabled, or an engine that cannot change its input size, a single full-resolution pass is run.
+
+    Args:
+        model: Inference engine
+        images: Paths to image files or BGR arrays
+        config: Inference configuration
+
+    Returns:
+        tuple: (one Detections per image, one inference path per image)
+    """
+    if not config.cascade_enabled or not supports_cascade(model):
+        return model.predict(images, config), [PATH_FULL] * len(images)
+
+    results = model.predict(images, replace(config, image_size=config.cascade_image_size))
+    paths = [PATH_LOW_RES] * len(images)
+
+    escalated = [i for i, result in enumerate(results) if needs_escalation(result, config)]
+    if escalated:
+        for i, result in zip(escalated, model.predict([images[i] for i in escalated], config)):
+            results[i] = result
+            paths[i] = PATH_ESCALATED
+    return results, paths
+
+
+def summarize_detections(result: Detections, top_k: int | None = None, include_boxes: bool = False) -> list:
+    """
+    Reduce the detections of a single image to one entry per ingredient, keeping its highest confidence.
+
+    The per-class maximum is a NumPy scatter-max over the class ids, so the cost does not depend
+    on Python loops over the (possibly hundreds of) candidate boxes.
+
+    Args:
+        result: Detections of one image, as returned by the engine
+        top_k: Keep only the k most confident ingredients (None keeps all)
+        include_boxes: Add the xyxy box of the winning detection as "box"
+
+    Returns:
+        list: Ingredients by decreasing confidence: [{"name", "confidence"[, "box"]}, ...]
+    """
+    if len(result) == 0:
+        return []
+
+    class_ids = result.class_ids.astype(np.int64, copy=False)
+    scores = result.scores.astype(np.float32, copy=False)
+
+    # Scatter-max: best score of every class
+    best = np.full(int(class_ids.max()) + 1, -np.inf, dtype=np.float32)
+    np.maximum.at(best, class_ids, scores)
+
+    # Winning detection of every class: first box reaching its class maximum
+    candidates = np.flatnonzero(scores == best[class_ids])
+    _, first = np.unique(class_ids[candidates], return_index=True)
+    winners = candidates[first]
+
+    # Sort by decreasing confidence, then keep the top k
+    winners = winners[np.argsort(-scores[winners], kind="stable")][:top_k]
+
+    names = result.names
+    winner_classes = class_ids[winners].tolist()
+    winner_scores = scores[winners].tolist()
+    if not include_boxes:
+        return [
+            {"name": names[class_id], "confidence": confidence}
+            for class_id, confidence in zip(winner_classes, winner_scores)
         ]
-        logger.info(f"Detected {len(unique_ingredients_list)} ingredients")
-        return unique_ingredients_list
 
-    except Exception as e:
-        print(f"Error in detect_ingredients: {e}")
-        raise
+    winner_boxes = result.boxes[winners].tolist()
+    return [
+        {"name": names[class_id], "confidence": confidence, "box": box}
+        for class_id, confidence, box in zip(winner_classes, winner_scores, winner_boxes)
+    ]
+
+
+def select_ingredients(ingredients: list, top_k: int | None = None, include_boxes: bool = False) -> list:
+    """
+    Apply per-request options to a full ingredients list (as returned with include_boxes=True).
+
+    Args:
+        ingredients: Ingredients by decreasing confidence, with boxes
+        top_k: Keep only the k most confident ingredients (None keeps all)
+        include_boxes: Keep the boxes
+
+    Returns:
+        list: Ingredients matching the options
+    """
+    selected = ingredients[:top_k]
+    if include_boxes:
+        return selected
+    return [{"name": ingredient["name"], "confidence": ingredient["confidence"]} for ingredient in selected]
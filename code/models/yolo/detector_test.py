@@ -0,0 +1,165 @@
+# External imports
+import os
+import tempfile
+import unittest
+from dataclasses import replace
+from unittest import mock
+import numpy as np
+import detector
+from engines import Detections
+from inference_config import InferenceConfig
+from detector import summarize_detections, select_ingredients, needs_escalation, run_cascade, PATH_FULL, PATH_LOW_RES, PATH_ESCALATED
+
+
+class TestDetectionSummary(unittest.TestCase):
+    """
+    This class tests the reduction of detections to one entry per ingredient.
+    """
+
+
+    def setUp(self):
+        self.detections = Detections(
+            boxes=np.arange(20, dtype=np.float32).reshape(5, 4),
+            scores=np.array([0.5, 0.8, 0.7, 0.9, 0.3], dtype=np.float32),
+            class_ids=np.array([2, 0, 2, 1, 0]),
+            names={0: "Tomato", 1: "Banana", 2: "Beef"},
+        )
+
+
+    def test_max_confidence_per_ingredient(self):
+        """
+        Tests that each ingredient appears once, with its highest confidence, by decreasing confidence.
+        """
+
+        ingredients = summarize_detections(self.detections)
+        self.assertListEqual([i["name"] for i in ingredients], ["Banana", "Tomato", "Beef"])
+        np.testing.assert_allclose([i["confidence"] for i in ingredients], [0.9, 0.8, 0.7], rtol=1e-6)
+        self.assertNotIn("box", ingredients[0])
+
+
+    def test_top_k_and_boxes(self):
+        """
+        Tests the top-k selection and the box of the winning detection.
+        """
+
+        ingredients = summarize_detections(self.detections, top_k=2, include_boxes=True)
+        self.assertEqual(len(ingredients), 2)
+        self.assertListEqual(ingredients[0]["box"], [12.0, 13.0, 14.0, 15.0])
+        self.assertListEqual(ingredients[1]["box"], [4.0, 5.0, 6.0, 7.0])
+        self.assertListEqual(select_ingredients(ingredients, top_k=1), [{"name": "Banana", "confidence": ingredients[0]["confidence"]}])
+
+
+    def test_no_detections(self):
+        """
+        Tests that an image without detections gives an empty list.
+        """
+
+        self.assertListEqual(summarize_detections(Detections.empty({0: "Tomato"})), [])
+
+
+class TestCascade(unittest.TestCase):
+    """
+    This class tests the cascade between the low-resolution and the full-resolution passes.
+    """
+
+
+    class FakeEngine:
+        """Engine returning preset detections per input size, recording the calls."""
+
+        def __init__(self, by_size):
+            self.by_size = by_size
+            self.calls = []
+
+        def predict(self, images, config):
+            self.calls.append((config.image_size, len(images)))
+            return [self.by_size[config.image_size][image] for image in images]
+
+
+    def detections(self, scores):
+        return Detections(
+            boxes=np.zeros((len(scores), 4), dtype=np.float32),
+            scores=np.array(scores, dtype=np.float32),
+            class_ids=np.arange(len(scores)),
+            names={i: f"item{i}" for i in range(10)},
+        )
+
+
+    def test_escalation_rules(self):
+        """
+        Tests that ambiguous, crowded and (optionally) empty low-resolution results are escalated.
+        """
+
+        config = InferenceConfig(model_path=None, image_size=640, conf_threshold=0.25, cascade_image_size=320,
+                                 cascade_accept_confidence=0.6, cascade_max_detections=2)
+        self.assertFalse(needs_escalation(self.detections([0.9, 0.7]), config))
+        self.assertTrue(needs_escalation(self.detections([0.9, 0.4]), config))
+        self.assertTrue(needs_escalation(self.detections([0.9, 0.9, 0.9]), config))
+        self.assertFalse(needs_escalation(self.detections([]), config))
+        self.assertTrue(needs_escalation(self.detections([]), replace(config, cascade_escalate_empty=True)))
+
+
+    def test_only_ambiguous_images_are_escalated(self):
+        """
+        Tests that a batch runs once at low resolution and only its ambiguous images run at full resolution.
+        """
+
+        low = {"clear": self.detections([0.95]), "ambiguous": self.detections([0.3])}
+        full = {"ambiguous": self.detections([0.8, 0.7])}
+        engine = self.FakeEngine({320: low, 640: full})
+        config = InferenceConfig(model_path=None, image_size=640, conf_threshold=0.25, cascade_image_size=320)
+
+        results, paths = run_cascade(engine, ["clear", "ambiguous"], config)
+        self.assertEqual(paths, [PATH_LOW_RES, PATH_ESCALATED])
+        self.assertEqual(len(results[1]), 2)
+        self.assertEqual(engine.calls, [(320, 2), (640, 1)])
+
+        engine.calls.clear()
+        _, paths = run_cascade(engine, ["ambiguous"], replace(config, cascade_image_size=0))
+        self.assertEqual(paths, [PATH_FULL])
+        self.assertEqual(engine.calls, [(640, 1)])
+
+
+    def test_fixed_size_engine_disables_cascade(self):
+        """
+        Tests that an engine with a fixed input size runs a single full pass instead of two at the same size.
+        """
+
+        engine = self.FakeEngine({640: {"clear": self.detections([0.95]), "ambiguous": self.detections([0.3])}})
+        engine.fixed_size = 640
+        config = InferenceConfig(model_path=None, image_size=640, conf_threshold=0.25, cascade_image_size=320)
+
+        with self.assertLogs("detector", level="WARNING"):
+            results, paths = run_cascade(engine, ["clear", "ambiguous"], config)
+        self.assertEqual(paths, [PATH_FULL, PATH_FULL])
+        self.assertEqual(len(results), 2)
+        self.assertEqual(engine.calls, [(640, 2)])
+
+
+class TestBatchErrors(unittest.TestCase):
+    """
+    This class tests that a bad image of a batch does not fail the other images.
+    """
+
+
+    def test_missing_and_corrupt_images(self):
+        """
+        Tests that missing files are reported without inference and a corrupt file only fails itself.
+        """
+
+        def with_paths(images, top_k=None, include_boxes=False):
+            if any(image.endswith("corrupt.jpg") for image in images):
+                raise ValueError("cannot decode image")
+            return [([{"name": os.path.basename(image), "confidence": 0.9}], PATH_FULL, None) for image in images]
+
+        with tempfile.TemporaryDirectory() as folder:
+            good, corrupt = os.path.join(folder, "good.jpg"), os.path.join(folder, "corrupt.jpg")
+            for path in (good, corrupt):
+                open(path, "wb").close()
+            with mock.patch.object(detector, "detect_ingredients_with_paths", side_effect=with_paths) as run:
+                results = detector.detect_ingredients_batch([good, os.path.join(folder, "missing.jpg"), corrupt])
+
+        self.assertEqual(results[0], [{"name": "good.jpg", "confidence": 0.9}])
+        self.assertIsInstance(results[1], FileNotFoundError)
+        self.assertIsInstance(results[2], ValueError)
+        # The batch of the two existing files, then each of them alone
+        self.assertEqual([len(call.args[0]) for call in run.call_args_list], [2, 1, 1])
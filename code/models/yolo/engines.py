@@ -0,0 +1,148 @@
+"""
+Pluggable inference engines behind `detect_ingredients`.
+Every engine takes a batch of images and returns one `Detections` per image.
+"""
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+
+from inference_config import InferenceConfig, ENGINE_ULTRALYTICS, ENGINE_ONNXRUNTIME
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Detections:
+    """
+    Detections of a single image, after confidence filtering and NMS.
+
+    Attributes:
+        boxes: (N, 4) float array of xyxy boxes, in source image pixels
+        scores: (N,) float array of confidences
+        class_ids: (N,) int array of class indices
+        names: Mapping from class index to ingredient name
+    """
+    boxes: np.ndarray
+    scores: np.ndarray
+    class_ids: np.ndarray
+    names: dict
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    @classmethod
+    def empty(cls, names: dict) -> "Detections":
+        return cls(
+            boxes=np.zeros((0, 4), dtype=np.float32),
+            scores=np.zeros((0,), dtype=np.float32),
+            class_ids=np.zeros((0,), dtype=np.int64),
+            names=names,
+        )
+
+
+class UltralyticsEngine:
+    """
+    Engine running the model through ultralytics (and torch), via `YOLOClass`.
+    """
+    name = ENGINE_ULTRALYTICS
+
+    def __init__(self, model_path: str):
+        """
+        Args:
+            model_path: Path to the model weights (.pt or .onnx)
+        """
+        # ultralytics pulls in torch: only import it when this engine is selected
+        from yolo_model import YOLOClass
+
+        self.model_path = model_path
+        self.model = YOLOClass(model_path)
+
+    def predict(self, images: list, config: InferenceConfig) -> list[Detections]:
+        """
+        Run the model on a batch of images.
+
+        Args:
+            images: Paths to image files or BGR arrays
+            config: Inference configuration
+
+        Returns:
+            list: One Detections per image
+        """
+        results = self.model.predict(config_path=config, image_path=list(images), project_folder=None)
+        return [self._to_detections(result) for result in results]
+
+    @staticmethod
+    def _to_detections(result) -> Detections:
+        names = dict(result.names)
+        if not hasattr(result, 'boxes') or len(result.boxes) == 0:
+            return Detections.empty(names)
+        boxes = result.boxes
+        return Detections(
+            boxes=boxes.xyxy.cpu().numpy(),
+            scores=boxes.conf.cpu().numpy(),
+            class_ids=boxes.cls.cpu().numpy().astype(np.int64),
+            names=names,
+        )
+
+
+def resolve_model_path(config: InferenceConfig, config_path: str, default_path: str) -> str:
+    """
+    Path of the weights for the configured engine.
+
+    The ONNX Runtime engine uses `model_path` from the configuration, resolved relative to the
+    configuration file. The ultralytics engine keeps using the default PyTorch weights.
+
+    Args:
+        config: Inference configuration
+        config_path: Path of the configuration file
+        default_path: Weights used when the configuration does not point to any
+
+    Returns:
+        str: Absolute path to the weights
+    """
+    if config.engine == ENGINE_ONNXRUNTIME and config.model_path:
+        return resolve_config_relative(config.model_path, config_path)
+    return default_path
+
+
+def resolve_config_relative(path: str, config_path: str) -> str:
+    """
+    Absolute path of a path written in the configuration file, relative paths being relative to that file.
+
+    Args:
+        path: Path from the configuration
+        config_path: Path of the configuration file
+
+    Returns:
+        str: Absolute path
+    """
+    resolved = Path(path)
+    if not resolved.is_absolute():
+        resolved = (Path(config_path).parent / resolved).resolve()
+    return str(resolved)
+
+
+def build_engine(config: InferenceConfig, model_path: str, graph_cache_dir: str | None = None):
+    """
+    Instantiate the engine selected by the configuration.
+
+    Args:
+        config: Inference configuration
+        model_path: Path to the model weights
+        graph_cache_dir: Folder of the optimized ONNX Runtime graphs (None disables the cache)
+
+    Returns:
+        UltralyticsEngine or OnnxEngine
+    """
+    logger.info(f"Building {config.engine} engine from {model_path}")
+    if config.engine == ENGINE_ONNXRUNTIME:
+        from onnx_engine import OnnxEngine
+        return OnnxEngine(
+            model_path,
+            intra_op_threads=config.intra_op_threads,
+            inter_op_threads=config.inter_op_threads,
+            graph_cache_dir=graph_cache_dir,
+        )
+    return UltralyticsEngine(model_path)
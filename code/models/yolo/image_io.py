@@ -0,0 +1,109 @@
+"""
+In-memory image decoding for the Models Service.
+Uploaded bytes are decoded straight into a NumPy array, without going through the filesystem.
+"""
+import cv2
+import numpy as np
+
+# JPEG start-of-frame markers (baseline, progressive, lossless...), which carry the image size
+_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+# Reduced-resolution decoding supported natively by the JPEG decoder (scale factor -> imdecode flag)
+_REDUCED_FLAGS = {
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+}
+
+
+def jpeg_dimensions(data: bytes) -> tuple[int, int] | None:
+    """
+    Read the size of a JPEG image from its header, without decoding it.
+
+    Args:
+        data: Encoded image bytes
+
+    Returns:
+        tuple: (width, height), or None if the data is not a JPEG or the header is truncated
+    """
+    if len(data) < 4 or data[0] != 0xFF or data[1] != 0xD8:
+        return None
+
+    i = 2
+    length = len(data)
+    while i + 4 <= length:
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        # Fill bytes and standalone markers have no length field
+        if marker == 0xFF:
+            i += 1
+            continue
+        if marker in (0x01,) or 0xD0 <= marker <= 0xD7:
+            i += 2
+            continue
+        segment_length = (data[i + 2] << 8) | data[i + 3]
+        if marker in _SOF_MARKERS:
+            if i + 9 > length:
+                return None
+            height = (data[i + 5] << 8) | data[i + 6]
+            width = (data[i + 7] << 8) | data[i + 8]
+            return width, height
+        i += 2 + segment_length
+    return None
+
+
+def reduction_factor(width: int, height: int, target_size: int) -> int:
+    """
+    Largest JPEG scale factor that keeps the long side of the image at least `target_size`.
+
+    Args:
+        width: Source image width
+        height: Source image height
+        target_size: Network input size (the long side is resized to it)
+
+    Returns:
+        int: 1, 2, 4 or 8
+    """
+    long_side = max(width, height)
+    for factor in sorted(_REDUCED_FLAGS, reverse=True):
+        if long_side // factor >= target_size:
+            return factor
+    return 1
+
+
+def decode_image(data: bytes, target_size: int | None = None) -> tuple[np.ndarray, int]:
+    """
+    Decode an encoded image (JPEG, PNG, BMP...) into a BGR array.
+
+    Large JPEG photos are decoded at a reduced resolution when the network input size is
+    far smaller than the source, which skips most of the IDCT work.
+
+    Args:
+        data: Encoded image bytes
+        target_size: Network input size, used to pick the JPEG reduction factor (None decodes at full size)
+
+    Returns:
+        tuple: (image of shape (height, width, 3), dtype uint8, BGR channel order;
+            reduction factor, i.e. source pixels per decoded pixel)
+
+    Raises:
+        ValueError: If the data cannot be decoded as an image
+    """
+    if not data:
+        raise ValueError("Empty image")
+
+    flag = cv2.IMREAD_COLOR
+    factor = 1
+    if target_size:
+        dimensions = jpeg_dimensions(data)
+        if dimensions is not None:
+            factor = reduction_factor(*dimensions, target_size)
+            if factor > 1:
+                flag = _REDUCED_FLAGS[factor]
+
+    # frombuffer wraps the bytes without copying them
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), flag)
+    if image is None:
+        raise ValueError("Cannot decode image: unsupported or corrupted file")
+    return image, factor
@@ -0,0 +1,64 @@
+# External imports
+import unittest
+import cv2
+import numpy as np
+from image_io import decode_image, jpeg_dimensions, reduction_factor
+
+
+class TestImageDecoding(unittest.TestCase):
+    """
+    This class tests the in-memory decoding of uploaded images.
+    """
+
+
+    def encode(self, width, height, ext=".jpg"):
+        image = np.random.default_rng(0).integers(0, 256, (height, width, 3), dtype=np.uint8)
+        ok, encoded = cv2.imencode(ext, image)
+        self.assertTrue(ok)
+        return encoded.tobytes()
+
+
+    def test_jpeg_dimensions(self):
+        """
+        Tests that the JPEG header is parsed without decoding the image.
+        """
+
+        self.assertEqual(jpeg_dimensions(self.encode(1200, 900)), (1200, 900))
+        self.assertIsNone(jpeg_dimensions(self.encode(100, 100, ".png")))
+        self.assertIsNone(jpeg_dimensions(b"not an image"))
+
+
+    def test_reduction_factor(self):
+        """
+        Tests that the long side never gets smaller than the network input size.
+        """
+
+        self.assertEqual(reduction_factor(4032, 3024, 640), 4)
+        self.assertEqual(reduction_factor(1280, 960, 640), 2)
+        self.assertEqual(reduction_factor(800, 600, 640), 1)
+        self.assertEqual(reduction_factor(6000, 4000, 320), 8)
+
+
+    def test_reduced_decoding(self):
+        """
+        Tests that large JPEG photos are decoded at a reduced resolution.
+        """
+
+        data = self.encode(2560, 1920)
+        image, factor = decode_image(data)
+        self.assertEqual((image.shape, factor), ((1920, 2560, 3), 1))
+        image, factor = decode_image(data, target_size=640)
+        self.assertEqual((image.shape, factor), ((480, 640, 3), 4))
+        image, factor = decode_image(self.encode(300, 200, ".png"), target_size=640)
+        self.assertEqual((image.shape, factor), ((200, 300, 3), 1))
+
+
+    def test_invalid_image(self):
+        """
+        Tests that corrupted uploads are rejected.
+        """
+
+        with self.assertRaises(ValueError):
+            decode_image(b"")
+        with self.assertRaises(ValueError):
+            decode_image(b"definitely not an image")
@@ -0,0 +1,238 @@
+"""
+Typed inference configuration.
+The YAML file is parsed once into an immutable object and reloaded only when it changes on disk.
+"""
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, asdict
+
+import yaml
+
+logger = logging.getLogger(__name__)
+
+# Inference engines that can be selected with the `engine` field
+ENGINE_ULTRALYTICS = "ultralytics"
+ENGINE_ONNXRUNTIME = "onnxruntime"
+ENGINES = (ENGINE_ULTRALYTICS, ENGINE_ONNXRUNTIME)
+
+# Minimum time between two mtime checks of the same file, so the hot path stays a dictionary lookup
+MTIME_CHECK_INTERVAL_S = 1.0
+
+
+@dataclass(frozen=True)
+class InferenceConfig:
+    """
+    Validated content of `config_yolo_inf.yaml`.
+
+    Attributes:
+        model_path: Path to the model weights (possibly None)
+        image_size: Input size of the network, in pixels
+        conf_threshold: Minimum confidence of a detection
+        save: Whether annotated images are saved
+        engine: Inference engine, "ultralytics" or "onnxruntime"
+        iou_threshold: IoU threshold of the non-maximum suppression
+        max_detections: Maximum number of detections per image
+        intra_op_threads: ONNX Runtime threads inside an operator (0 = automatic)
+        inter_op_threads: ONNX Runtime threads across operators (0 = automatic)
+        cascade_image_size: Input size of the fast low-resolution pass (0 disables the cascade)
+        cascade_accept_confidence: Low-resolution detections must all reach this confidence to skip the full pass
+        cascade_max_detections: Low-resolution passes with more detections than this are escalated
+        cascade_escalate_empty: Escalate images without any low-resolution detection
+        graph_cache_dir: Folder where ONNX Runtime saves optimized graphs, so later starts skip graph optimization
+            (relative to the configuration file, None disables the cache)
+    """
+    model_path: str | None
+    image_size: int
+    conf_threshold: float
+    save: bool = False
+    engine: str = ENGINE_ULTRALYTICS
+    iou_threshold: float = 0.7
+    max_detections: int = 300
+    intra_op_threads: int = 0
+    inter_op_threads: int = 0
+    cascade_image_size: int = 0
+    cascade_accept_confidence: float = 0.6
+    cascade_max_detections: int = 5
+    cascade_escalate_empty: bool = False
+    graph_cache_dir: str | None = None
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "InferenceConfig":
+        """
+        Build and validate a configuration from the parsed YAML.
+
+        Args:
+            data: Parsed YAML mapping
+
+        Returns:
+            InferenceConfig: Validated configuration
+
+        Raises:
+            ValueError: If a field is missing or has an invalid value
+        """
+        if not isinstance(data, dict):
+            raise ValueError("Inference configuration must be a mapping")
+
+        try:
+            image_size = int(data["image_size"])
+            conf_threshold = float(data["conf_threshold"])
+            iou_threshold = float(data.get("iou_threshold", cls.iou_threshold))
+            max_detections = int(data.get("max_detections", cls.max_detections))
+            intra_op_threads = int(data.get("intra_op_threads", cls.intra_op_threads))
+            inter_op_threads = int(data.get("inter_op_threads", cls.inter_op_threads))
+            cascade_image_size = int(data.get("cascade_image_size", cls.cascade_image_size))
+            cascade_accept_confidence = float(data.get("cascade_accept_confidence", cls.cascade_accept_confidence))
+            cascade_max_detections = int(data.get("cascade_max_detections", cls.cascade_max_detections))
+        except KeyError as e:
+            raise ValueError(f"Missing inference configuration field: {e.args[0]}")
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Invalid inference configuration value: {e}")
+
+        if image_size <= 0:
+            raise ValueError(f"image_size must be positive, got {image_size}")
+        if not 0.0 <= conf_threshold <= 1.0:
+            raise ValueError(f"conf_threshold must be in [0, 1], got {conf_threshold}")
+        if not 0.0 <= iou_threshold <= 1.0:
+            raise ValueError(f"iou_threshold must be in [0, 1], got {iou_threshold}")
+        if max_detections <= 0:
+            raise ValueError(f"max_detections must be positive, got {max_detections}")
+        if intra_op_threads < 0 or inter_op_threads < 0:
+            raise ValueError("intra_op_threads and inter_op_threads must be >= 0")
+        if cascade_image_size < 0:
+            raise ValueError(f"cascade_image_size must be >= 0, got {cascade_image_size}")
+        if not 0.0 <= cascade_accept_confidence <= 1.0:
+            raise ValueError(f"cascade_accept_confidence must be in [0, 1], got {cascade_accept_confidence}")
+        if cascade_max_detections < 0:
+            raise ValueError(f"cascade_max_detections must be >= 0, got {cascade_max_detections}")
+
+        engine = str(data.get("engine", cls.engine))
+        if engine not in ENGINES:
+            raise ValueError(f"engine must be one of {ENGINES}, got {engine!r}")
+
+        model_path = data.get("model_path")
+        graph_cache_dir = data.get("graph_cache_dir")
+        return cls(
+            model_path=str(model_path) if model_path is not None else None,
+            image_size=image_size,
+            conf_threshold=conf_threshold,
+            save=bool(data.get("save", False)),
+            engine=engine,
+            iou_threshold=iou_threshold,
+            max_detections=max_detections,
+            intra_op_threads=intra_op_threads,
+            inter_op_threads=inter_op_threads,
+            cascade_image_size=cascade_image_size,
+            cascade_accept_confidence=cascade_accept_confidence,
+            cascade_max_detections=cascade_max_detections,
+            cascade_escalate_empty=bool(data.get("cascade_escalate_empty", cls.cascade_escalate_empty)),
+            graph_cache_dir=str(graph_cache_dir) if graph_cache_dir else None,
+        )
+
+    @classmethod
+    def from_yaml(cls, config_path: str) -> "InferenceConfig":
+        """
+        Read and validate a configuration file.
+
+        Args:
+            config_path: Path to the YAML file
+
+        Returns:
+            InferenceConfig: Validated configuration
+        """
+        with open(config_path, 'r') as f:
+            try:
+                data = yaml.safe_load(f)
+            except yaml.YAMLError as e:
+                raise ValueError(f"Cannot parse {config_path}: {e}")
+        return cls.from_dict(data)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @property
+    def cascade_enabled(self) -> bool:
+        return 0 < self.cascade_image_size < self.image_size
+
+
+@dataclass
+class _CacheEntry:
+    config: InferenceConfig
+    mtime_ns: int
+    checked_at: float
+
+
+_cache: dict[str, _CacheEntry] = {}
+_lock = threading.Lock()
+
+
+def load_inference_config(config_path: str) -> InferenceConfig:
+    """
+    Get the configuration of a file, parsing it only the first time or after it changed.
+
+    Args:
+        config_path: Path to the YAML file
+
+    Returns:
+        InferenceConfig: Current configuration
+
+    Raises:
+        FileNotFoundError: If the file does not exist and was never loaded
+        ValueError: If the file is invalid and was never loaded
+    """
+    entry = _cache.get(config_path)
+    now = time.monotonic()
+    if entry is not None and now - entry.checked_at < MTIME_CHECK_INTERVAL_S:
+        return entry.config
+
+    with _lock:
+        entry = _cache.get(config_path)
+        if entry is None:
+            return _load(config_path, now).config
+
+        try:
+            mtime_ns = os.stat(config_path).st_mtime_ns
+        except OSError as e:
+            # Keep serving with the last good configuration
+            logger.error(f"Cannot stat inference config {config_path}: {e}")
+            entry.checked_at = now
+            return entry.config
+
+        if mtime_ns == entry.mtime_ns:
+            entry.checked_at = now
+            return entry.config
+
+        try:
+            return _load(config_path, now).config
+        except (OSError, ValueError) as e:
+            logger.error(f"Invalid inference config {config_path}, keeping the previous one: {e}")
+            entry.mtime_ns = mtime_ns
+            entry.checked_at = now
+            return entry.config
+
+
+def reload_inference_config(config_path: str) -> InferenceConfig:
+    """
+    Force a reload of a configuration file, regardless of its mtime.
+
+    Args:
+        config_path: Path to the YAML file
+
+    Returns:
+        InferenceConfig: Newly loaded configuration
+
+    Raises:
+        FileNotFoundError, ValueError: If the file cannot be loaded (the previous configuration is kept)
+    """
+    with _lock:
+        return _load(config_path, time.monotonic()).config
+
+
+def _load(config_path: str, now: float) -> _CacheEntry:
+    mtime_ns = os.stat(config_path).st_mtime_ns
+    config = InferenceConfig.from_yaml(config_path)
+    entry = _CacheEntry(config=config, mtime_ns=mtime_ns, checked_at=now)
+    _cache[config_path] = entry
+    logger.info(f"Loaded inference config from {config_path}: {config}")
+    return entry
@@ -0,0 +1,72 @@
+# External imports
+import os
+import tempfile
+import unittest
+import inference_config
+from inference_config import InferenceConfig, load_inference_config, reload_inference_config
+
+
+class TestInferenceConfig(unittest.TestCase):
+    """
+    This class tests the parsing, validation and hot reload of the inference configuration.
+    """
+
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.config_path = os.path.join(self.tmp_dir.name, "config_yolo_inf.yaml")
+        self.write_config(640, 0.25)
+
+
+    def tearDown(self):
+        inference_config._cache.pop(self.config_path, None)
+        self.tmp_dir.cleanup()
+
+
+    def write_config(self, image_size, conf_threshold, mtime=None):
+        with open(self.config_path, "w") as f:
+            f.write(f"model_path: null\nimage_size: {image_size}\nconf_threshold: {conf_threshold}\nsave: False\n")
+        if mtime is not None:
+            os.utime(self.config_path, (mtime, mtime))
+
+
+    def test_validation(self):
+        """
+        Tests that invalid values are rejected.
+        """
+
+        with self.assertRaises(ValueError):
+            InferenceConfig.from_dict({"image_size": 640})
+        with self.assertRaises(ValueError):
+            InferenceConfig.from_dict({"image_size": 640, "conf_threshold": 1.5})
+        with self.assertRaises(ValueError):
+            InferenceConfig.from_dict({"image_size": -1, "conf_threshold": 0.5})
+
+
+    def test_cached_until_mtime_changes(self):
+        """
+        Tests that the file is parsed once and reloaded only when its mtime changes.
+        """
+
+        config = load_inference_config(self.config_path)
+        self.assertEqual(config.image_size, 640)
+        self.assertIs(load_inference_config(self.config_path), config)
+
+        self.write_config(320, 0.5, mtime=os.stat(self.config_path).st_mtime + 10)
+        inference_config._cache[self.config_path].checked_at = 0.0
+        reloaded = load_inference_config(self.config_path)
+        self.assertEqual(reloaded.image_size, 320)
+        self.assertEqual(reloaded.conf_threshold, 0.5)
+
+
+    def test_invalid_reload_keeps_previous(self):
+        """
+        Tests that a broken file does not replace the last good configuration.
+        """
+
+        config = load_inference_config(self.config_path)
+        self.write_config(640, 7.0, mtime=os.stat(self.config_path).st_mtime + 10)
+        inference_config._cache[self.config_path].checked_at = 0.0
+        self.assertIs(load_inference_config(self.config_path), config)
+        with self.assertRaises(ValueError):
+            reload_inference_config(self.config_path)
@@ -0,0 +1,185 @@
+"""
+Prometheus metrics of the Models Service, exposed by GET /metrics.
+Metric families and per-stage children are created once at import, so observing a value is a lock and a bucket
+lookup, cheap enough to leave on in production.
+"""
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, disable_created_metrics, generate_latest
+
+import stage_timing
+
+# The *_created series double the output size without helping dashboards
+disable_created_metrics()
+
+# Request latencies, from cache hits (milliseconds) to 4K images on a loaded CPU node (seconds)
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Stage durations are finer: NMS or post-processing take well under a millisecond
+STAGE_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Detections kept after NMS, up to the default max_detections
+DETECTION_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100, 300)
+
+REQUESTS = Counter(
+    "models_http_requests_total",
+    "HTTP requests, by method, route template and status code",
+    ["method", "route", "status"],
+)
+REQUEST_LATENCY = Histogram(
+    "models_http_request_duration_seconds",
+    "Time to produce the HTTP response (until the headers, for streamed responses)",
+    ["method", "route"],
+    buckets=REQUEST_BUCKETS,
+)
+STAGE_LATENCY = Histogram(
+    "models_stage_duration_seconds",
+    "Time per call of each prediction stage (batched stages count once per batch)",
+    ["stage"],
+    buckets=STAGE_BUCKETS,
+)
+DETECTIONS_PER_IMAGE = Histogram(
+    "models_detections_per_image",
+    "Detections per image after confidence filtering and NMS",
+    buckets=DETECTION_BUCKETS,
+)
+COALESCED_REQUESTS = Counter(
+    "models_coalesced_requests_total",
+    "Requests answered by the in-flight detection of an identical concurrent request, without their own inference",
+)
+CASCADE_PATHS = Counter(
+    "models_cascade_images_total",
+    "Images by inference path: full (cascade disabled), low_res (accepted at low resolution) or escalated",
+    ["path"],
+)
+REPLICA_UTILIZATION = Gauge("models_replica_utilization", "Share of its uptime an inference replica spent running batches", ["replica"])
+REPLICA_IN_FLIGHT = Gauge("models_replica_in_flight", "Batches in flight on an inference replica", ["replica"])
+REPLICA_MEMORY = Gauge(
+    "models_replica_memory_bytes",
+    "Memory of an inference replica: rss counts shared weight pages in full, pss splits them between replicas",
+    ["replica", "kind"],
+)
+MODEL_LOAD_SECONDS = Gauge("models_model_load_seconds", "Time taken to load the model weights at startup")
+WARMUP_SECONDS = Gauge("models_warmup_seconds", "Time taken by the warmup inferences at startup")
+TIME_TO_READY_SECONDS = Gauge("models_time_to_ready_seconds", "Time from process start to readiness (imports, model load and warmup)")
+READY = Gauge("models_ready", "1 once the model is loaded and warmed up")
+
+# Process RSS, CPU time and open file descriptors are exported by the default process collector
+# (process_resident_memory_bytes, process_cpu_seconds_total, process_open_fds)
+
+_stage_histograms = {stage: STAGE_LATENCY.labels(stage) for stage in stage_timing.STAGES}
+
+# Observations buffered in an inference replica process, see start_capture
+_captured: list | None = None
+
+
+def observe_stage(stage: str, seconds: float):
+    """Stage timing observer feeding the stage histograms."""
+    if _captured is not None:
+        _captured.append(("stage", stage, seconds))
+        return
+    histogram = _stage_histograms.get(stage)
+    if histogram is None:
+        histogram = _stage_histograms[stage] = STAGE_LATENCY.labels(stage)
+    histogram.observe(seconds)
+
+
+def observe_batch(detection_counts: list[int], paths: list[str]):
+    """
+    Record the detections kept for every image of a batch and the inference path it took.
+
+    Args:
+        detection_counts: Detections per image after NMS
+        paths: Inference path per image ("full", "low_res" or "escalated")
+    """
+    if _captured is not None:
+        _captured.append(("batch", detection_counts, paths))
+        return
+    for count, path in zip(detection_counts, paths):
+        DETECTIONS_PER_IMAGE.observe(count)
+        CASCADE_PATHS.labels(path).inc()
+
+
+def install():
+    """
+    Feed the stage timings of this process to the stage histograms. Called at startup, not on import, so
+    importing the metrics leaves the registered stage observers untouched.
+    """
+    stage_timing.add_observer(observe_stage)
+
+
+def uninstall():
+    """Stop feeding the stage timings to the stage histograms, see `install`."""
+    stage_timing.remove_observer(observe_stage)
+
+
+def start_capture():
+    """
+    Buffer stage timings and batch observations instead of recording them, in an inference replica process
+    whose own metrics are never scraped. The buffer is shipped to the HTTP front end with every result.
+    """
+    global _captured
+    _captured = []
+    install()
+
+
+def drain() -> list:
+    """
+    Observations buffered since the last call, see `start_capture`.
+
+    Returns:
+        list: ("stage", stage, seconds) and ("batch", detection_counts, paths) tuples
+    """
+    global _captured
+    if _captured is None:
+        return []
+    events, _captured = _captured, []
+    return events
+
+
+def replay(events: list):
+    """Record observations drained from an inference replica, feeding the stage observers of this process too."""
+    for event in events:
+        if event[0] == "stage":
+            stage_timing.record(event[1], event[2])
+        else:
+            observe_batch(event[1], event[2])
+
+
+def observe_replicas(replica_stats: list[dict]):
+    """
+    Update the per-replica gauges.
+
+    Args:
+        replica_stats: Entries of ReplicaPool.stats()["replicas"]
+    """
+    for replica in replica_stats:
+        label = str(replica["replica"])
+        REPLICA_UTILIZATION.labels(label).set(replica["utilization"])
+        REPLICA_IN_FLIGHT.labels(label).set(replica["in_flight"])
+        for kind in ("rss", "pss"):
+            if replica[f"{kind}_bytes"] is not None:
+                REPLICA_MEMORY.labels(label, kind).set(replica[f"{kind}_bytes"])
+
+
+def observe_request(method: str, route: str, status_code: int, seconds: float):
+    """
+    Count an HTTP request and record its latency.
+
+    Args:
+        method: HTTP method
+        route: Route template (e.g. "/predict"), never the raw URL, to bound the label cardinality
+        status_code: Response status code
+        seconds: Time to produce the response
+    """
+    REQUESTS.labels(method, route, str(status_code)).inc()
+    REQUEST_LATENCY.labels(method, route).observe(seconds)
+
+
+def render() -> tuple[bytes, str]:
+    """
+    Current metrics in the Prometheus text format.
+
+    Returns:
+        tuple: (body, content type)
+    """
+    return generate_latest(), CONTENT_TYPE_LATEST
+
@@ -0,0 +1,68 @@
+# External imports
+import unittest
+import metrics
+from metrics import DETECTIONS_PER_IMAGE, observe_request, render
+from stage_timing import timed, STAGE_NMS, STAGE_POSTPROCESS
+
+
+class TestMetrics(unittest.TestCase):
+    """
+    This class tests the Prometheus metrics of the Models Service.
+    """
+
+
+    def setUp(self):
+        metrics.install()
+
+
+    def tearDown(self):
+        metrics.uninstall()
+
+
+    def test_stage_histograms(self):
+        """
+        Tests that timed stages are exported as histogram observations.
+        """
+
+        with timed(STAGE_NMS):
+            pass
+        body, content_type = render()
+        self.assertTrue(content_type.startswith("text/plain"))
+        self.assertIn('models_stage_duration_seconds_count{stage="nms"} 1.0', body.decode())
+
+
+    def test_requests_and_detections(self):
+        """
+        Tests the per-route request counter and the detections-per-image histogram.
+        """
+
+        observe_request("POST", "/predict", 200, 0.03)
+        DETECTIONS_PER_IMAGE.observe(4)
+        text = render()[0].decode()
+        self.assertIn('models_http_requests_total{method="POST",route="/predict",status="200"} 1.0', text)
+        self.assertIn('models_http_request_duration_seconds_bucket{le="0.05",method="POST",route="/predict"} 1.0', text)
+        self.assertIn('models_detections_per_image_bucket{le="5.0"} 1.0', text)
+        self.assertNotIn("_created", text)
+
+
+    def test_capture_and_replay(self):
+        """
+        Tests that observations buffered in a replica are recorded once replayed in the front end.
+        """
+
+        metrics.start_capture()
+        try:
+            with timed(STAGE_POSTPROCESS):
+                pass
+            metrics.observe_batch([50], ["escalated"])
+            events = metrics.drain()
+        finally:
+            metrics._captured = None
+        self.assertEqual([event[0] for event in events], ["stage", "batch"])
+        self.assertNotIn('models_cascade_images_total{path="escalated"}', render()[0].decode())
+
+        metrics.replay(events)
+        text = render()[0].decode()
+        self.assertIn('models_cascade_images_total{path="escalated"} 1.0', text)
+        self.assertIn('models_stage_duration_seconds_count{stage="postprocess"} 1.0', text)
+        self.assertIn('models_detections_per_image_bucket{le="55.0"} 1.0', text)
@@ -0,0 +1,262 @@
+"""
+Registry of named, versioned model weights, with an atomic switch of the version serving predictions.
+Versions are loaded (and warmed up by the caller) before they are activated, so a switch never causes a cold start;
+batches already running keep the engine they started with.
+"""
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable
+
+from inference_config import ENGINE_ULTRALYTICS, ENGINE_ONNXRUNTIME
+
+logger = logging.getLogger(__name__)
+
+# Engine serving each kind of weights file
+ENGINES_BY_EXTENSION = {".pt": ENGINE_ULTRALYTICS, ".onnx": ENGINE_ONNXRUNTIME}
+
+
+@dataclass(frozen=True)
+class ModelVersion:
+    """
+    A registered weights file.
+
+    Attributes:
+        name: Version name used by the admin endpoints and reported with predictions (the file name by default)
+        engine: Engine running the weights ("ultralytics" or "onnxruntime")
+        path: Absolute path to the weights
+        fingerprint: Engine, file name, size and mtime of the weights, e.g. "onnxruntime:yolo_best.onnx:10512345:1718000000"
+    """
+    name: str
+    engine: str
+    path: str
+    fingerprint: str
+
+
+def fingerprint(engine: str, path: str) -> str:
+    """
+    Identify the content of a weights file without reading it.
+
+    Args:
+        engine: Engine running the weights
+        path: Path to the weights
+
+    Returns:
+        str: "engine:file name:size:mtime", or "engine:file name" if the file cannot be read
+    """
+    try:
+        stat = os.stat(path)
+        return f"{engine}:{Path(path).name}:{stat.st_size}:{int(stat.st_mtime)}"
+    except OSError:
+        return f"{engine}:{Path(path).name}"
+
+
+class ModelRegistry:
+    """
+    Named model versions, the engines loaded for them and the active version.
+
+    Loading happens outside the registry lock, so predictions keep using the active engine while another version
+    loads. Activation only swaps a reference: a batch gets its (version, engine) pair once, with `active`.
+    """
+
+    def __init__(self, build: Callable[[ModelVersion], object]):
+        """
+        Args:
+            build: Function building the inference engine of a version
+        """
+        self._build = build
+        self._lock = threading.Lock()
+        # Serializes the (slow) engine builds, so a version is never built twice concurrently
+        self._load_lock = threading.Lock()
+        self._versions: dict[str, ModelVersion] = {}
+        self._engines: dict[str, object] = {}
+        self._active: str | None = None
+
+    def register(self, path: str, engine: str | None = None, name: str | None = None) -> ModelVersion:
+        """
+        Register a weights file, without loading it. Registering the same file again is a no-op.
+
+        Args:
+            path: Path to the weights (.pt or .onnx)
+            engine: Engine running the weights (defaults to the engine of the file extension)
+            name: Version name (defaults to the file name)
+
+        Returns:
+            ModelVersion: The registered version
+
+        Raises:
+            ValueError: If the extension is not supported or the name is taken by another file
+        """
+        path = str(Path(path).resolve())
+        engine = engine or ENGINES_BY_EXTENSION.get(Path(path).suffix.lower())
+        if engine is None:
+            raise ValueError(f"Unsupported weights file {path}, expected one of {sorted(ENGINES_BY_EXTENSION)}")
+        name = name or Path(path).name
+
+        with self._lock:
+            existing = self._versions.get(name)
+            if existing is not None:
+                if (existing.path, existing.engine) != (path, engine):
+                    raise ValueError(f"Model version {name!r} is already registered for {existing.engine}:{existing.path}")
+                return existing
+            version = ModelVersion(name=name, engine=engine, path=path, fingerprint=fingerprint(engine, path))
+            self._versions[name] = version
+        logger.info(f"Registered model version {name} ({engine}, {path})")
+        return version
+
+    def discover(self, folder: str) -> list[str]:
+        """
+        Register every weights file of a folder.
+
+        Args:
+            folder: Folder holding .pt and .onnx files
+
+        Returns:
+            list: Names of the registered versions
+        """
+        if not os.path.isdir(folder):
+            return []
+        return [
+            self.register(str(path)).name
+            for path in sorted(Path(folder).iterdir())
+            if path.suffix.lower() in ENGINES_BY_EXTENSION and path.is_file()
+        ]
+
+    def get(self, name: str) -> ModelVersion:
+        """
+        Raises:
+            KeyError: If the version is not registered
+        """
+        with self._lock:
+            if name not in self._versions:
+                raise KeyError(name)
+            return self._versions[name]
+
+    def load(self, name: str):
+        """
+        Build the engine of a version, if not loaded yet.
+
+        Args:
+            name: Version name
+
+        Returns:
+            Engine of the version
+
+        Raises:
+            KeyError: If the version is not registered
+        """
+        with self._lock:
+            if name not in self._versions:
+                raise KeyError(name)
+            if name in self._engines:
+                return self._engines[name]
+
+        with self._load_lock:
+            with self._lock:
+                if name in self._engines:
+                    return self._engines[name]
+                # The file may have changed since it was registered (or unloaded)
+                version = self._versions[name]
+                version = self._versions[name] = ModelVersion(
+                    name=name, engine=version.engine, path=version.path, fingerprint=fingerprint(version.engine, version.path)
+                )
+            engine = self._build(version)
+            with self._lock:
+                self._engines[name] = engine
+        logger.info(f"Loaded model version {name}")
+        return engine
+
+    def activate(self, name: str) -> ModelVersion:
+        """
+        Make a version serve the next batches. Batches already running finish on the previous version.
+        The version is loaded lazily by `active` if it was not loaded beforehand.
+
+        Args:
+            name: Version name
+
+        Returns:
+            ModelVersion: The activated version
+
+        Raises:
+            KeyError: If the version is not registered
+        """
+        with self._lock:
+            if name not in self._versions:
+                raise KeyError(name)
+            previous, self._active = self._active, name
+            version = self._versions[name]
+        if previous != name:
+            logger.info(f"Active model version: {previous} -> {name}")
+        return version
+
+    def active_version(self) -> ModelVersion:
+        """
+        Active version, without loading it.
+
+        Raises:
+            LookupError: If no version was activated
+        """
+        with self._lock:
+            if self._active is None:
+                raise LookupError("No model version is active")
+            return self._versions[self._active]
+
+    def active(self) -> tuple[ModelVersion, object]:
+        """
+        Active version and its engine, loading it if needed. Read once per batch, so a whole batch runs on one version.
+
+        Returns:
+            tuple: (ModelVersion, engine)
+
+        Raises:
+            LookupError: If no version was activated
+        """
+        while True:
+            with self._lock:
+                if self._active is None:
+                    raise LookupError("No model version is active")
+                name = self._active
+                engine = self._engines.get(name)
+                if engine is not None:
+                    return self._versions[name], engine
+            self.load(name)
+
+    def unload(self, name: str):
+        """
+        Release the engine of an inactive version; running batches holding it finish normally.
+
+        Raises:
+            KeyError: If the version is not registered
+            ValueError: If the version is active
+        """
+        with self._lock:
+            if name not in self._versions:
+                raise KeyError(name)
+            if name == self._active:
+                raise ValueError(f"Model version {name!r} is active, activate another version first")
+            self._engines.pop(name, None)
+        logger.info(f"Unloaded model version {name}")
+
+    def stats(self) -> dict:
+        """
+        Snapshot of the registry.
+
+        Returns:
+            dict: Active version name and, per version, its engine, path, fingerprint and whether it is loaded
+        """
+        with self._lock:
+            return {
+                "active": self._active,
+                "versions": {
+                    name: {
+                        "engine": version.engine,
+                        "path": version.path,
+                        "fingerprint": version.fingerprint,
+                        "loaded": name in self._engines,
+                        "active": name == self._active,
+                    }
+                    for name, version in self._versions.items()
+                },
+            }
@@ -0,0 +1,105 @@
+# External imports
+import os
+import tempfile
+import threading
+import unittest
+from model_registry import ModelRegistry
+
+
+class TestModelRegistry(unittest.TestCase):
+    """
+    This class tests the registration, loading and atomic activation of model versions.
+    """
+
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        for name in ("v1.pt", "v2.onnx", "notes.txt"):
+            with open(os.path.join(self.tmp_dir.name, name), "wb") as f:
+                f.write(b"weights")
+        self.builds = []
+
+        def build(version):
+            self.builds.append(version.name)
+            return f"engine-{version.name}"
+
+        self.registry = ModelRegistry(build)
+
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+
+    def test_discover(self):
+        """
+        Tests that .pt and .onnx files are registered with the engine matching their extension, without loading them.
+        """
+
+        self.assertEqual(self.registry.discover(self.tmp_dir.name), ["v1.pt", "v2.onnx"])
+        self.assertEqual(self.registry.get("v1.pt").engine, "ultralytics")
+        self.assertEqual(self.registry.get("v2.onnx").engine, "onnxruntime")
+        self.assertEqual(self.builds, [])
+
+        # Registering the same file again is a no-op, another file under the same name is refused
+        self.assertEqual(self.registry.discover(self.tmp_dir.name), ["v1.pt", "v2.onnx"])
+        with self.assertRaises(ValueError):
+            self.registry.register(os.path.join(self.tmp_dir.name, "v2.onnx"), name="v1.pt")
+        with self.assertRaises(ValueError):
+            self.registry.register(os.path.join(self.tmp_dir.name, "notes.txt"))
+
+
+    def test_activate_swaps_engine(self):
+        """
+        Tests that activation swaps the engine of the next batches, while a batch keeps the engine it started with.
+        """
+
+        self.registry.discover(self.tmp_dir.name)
+        with self.assertRaises(LookupError):
+            self.registry.active()
+
+        self.registry.activate("v1.pt")
+        version, engine = self.registry.active()
+        self.assertEqual((version.name, engine), ("v1.pt", "engine-v1.pt"))
+
+        self.registry.load("v2.onnx")
+        self.registry.activate("v2.onnx")
+        self.assertEqual(engine, "engine-v1.pt")
+        self.assertEqual(self.registry.active()[1], "engine-v2.onnx")
+        self.assertEqual(self.builds, ["v1.pt", "v2.onnx"])
+
+        with self.assertRaises(KeyError):
+            self.registry.activate("v3.pt")
+        self.assertEqual(self.registry.active_version().name, "v2.onnx")
+
+
+    def test_unload(self):
+        """
+        Tests that only inactive versions can be unloaded, and are built again when needed.
+        """
+
+        self.registry.discover(self.tmp_dir.name)
+        self.registry.activate("v1.pt")
+        self.registry.load("v1.pt")
+        self.registry.load("v2.onnx")
+        with self.assertRaises(ValueError):
+            self.registry.unload("v1.pt")
+
+        self.registry.unload("v2.onnx")
+        self.assertFalse(self.registry.stats()["versions"]["v2.onnx"]["loaded"])
+        self.registry.load("v2.onnx")
+        self.assertEqual(self.builds, ["v1.pt", "v2.onnx", "v2.onnx"])
+
+
+    def test_concurrent_load_builds_once(self):
+        """
+        Tests that concurrent first uses of a version build its engine once.
+        """
+
+        self.registry.discover(self.tmp_dir.name)
+        self.registry.activate("v1.pt")
+        threads = [threading.Thread(target=self.registry.active) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.builds, ["v1.pt"])
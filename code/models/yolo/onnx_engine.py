@@ -0,0 +1,425 @@
+"""
+Lightweight inference engine driving an ONNX Runtime session directly.
+Pre-processing (letterbox) and NMS are done in NumPy, so neither torch nor ultralytics is needed.
+"""
+import ast
+import hashlib
+import json
+import logging
+import os
+import platform
+from pathlib import Path
+
+import cv2
+import numpy as np
+import onnxruntime as ort
+
+from engines import Detections
+from inference_config import InferenceConfig, ENGINE_ONNXRUNTIME
+from stage_timing import timed, STAGE_PREPROCESS, STAGE_INFERENCE, STAGE_NMS
+
+logger = logging.getLogger(__name__)
+
+# Padding colour used by ultralytics' letterbox
+PAD_VALUE = 114
+
+# Offset separating boxes of different classes, so a single NMS pass is class-aware
+MAX_WH = 7680
+
+# Initializers smaller than this stay inside the graph file of a shared-weights model
+SHARED_WEIGHTS_MIN_BYTES = 1024
+
+# Alignment of every initializer in the shared weights file
+SHARED_WEIGHTS_ALIGNMENT = 64
+
+
+def letterbox(image: np.ndarray, size: int) -> tuple[np.ndarray, float, tuple[float, float]]:
+    """
+    Resize an image keeping its aspect ratio and pad it to a square of side `size`.
+
+    Args:
+        image: BGR image of shape (height, width, 3)
+        size: Side of the output square
+
+    Returns:
+        tuple: (padded image, scale ratio, (left padding, top padding))
+    """
+    height, width = image.shape[:2]
+    ratio = min(size / height, size / width)
+    new_width, new_height = int(round(width * ratio)), int(round(height * ratio))
+
+    if (new_width, new_height) != (width, height):
+        image = cv2.resize(image, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
+
+    pad_w, pad_h = (size - new_width) / 2, (size - new_height) / 2
+    top, left = int(round(pad_h - 0.1)), int(round(pad_w - 0.1))
+
+    padded = np.full((size, size, 3), PAD_VALUE, dtype=np.uint8)
+    padded[top:top + new_height, left:left + new_width] = image
+    return padded, ratio, (left, top)
+
+
+def preprocess(images: list[np.ndarray], size: int) -> tuple[np.ndarray, list[tuple[float, tuple[float, float]]]]:
+    """
+    Letterbox a batch of BGR images into a normalised NCHW RGB float tensor.
+
+    Args:
+        images: BGR images
+        size: Network input size
+
+    Returns:
+        tuple: (tensor of shape (B, 3, size, size), per-image (ratio, padding))
+    """
+    batch = np.empty((len(images), size, size, 3), dtype=np.uint8)
+    transforms = []
+    for i, image in enumerate(images):
+        batch[i], ratio, padding = letterbox(image, size)
+        transforms.append((ratio, padding))
+
+    # BGR -> RGB, HWC -> CHW and [0, 255] -> [0, 1] in a single vectorized pass over the batch
+    tensor = batch[..., ::-1].transpose(0, 3, 1, 2).astype(np.float32) / 255.0
+    return np.ascontiguousarray(tensor), transforms
+
+
+def nms(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float) -> np.ndarray:
+    """
+    Greedy non-maximum suppression.
+
+    Args:
+        boxes: (N, 4) xyxy boxes
+        scores: (N,) confidences
+        iou_threshold: Boxes overlapping a kept box more than this are suppressed
+
+    Returns:
+        np.ndarray: Indices of the kept boxes, by decreasing score
+    """
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    order = np.argsort(-scores, kind="stable")
+
+    keep = []
+    while order.size > 0:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+
+        # IoU of the best box against all remaining ones at once
+        inter_w = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+        inter_h = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+        inter = inter_w * inter_h
+        iou = inter / (areas[i] + areas[rest] - inter + 1e-9)
+        order = rest[iou <= iou_threshold]
+
+    return np.asarray(keep, dtype=np.int64)
+
+
+def postprocess(
+    output: np.ndarray,
+    names: dict,
+    conf_threshold: float,
+    iou_threshold: float,
+    max_detections: int,
+    ratio: float,
+    padding: tuple[float, float],
+    image_shape: tuple[int, int],
+) -> Detections:
+    """
+    Decode the raw output of one image into filtered detections in source image pixels.
+
+    Args:
+        output: (4 + num_classes, num_anchors) raw predictions (xywh + class scores)
+        names: Mapping from class index to name
+        conf_threshold: Minimum confidence
+        iou_threshold: NMS IoU threshold
+        max_detections: Maximum number of detections kept
+        ratio: Letterbox scale ratio
+        padding: Letterbox (left, top) padding
+        image_shape: (height, width) of the source image
+
+    Returns:
+        Detections: Detections of the image
+    """
+    predictions = output.T
+    class_scores = predictions[:, 4:]
+    class_ids = class_scores.argmax(axis=1)
+    scores = class_scores[np.arange(len(class_ids)), class_ids]
+
+    mask = scores > conf_threshold
+    if not mask.any():
+        return Detections.empty(names)
+    predictions, class_ids, scores = predictions[mask], class_ids[mask], scores[mask]
+
+    # xywh -> xyxy
+    boxes = np.empty((len(predictions), 4), dtype=np.float32)
+    half_w, half_h = predictions[:, 2] / 2, predictions[:, 3] / 2
+    boxes[:, 0] = predictions[:, 0] - half_w
+    boxes[:, 1] = predictions[:, 1] - half_h
+    boxes[:, 2] = predictions[:, 0] + half_w
+    boxes[:, 3] = predictions[:, 1] + half_h
+
+    keep = nms(boxes + (class_ids * MAX_WH)[:, None], scores, iou_threshold)[:max_detections]
+    boxes, scores, class_ids = boxes[keep], scores[keep], class_ids[keep]
+
+    # Undo the letterbox and clip to the source image
+    height, width = image_shape
+    boxes -= np.array([padding[0], padding[1], padding[0], padding[1]], dtype=np.float32)
+    boxes /= ratio
+    boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, width)
+    boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, height)
+
+    return Detections(boxes=boxes, scores=scores.astype(np.float32), class_ids=class_ids.astype(np.int64), names=names)
+
+
+def read_class_names(session: ort.InferenceSession) -> dict:
+    """
+    Read the class names stored by the ultralytics exporter in the model metadata.
+
+    Args:
+        session: ONNX Runtime session
+
+    Returns:
+        dict: Mapping from class index to name
+    """
+    metadata = session.get_modelmeta().custom_metadata_map
+    if "names" not in metadata:
+        raise ValueError("ONNX model has no 'names' metadata: export it with ultralytics")
+    return {int(k): v for k, v in ast.literal_eval(metadata["names"]).items()}
+
+
+def shared_weights_manifest(model_path: str) -> str:
+    """Path of the manifest describing the memory-mapped weights of a model exported by `export_shared_weights`."""
+    return str(Path(model_path).with_suffix(".weights.json"))
+
+
+def export_shared_weights(model_path: str, output_path: str | None = None) -> str:
+    """
+    Split an ONNX model into a small graph file and a raw weights file that `OnnxEngine` memory-maps.
+
+    Every process loading the split model maps the same file pages instead of copying the weights, so inference
+    replicas share one copy of the weights through the page cache.
+
+    Args:
+        model_path: ONNX model (e.g. model_weights/yolo_best.onnx)
+        output_path: Graph file to write (defaults to <name>_shared.onnx next to the model);
+            the weights go to <name>_shared.weights and their layout to <name>_shared.weights.json
+
+    Returns:
+        str: Path of the graph file, loadable like any other ONNX model
+    """
+    import onnx
+    from onnx import numpy_helper
+
+    output = Path(output_path) if output_path else Path(model_path).with_name(f"{Path(model_path).stem}_shared.onnx")
+    weights_path = output.with_suffix(".weights")
+    model = onnx.load(model_path)
+
+    initializers = {}
+    offset = 0
+    with open(weights_path, "wb") as f:
+        for tensor in model.graph.initializer:
+            array = numpy_helper.to_array(tensor)
+            if array.nbytes < SHARED_WEIGHTS_MIN_BYTES or array.dtype == object:
+                continue
+            padding = -offset % SHARED_WEIGHTS_ALIGNMENT
+            f.write(b"\0" * padding)
+            offset += padding
+            f.write(np.ascontiguousarray(array).tobytes())
+            initializers[tensor.name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+
+            # Standard external data reference, so the graph file stays a valid ONNX model on its own
+            tensor.ClearField("raw_data")
+            tensor.data_location = onnx.TensorProto.EXTERNAL
+            del tensor.external_data[:]
+            for key, value in (("location", weights_path.name), ("offset", str(offset)), ("length", str(array.nbytes))):
+                entry = tensor.external_data.add()
+                entry.key, entry.value = key, value
+            offset += array.nbytes
+
+    onnx.save(model, str(output))
+    with open(shared_weights_manifest(str(output)), "w") as f:
+        json.dump({"weights": weights_path.name, "initializers": initializers}, f)
+    logger.info(f"Exported {len(initializers)} shared initializers ({offset / 1e6:.1f} MB) to {weights_path}")
+    return str(output)
+
+
+def map_shared_weights(model_path: str) -> dict[str, np.ndarray] | None:
+    """
+    Memory-map the weights of a model exported by `export_shared_weights`.
+
+    Args:
+        model_path: Graph file of the model
+
+    Returns:
+        dict: Read-only arrays backed by the weights file, by initializer name (None if the model was not split)
+    """
+    manifest_path = shared_weights_manifest(model_path)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, "r") as f:
+        manifest = json.load(f)
+
+    weights = np.memmap(Path(model_path).parent / manifest["weights"], mode="r")
+    return {
+        name: np.frombuffer(weights, dtype=entry["dtype"], count=int(np.prod(entry["shape"])), offset=entry["offset"]).reshape(entry["shape"])
+        for name, entry in manifest["initializers"].items()
+    }
+
+
+def _cpu_flags() -> str:
+    """Instruction sets of the CPU, on which the layout of an ORT_ENABLE_ALL graph depends."""
+    try:
+        with open("/proc/cpuinfo", "r") as f:
+            for line in f:
+                if line.startswith("flags"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor()
+
+
+def optimized_graph_path(model_path: str, cache_dir: str) -> str:
+    """
+    Path of the optimized graph of a model in the graph cache.
+
+    Fully optimized graphs are specific to the model file, the ONNX Runtime version and the CPU,
+    so all of them are part of the file name.
+
+    Args:
+        model_path: ONNX model
+        cache_dir: Folder of the optimized graphs
+
+    Returns:
+        str: Path of the optimized graph, e.g. <cache_dir>/yolo_best.1f2e3d4c5b6a7980.onnx
+    """
+    stat = os.stat(model_path)
+    key = "|".join([
+        os.path.abspath(model_path), str(stat.st_size), str(stat.st_mtime_ns),
+        ort.__version__, platform.machine(), _cpu_flags(),
+    ])
+    digest = hashlib.sha256(key.encode()).hexdigest()[:16]
+    return os.path.join(cache_dir, f"{Path(model_path).stem}.{digest}.onnx")
+
+
+class OnnxEngine:
+    """
+    Engine running an ultralytics-exported YOLO ONNX model with ONNX Runtime.
+    """
+    name = ENGINE_ONNXRUNTIME
+
+    def __init__(self, model_path: str, intra_op_threads: int = 0, inter_op_threads: int = 0, graph_cache_dir: str | None = None):
+        """
+        Args:
+            model_path: Path to the .onnx weights
+            intra_op_threads: Threads used inside an operator (0 lets ONNX Runtime decide)
+            inter_op_threads: Threads used across operators (0 lets ONNX Runtime decide)
+            graph_cache_dir: Folder where the optimized graph is saved on the first start and loaded afterwards,
+                skipping graph optimization (None disables the cache; ignored for shared-weights models,
+                whose saved graph would embed private copies of the weights)
+        """
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = intra_op_threads
+        options.inter_op_num_threads = inter_op_threads
+
+        # Weights split by export_shared_weights are used in place from the mapped file, so processes share them.
+        # The layout optimizations of ORT_ENABLE_ALL would copy every convolution weight into private memory.
+        self.shared_weights = map_shared_weights(model_path)
+        if self.shared_weights is not None:
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED
+            self._initializers = [ort.OrtValue.ortvalue_from_numpy(array) for array in self.shared_weights.values()]
+            for name, value in zip(self.shared_weights, self._initializers):
+                options.add_initializer(name, value)
+
+        self.model_path = model_path
+        self.graph_cache_path = None
+        if graph_cache_dir and self.shared_weights is None:
+            self.session = self._cached_session(model_path, options, graph_cache_dir)
+        else:
+            self.session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+        self.names = read_class_names(self.session)
+
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        batch_dim, _, height_dim, _ = model_input.shape
+        # Exported models have a fixed batch of 1 and a fixed size unless exported with dynamic=True
+        self.fixed_batch = batch_dim if isinstance(batch_dim, int) else None
+        self.fixed_size = height_dim if isinstance(height_dim, int) else None
+
+    def _cached_session(self, model_path: str, options: ort.SessionOptions, cache_dir: str) -> ort.InferenceSession:
+        """Load the optimized graph from the cache, or optimize the model and save its graph there."""
+        cached = optimized_graph_path(model_path, cache_dir)
+        if os.path.exists(cached):
+            level = options.graph_optimization_level
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+            try:
+                session = ort.InferenceSession(cached, sess_options=options, providers=["CPUExecutionProvider"])
+                self.graph_cache_path = cached
+                logger.info(f"Loaded optimized graph {cached}")
+                return session
+            except Exception as e:
+                logger.warning(f"Discarding unreadable optimized graph {cached}: {e}")
+                os.remove(cached)
+                options.graph_optimization_level = level
+
+        # Saved under a temporary name, so concurrent replicas never read a partial file
+        os.makedirs(cache_dir, exist_ok=True)
+        partial = f"{cached}.{os.getpid()}.tmp"
+        options.optimized_model_filepath = partial
+        session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+        try:
+            os.replace(partial, cached)
+            self.graph_cache_path = cached
+            logger.info(f"Saved optimized graph {cached}")
+        except OSError as e:
+            logger.warning(f"Cannot save the optimized graph of {model_path}: {e}")
+        return session
+
+    def predict(self, images: list, config: InferenceConfig) -> list[Detections]:
+        """
+        Run the model on a batch of images.
+
+        Args:
+            images: Paths to image files or BGR arrays
+            config: Inference configuration
+
+        Returns:
+            list: One Detections per image
+        """
+        images = [self._load(image) for image in images]
+        size = self.fixed_size or config.image_size
+        if self.fixed_size and self.fixed_size != config.image_size:
+            logger.debug(f"ONNX model has a fixed input size {self.fixed_size}, ignoring image_size {config.image_size}")
+
+        step = self.fixed_batch or len(images)
+        detections = []
+        for start in range(0, len(images), step):
+            chunk = images[start:start + step]
+            with timed(STAGE_PREPROCESS):
+                tensor, transforms = preprocess(chunk, size)
+                if self.fixed_batch and len(chunk) < self.fixed_batch:
+                    tensor = np.concatenate([tensor, np.zeros((self.fixed_batch - len(chunk), *tensor.shape[1:]), dtype=tensor.dtype)])
+            with timed(STAGE_INFERENCE):
+                outputs = self.session.run(None, {self.input_name: tensor})[0]
+            # Decoding of the raw outputs and NMS
+            with timed(STAGE_NMS):
+                for output, image, (ratio, padding) in zip(outputs, chunk, transforms):
+                    detections.append(postprocess(
+                        output,
+                        self.names,
+                        conf_threshold=config.conf_threshold,
+                        iou_threshold=config.iou_threshold,
+                        max_detections=config.max_detections,
+                        ratio=ratio,
+                        padding=padding,
+                        image_shape=image.shape[:2],
+                    ))
+        return detections
+
+    @staticmethod
+    def _load(image) -> np.ndarray:
+        if isinstance(image, np.ndarray):
+            return image
+        loaded = cv2.imread(str(image), cv2.IMREAD_COLOR)
+        if loaded is None:
+            raise ValueError(f"Cannot read image {image}")
+        return loaded
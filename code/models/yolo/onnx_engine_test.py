@@ -0,0 +1,193 @@
+# External imports
+import importlib.util
+import os
+import tempfile
+import unittest
+from dataclasses import replace
+import numpy as np
+from inference_config import InferenceConfig
+from onnx_engine import letterbox, nms, postprocess, export_shared_weights
+
+
+class TestOnnxEngineOps(unittest.TestCase):
+    """
+    This class tests the NumPy pre- and post-processing of the ONNX Runtime engine.
+    """
+
+
+    def test_letterbox(self):
+        """
+        Tests that the image keeps its aspect ratio and is centred in the padded square.
+        """
+
+        image = np.full((300, 600, 3), 255, dtype=np.uint8)
+        padded, ratio, (left, top) = letterbox(image, 640)
+
+        self.assertEqual(padded.shape, (640, 640, 3))
+        self.assertAlmostEqual(ratio, 640 / 600)
+        self.assertEqual((left, top), (0, 160))
+        self.assertEqual(padded[0, 0, 0], 114)
+        self.assertEqual(padded[320, 320, 0], 255)
+
+
+    def test_nms(self):
+        """
+        Tests that overlapping boxes are suppressed and distinct ones kept.
+        """
+
+        boxes = np.array([[0, 0, 10, 10], [1, 1, 10, 10], [20, 20, 30, 30]], dtype=np.float32)
+        scores = np.array([0.9, 0.8, 0.7], dtype=np.float32)
+        self.assertListEqual(nms(boxes, scores, 0.5).tolist(), [0, 2])
+
+
+    def test_postprocess(self):
+        """
+        Tests the decoding of raw predictions into boxes in source image pixels.
+        """
+
+        names = {0: "Tomato", 1: "Banana"}
+        # 3 anchors, xywh + 2 class scores, in the letterboxed 640x640 frame
+        output = np.array([
+            [320, 322, 100],   # x
+            [320, 320, 100],   # y
+            [100, 100, 20],    # w
+            [100, 100, 20],    # h
+            [0.9, 0.6, 0.1],   # Tomato
+            [0.1, 0.2, 0.05],  # Banana
+        ], dtype=np.float32)
+        detections = postprocess(output, names, 0.25, 0.7, 300, ratio=2.0, padding=(0, 160), image_shape=(160, 320))
+
+        self.assertEqual(len(detections), 1)
+        self.assertEqual(detections.class_ids.tolist(), [0])
+        np.testing.assert_allclose(detections.boxes[0], [135, 55, 185, 105])
+
+
+class TestEngineParity(unittest.TestCase):
+    """
+    This class checks that the ONNX Runtime engine gives the same ingredients as the ultralytics one.
+    """
+
+
+    @classmethod
+    def setUpClass(cls):
+        cls.pt_path = "./model_weights/yolo_best.pt"
+        cls.onnx_path = "./model_weights/yolo_best.onnx"
+        cls.test_img_dir = "test_images"
+        if not (os.path.exists(cls.pt_path) and os.path.exists(cls.onnx_path)):
+            raise unittest.SkipTest("Model weights not available")
+        if importlib.util.find_spec("ultralytics") is None:
+            raise unittest.SkipTest("ultralytics not installed")
+
+        from engines import UltralyticsEngine
+        from onnx_engine import OnnxEngine
+        cls.config = InferenceConfig.from_yaml("./config/config_yolo_inf.yaml")
+        cls.ultralytics_engine = UltralyticsEngine(cls.pt_path)
+        cls.onnx_engine = OnnxEngine(cls.onnx_path)
+
+
+    def test_same_ingredients(self):
+        """
+        Tests that both engines find the same ingredients, with close confidences, on the test images.
+        """
+
+        for filename in sorted(os.listdir(self.test_img_dir)):
+            img_path = os.path.join(self.test_img_dir, filename)
+            expected = self.ultralytics_engine.predict([img_path], self.config)[0]
+            actual = self.onnx_engine.predict([img_path], replace(self.config, engine="onnxruntime"))[0]
+
+            expected_best = {expected.names[int(c)]: float(s) for c, s in sorted(zip(expected.class_ids, expected.scores), key=lambda x: x[1])}
+            actual_best = {actual.names[int(c)]: float(s) for c, s in sorted(zip(actual.class_ids, actual.scores), key=lambda x: x[1])}
+
+            self.assertSetEqual(set(actual_best), set(expected_best), f"Different ingredients on {filename}")
+            for name, confidence in expected_best.items():
+                self.assertAlmostEqual(actual_best[name], confidence, delta=0.05, msg=f"{name} on {filename}")
+
+
+class TestSharedWeights(unittest.TestCase):
+    """
+    This class checks, on a tiny generated model, that a model split by export_shared_weights runs from its
+    memory-mapped weights and that optimized graphs are cached.
+    """
+
+
+    def setUp(self):
+        if importlib.util.find_spec("onnx") is None:
+            raise unittest.SkipTest("onnx not installed")
+        import onnx
+        from onnx import helper, numpy_helper, TensorProto
+
+        # Tiny YOLO-shaped model: a 5x5 convolution producing xywh + 2 class scores per anchor
+        weight = np.random.default_rng(0).standard_normal((6, 3, 5, 5)).astype(np.float32) * 0.1
+        graph = helper.make_graph(
+            [
+                helper.make_node("Conv", ["images", "weight"], ["features"], pads=[2, 2, 2, 2]),
+                helper.make_node("Reshape", ["features", "shape"], ["output0"]),
+            ],
+            "tiny",
+            [helper.make_tensor_value_info("images", TensorProto.FLOAT, [1, 3, 32, 32])],
+            [helper.make_tensor_value_info("output0", TensorProto.FLOAT, [1, 6, 1024])],
+            [numpy_helper.from_array(weight, "weight"), numpy_helper.from_array(np.array([1, 6, 1024], dtype=np.int64), "shape")],
+        )
+        model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 17)])
+        model.ir_version = 8
+        model.metadata_props.add(key="names", value="{0: 'Tomato', 1: 'Banana'}")
+
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.model_path = os.path.join(self.tmp_dir.name, "tiny.onnx")
+        onnx.save(model, self.model_path)
+
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+
+    def test_same_detections(self):
+        """
+        Tests that the split model gives the same detections, with its large initializers mapped from the weights file.
+        """
+
+        from onnx_engine import OnnxEngine
+
+        shared_path = export_shared_weights(self.model_path)
+        self.assertTrue(os.path.exists(os.path.join(self.tmp_dir.name, "tiny_shared.weights")))
+
+        config = InferenceConfig(model_path=None, image_size=32, conf_threshold=0.1, engine="onnxruntime")
+        image = np.random.default_rng(1).integers(0, 256, (48, 40, 3), dtype=np.uint8)
+        engine = OnnxEngine(self.model_path)
+        shared_engine = OnnxEngine(shared_path)
+
+        self.assertIsNone(engine.shared_weights)
+        self.assertListEqual(list(shared_engine.shared_weights), ["weight"])
+        expected = engine.predict([image], config)[0]
+        actual = shared_engine.predict([image], config)[0]
+        np.testing.assert_allclose(actual.scores, expected.scores, rtol=1e-5)
+        np.testing.assert_allclose(actual.boxes, expected.boxes, rtol=1e-4, atol=1e-3)
+
+
+    def test_graph_cache(self):
+        """
+        Tests that the optimized graph is saved by the first start and loaded by the next ones, with the same detections.
+        """
+
+        from onnx_engine import OnnxEngine, optimized_graph_path
+
+        cache_dir = os.path.join(self.tmp_dir.name, "graph_cache")
+        config = InferenceConfig(model_path=None, image_size=32, conf_threshold=0.1, engine="onnxruntime")
+        image = np.random.default_rng(1).integers(0, 256, (48, 40, 3), dtype=np.uint8)
+        expected = OnnxEngine(self.model_path).predict([image], config)[0]
+
+        first = OnnxEngine(self.model_path, graph_cache_dir=cache_dir)
+        cached = optimized_graph_path(self.model_path, cache_dir)
+        self.assertEqual(first.graph_cache_path, cached)
+        self.assertEqual(os.listdir(cache_dir), [os.path.basename(cached)])
+
+        second = OnnxEngine(self.model_path, graph_cache_dir=cache_dir)
+        self.assertEqual(second.names, {0: "Tomato", 1: "Banana"})
+        actual = second.predict([image], config)[0]
+        np.testing.assert_allclose(actual.scores, expected.scores, rtol=1e-5)
+
+        # A corrupted cache entry is replaced instead of failing the start
+        with open(cached, "wb") as f:
+            f.write(b"not a model")
+        OnnxEngine(self.model_path, graph_cache_dir=cache_dir)
+        self.assertGreater(os.path.getsize(cached), len(b"not a model"))
@@ -0,0 +1,287 @@
+"""
+Quantized ONNX variants of an exported YOLO model, for CPU-only inference nodes.
+FP16 and dynamic INT8 need only the FP32 model; static INT8 is calibrated on images of the fine-tuning dataset.
+"""
+import logging
+import os
+import random
+import shutil
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+import yaml
+
+logger = logging.getLogger(__name__)
+
+# Variant names, in the order they are produced and reported
+VARIANT_FP32 = "fp32"
+VARIANT_FP16 = "fp16"
+VARIANT_INT8_DYNAMIC = "int8_dynamic"
+VARIANT_INT8_STATIC = "int8_static"
+VARIANTS = (VARIANT_FP32, VARIANT_FP16, VARIANT_INT8_DYNAMIC, VARIANT_INT8_STATIC)
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+
+
+def dataset_images(data_yaml: str, split: str = "train") -> list[str]:
+    """
+    List the images of a split of an ultralytics dataset.
+
+    The split entry of the dataset YAML can be a directory, a .txt file listing images, or a list of them,
+    relative to the dataset `path` (or to the YAML file when `path` is not set).
+
+    Args:
+        data_yaml: Path to the dataset YAML file (`config_data_path` of config_yolo_ft.yaml)
+        split: Split name, e.g. "train" or "val"
+
+    Returns:
+        list: Sorted image paths
+
+    Raises:
+        ValueError: If the split is not defined in the dataset YAML
+    """
+    with open(data_yaml, 'r') as f:
+        data = yaml.safe_load(f)
+    if split not in data:
+        raise ValueError(f"Split {split!r} not found in {data_yaml}")
+
+    base = Path(data_yaml).parent
+    if data.get("path"):
+        base = base / data["path"]
+
+    entries = data[split] if isinstance(data[split], list) else [data[split]]
+    images = []
+    for entry in entries:
+        location = (base / entry).resolve()
+        if location.is_dir():
+            images += [str(p) for p in location.rglob("*") if p.suffix.lower() in IMAGE_EXTENSIONS]
+        elif location.suffix == ".txt" and location.is_file():
+            with open(location, 'r') as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        images.append(str((location.parent / line).resolve()))
+    return sorted(images)
+
+
+def sample_images(images: list[str], count: int, seed: int = 0) -> list[str]:
+    """
+    Deterministic random sample of images.
+
+    Args:
+        images: Candidate image paths
+        count: Sample size (all images if there are fewer)
+        seed: Random seed, so the same calibration set is used across runs
+
+    Returns:
+        list: Sampled image paths
+    """
+    if len(images) <= count:
+        return list(images)
+    return sorted(random.Random(seed).sample(images, count))
+
+
+class CalibrationReader:
+    """
+    Calibration data for static quantization: letterboxed images fed one at a time.
+    Implements the `get_next`/`rewind` interface of onnxruntime.quantization.CalibrationDataReader.
+    """
+
+    def __init__(self, images: list[str], input_name: str, image_size: int):
+        """
+        Args:
+            images: Paths of the calibration images
+            input_name: Name of the model input
+            image_size: Network input size
+        """
+        self.images = images
+        self.input_name = input_name
+        self.image_size = image_size
+        self._index = 0
+
+    def get_next(self) -> dict | None:
+        # Imported here so the dataset helpers do not need onnxruntime
+        from onnx_engine import preprocess
+
+        while self._index < len(self.images):
+            path = self.images[self._index]
+            self._index += 1
+            image = cv2.imread(path, cv2.IMREAD_COLOR)
+            if image is None:
+                logger.warning(f"Skipping unreadable calibration image {path}")
+                continue
+            tensor, _ = preprocess([image], self.image_size)
+            return {self.input_name: tensor}
+        return None
+
+    def rewind(self):
+        self._index = 0
+
+
+def copy_metadata(source_path: str, target_path: str):
+    """
+    Copy the metadata of the exported model (class names, stride, image size) to a derived model,
+    so ultralytics and the ONNX Runtime engine can still read them.
+
+    Args:
+        source_path: Model exported by ultralytics
+        target_path: Quantized or converted model, updated in place
+    """
+    import onnx
+
+    source = onnx.load(source_path, load_external_data=False)
+    target = onnx.load(target_path)
+    existing = {prop.key for prop in target.metadata_props}
+    for prop in source.metadata_props:
+        if prop.key not in existing:
+            target.metadata_props.add(key=prop.key, value=prop.value)
+    onnx.save(target, target_path)
+
+
+def convert_fp16(model_path: str, output_path: str) -> str:
+    """
+    Convert the weights and activations of a model to FP16, keeping FP32 inputs and outputs.
+
+    Args:
+        model_path: FP32 ONNX model
+        output_path: Where to write the FP16 model
+
+    Returns:
+        str: output_path
+    """
+    import onnx
+    from onnxruntime.transformers.float16 import convert_float_to_float16
+
+    model = convert_float_to_float16(onnx.load(model_path), keep_io_types=True)
+    onnx.save(model, output_path)
+    return output_path
+
+
+def quantize_dynamic_int8(model_path: str, output_path: str) -> str:
+    """
+    Quantize the weights to INT8; activations are quantized on the fly at inference time.
+
+    Args:
+        model_path: FP32 ONNX model
+        output_path: Where to write the quantized model
+
+    Returns:
+        str: output_path
+    """
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(model_path, output_path, weight_type=QuantType.QUInt8)
+    copy_metadata(model_path, output_path)
+    return output_path
+
+
+def quantize_static_int8(model_path: str, output_path: str, calibration_images: list[str], image_size: int) -> str:
+    """
+    Quantize weights and activations to INT8 (QDQ format), with activation ranges calibrated on real images.
+
+    Args:
+        model_path: FP32 ONNX model
+        output_path: Where to write the quantized model
+        calibration_images: Images used to calibrate the activation ranges
+        image_size: Network input size
+
+    Returns:
+        str: output_path
+    """
+    import onnxruntime as ort
+    from onnxruntime.quantization import CalibrationMethod, QuantFormat, QuantType, quantize_static
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    # Shape inference and graph clean-up make calibration and quantization more reliable
+    prepared_path = str(Path(output_path).with_suffix(".prep.onnx"))
+    quant_pre_process(model_path, prepared_path)
+
+    input_name = ort.InferenceSession(model_path, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+    reader = CalibrationReader(calibration_images, input_name, image_size)
+    try:
+        quantize_static(
+            prepared_path,
+            output_path,
+            reader,
+            quant_format=QuantFormat.QDQ,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            per_channel=True,
+            calibrate_method=CalibrationMethod.MinMax,
+        )
+    finally:
+        os.remove(prepared_path)
+    copy_metadata(model_path, output_path)
+    return output_path
+
+
+def measure_latency(model_path: str, images: list, image_size: int, runs: int = 3, threads: int = 1) -> dict:
+    """
+    Per-image CPU latency of a model, with the ONNX Runtime engine used in production.
+
+    Args:
+        model_path: ONNX model
+        images: BGR images, run one at a time
+        image_size: Network input size
+        runs: Passes over the images (after one warmup pass)
+        threads: ONNX Runtime intra-op threads, to mimic the inference nodes
+
+    Returns:
+        dict: mean, p50 and p95 latency in milliseconds
+    """
+    from inference_config import InferenceConfig, ENGINE_ONNXRUNTIME
+    from onnx_engine import OnnxEngine
+
+    engine = OnnxEngine(model_path, intra_op_threads=threads, inter_op_threads=1)
+    config = InferenceConfig(model_path=model_path, image_size=image_size, conf_threshold=0.25, engine=ENGINE_ONNXRUNTIME)
+
+    for image in images:
+        engine.predict([image], config)
+
+    latencies = []
+    for _ in range(runs):
+        for image in images:
+            start = time.perf_counter()
+            engine.predict([image], config)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    return {
+        "mean_ms": float(np.mean(latencies)),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+    }
+
+
+def pick_variant(variants: dict, max_map_drop: float) -> str:
+    """
+    Fastest variant whose mAP50-95 is at most `max_map_drop` below the FP32 model.
+
+    Args:
+        variants: Report entries by variant name, with "map50_95" and "latency" keys
+        max_map_drop: Accuracy budget, in absolute mAP50-95 points (e.g. 0.01)
+
+    Returns:
+        str: Name of the recommended variant
+    """
+    baseline = variants[VARIANT_FP32]["map50_95"]
+    eligible = [name for name, entry in variants.items() if baseline - entry["map50_95"] <= max_map_drop]
+    return min(eligible, key=lambda name: variants[name]["latency"]["p50_ms"])
+
+
+def export_fp32(exported_path: str, output_folder: str) -> str:
+    """
+    Copy the model exported by ultralytics next to its quantized variants.
+
+    Args:
+        exported_path: Path returned by `YOLO.export`
+        output_folder: Folder of the variants
+
+    Returns:
+        str: Path of the FP32 variant
+    """
+    os.makedirs(output_folder, exist_ok=True)
+    target = os.path.join(output_folder, f"{Path(exported_path).stem}_{VARIANT_FP32}.onnx")
+    shutil.copyfile(exported_path, target)
+    return target
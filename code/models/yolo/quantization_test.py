@@ -0,0 +1,85 @@
+# External imports
+import os
+import tempfile
+import unittest
+import cv2
+import numpy as np
+from quantization import CalibrationReader, dataset_images, sample_images, pick_variant
+
+
+class TestQuantization(unittest.TestCase):
+    """
+    This class tests the calibration set and the variant selection of the quantized export.
+    """
+
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        root = self.tmp_dir.name
+        for split in ("train", "valid"):
+            os.makedirs(os.path.join(root, split, "images"))
+            for i in range(3):
+                cv2.imwrite(os.path.join(root, split, "images", f"{i}.jpg"), np.zeros((48, 64, 3), dtype=np.uint8))
+        with open(os.path.join(root, "val.txt"), "w") as f:
+            f.write("valid/images/0.jpg\nvalid/images/1.jpg\n")
+        self.data_yaml = os.path.join(root, "data.yaml")
+        with open(self.data_yaml, "w") as f:
+            f.write("train: train/images\nval: val.txt\ntest: [train/images, valid/images]\nnames: ['Tomato']\n")
+
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+
+    def test_dataset_images(self):
+        """
+        Tests that splits given as a directory, a .txt list or a list of directories are resolved.
+        """
+
+        self.assertEqual([os.path.basename(p) for p in dataset_images(self.data_yaml, "train")], ["0.jpg", "1.jpg", "2.jpg"])
+        self.assertEqual(len(dataset_images(self.data_yaml, "val")), 2)
+        self.assertEqual(len(dataset_images(self.data_yaml, "test")), 6)
+        with self.assertRaises(ValueError):
+            dataset_images(self.data_yaml, "calib")
+
+
+    def test_sample_is_deterministic(self):
+        """
+        Tests that the calibration sample does not change across runs.
+        """
+
+        images = [f"{i}.jpg" for i in range(100)]
+        self.assertEqual(sample_images(images, 10), sample_images(images, 10))
+        self.assertEqual(len(sample_images(images, 10)), 10)
+        self.assertEqual(sample_images(images[:5], 10), images[:5])
+
+
+    def test_calibration_reader(self):
+        """
+        Tests that calibration images are letterboxed into single-image batches, then exhausted.
+        """
+
+        reader = CalibrationReader(dataset_images(self.data_yaml, "train"), "images", 64)
+        batches = []
+        while (batch := reader.get_next()) is not None:
+            batches.append(batch)
+        self.assertEqual(len(batches), 3)
+        self.assertEqual(batches[0]["images"].shape, (1, 3, 64, 64))
+        reader.rewind()
+        self.assertIsNotNone(reader.get_next())
+
+
+    def test_pick_variant(self):
+        """
+        Tests that the fastest variant within the accuracy budget is recommended.
+        """
+
+        variants = {
+            "fp32": {"map50_95": 0.60, "latency": {"p50_ms": 100.0}},
+            "fp16": {"map50_95": 0.60, "latency": {"p50_ms": 120.0}},
+            "int8_dynamic": {"map50_95": 0.595, "latency": {"p50_ms": 70.0}},
+            "int8_static": {"map50_95": 0.55, "latency": {"p50_ms": 40.0}},
+        }
+        self.assertEqual(pick_variant(variants, 0.01), "int8_dynamic")
+        self.assertEqual(pick_variant(variants, 0.1), "int8_static")
+        self.assertEqual(pick_variant(variants, 0.0), "fp32")
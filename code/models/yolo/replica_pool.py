@@ -0,0 +1,228 @@
+"""
+Pool of inference replica processes behind the batch scheduler.
+Each replica is a single-process executor with its own model; batches go to the least-loaded replica.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+
+def process_memory(pid: int) -> dict:
+    """
+    Resident and proportional memory of a process.
+
+    PSS splits every shared page (memory-mapped weights, shared libraries) between the processes mapping it,
+    so the PSS of all replicas adds up to the memory they actually use, unlike their RSS.
+
+    Args:
+        pid: Process id
+
+    Returns:
+        dict: rss_bytes and pss_bytes (None where /proc is not available)
+    """
+    memory = {"rss_bytes": None, "pss_bytes": None}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", "r") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in ("Rss", "Pss"):
+                    memory[f"{key.lower()}_bytes"] = int(value.split()[0]) * 1024
+    except OSError:
+        pass
+    return memory
+
+
+def _call(fn: Callable, args: tuple, kwargs: dict, collect_events: Callable[[], list] | None):
+    """Run a task in a replica, returning its result with the busy time, the replica pid and the events it recorded."""
+    start = time.perf_counter()
+    try:
+        result = fn(*args, **kwargs)
+    finally:
+        events = collect_events() if collect_events is not None else []
+    return result, time.perf_counter() - start, os.getpid(), events
+
+
+class _Replica:
+    """A replica process and its load counters (updated on the event loop and executor callbacks)."""
+
+    def __init__(self, index: int, executor: ProcessPoolExecutor):
+        self.index = index
+        self.executor = executor
+        self.pid: int | None = None
+        self.in_flight = 0
+        self.tasks = 0
+        self.errors = 0
+        self.restarts = 0
+        self.busy_seconds = 0.0
+        self.started = time.monotonic()
+
+
+class ReplicaPool(Executor):
+    """
+    Executor dispatching each task to the least-loaded of `replicas` worker processes.
+
+    Replicas are started from a fork server, a clean single-threaded process, so they never inherit the threads
+    of the HTTP front end. A replica that dies is replaced; the tasks it was running fail with BrokenProcessPool.
+    """
+
+    def __init__(
+        self,
+        replicas: int,
+        initializer: Callable | None = None,
+        initargs: tuple = (),
+        collect_events: Callable[[], list] | None = None,
+        on_events: Callable[[list], None] | None = None,
+        preload: tuple[str, ...] = (),
+    ):
+        """
+        Args:
+            replicas: Number of worker processes
+            initializer: Function run once in every replica (e.g. to size its thread pools)
+            initargs: Arguments of the initializer
+            collect_events: Function run in the replica after every task, returning the events it recorded
+                (e.g. stage timings), which are otherwise lost with the replica's memory
+            on_events: Function receiving those events in this process
+            preload: Modules imported once by the fork server, so replicas (and their restarts) start with them
+                already imported, sharing their memory
+        """
+        methods = multiprocessing.get_all_start_methods()
+        self._context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+        if preload and self._context.get_start_method() == "forkserver":
+            self._context.set_forkserver_preload(list(preload))
+        self._initializer = initializer
+        self._initargs = initargs
+        self._collect_events = collect_events
+        self._on_events = on_events
+        self._lock = threading.Lock()
+        self._replicas = [_Replica(index, self._new_executor()) for index in range(max(1, replicas))]
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=self._context,
+            initializer=self._initializer,
+            initargs=self._initargs,
+        )
+
+    def __len__(self) -> int:
+        return len(self._replicas)
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        """
+        Run `fn(*args, **kwargs)` on the replica with the fewest tasks in flight (then the least busy one).
+
+        The function, its arguments and its result must be picklable.
+        """
+        with self._lock:
+            replica = min(self._replicas, key=lambda r: (r.in_flight, r.busy_seconds))
+        return self._submit_to(replica, fn, args, kwargs)
+
+    def submit_to(self, index: int, fn, /, *args, **kwargs) -> Future:
+        """Run `fn(*args, **kwargs)` on a given replica."""
+        return self._submit_to(self._replicas[index], fn, args, kwargs)
+
+    def broadcast(self, fn, /, *args, **kwargs) -> list[Future]:
+        """
+        Run `fn(*args, **kwargs)` on every replica, e.g. to load or activate a model version.
+
+        Returns:
+            list: One future per replica
+        """
+        return [self._submit_to(replica, fn, args, kwargs) for replica in self._replicas]
+
+    def _submit_to(self, replica: _Replica, fn, args: tuple, kwargs: dict) -> Future:
+        # Tasks cannot be cancelled once sent to a replica
+        future = Future()
+        future.set_running_or_notify_cancel()
+        with self._lock:
+            replica.in_flight += 1
+            executor = replica.executor
+        try:
+            try:
+                inner = executor.submit(_call, fn, args, kwargs, self._collect_events)
+            except BrokenProcessPool:
+                self._restart(replica, executor)
+                with self._lock:
+                    executor = replica.executor
+                inner = executor.submit(_call, fn, args, kwargs, self._collect_events)
+        except BaseException:
+            with self._lock:
+                replica.in_flight -= 1
+            raise
+
+        def done(inner: Future):
+            error = inner.exception()
+            with self._lock:
+                replica.in_flight -= 1
+                replica.tasks += 1
+                if error is None:
+                    result, busy_seconds, pid, events = inner.result()
+                    replica.busy_seconds += busy_seconds
+                    replica.pid = pid
+                else:
+                    replica.errors += 1
+            if isinstance(error, BrokenProcessPool):
+                self._restart(replica, executor)
+            if error is not None:
+                future.set_exception(error)
+                return
+            if events and self._on_events is not None:
+                self._on_events(events)
+            future.set_result(result)
+
+        inner.add_done_callback(done)
+        return future
+
+    def _restart(self, replica: _Replica, broken: ProcessPoolExecutor):
+        """Replace the executor of a replica whose process died (once, even if several tasks report it)."""
+        with self._lock:
+            if replica.executor is not broken:
+                return
+            replica.executor = self._new_executor()
+            replica.pid = None
+            replica.restarts += 1
+        logger.error(f"Inference replica {replica.index} died, restarting it")
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        """
+        Snapshot of the replicas.
+
+        Returns:
+            dict: Per replica, its pid, tasks in flight and completed, errors, restarts, busy time, utilization
+                (busy time over uptime) and memory; plus the total PSS of the replicas
+        """
+        now = time.monotonic()
+        with self._lock:
+            replicas = [
+                {
+                    "replica": replica.index,
+                    "pid": replica.pid,
+                    "in_flight": replica.in_flight,
+                    "tasks": replica.tasks,
+                    "errors": replica.errors,
+                    "restarts": replica.restarts,
+                    "busy_seconds": replica.busy_seconds,
+                    "utilization": replica.busy_seconds / max(now - replica.started, 1e-9),
+                }
+                for replica in self._replicas
+            ]
+        for replica in replicas:
+            replica.update(process_memory(replica["pid"]) if replica["pid"] else {"rss_bytes": None, "pss_bytes": None})
+        pss = [replica["pss_bytes"] for replica in replicas if replica["pss_bytes"] is not None]
+        return {
+            "replicas": replicas,
+            "total_pss_bytes": sum(pss) if pss else None,
+        }
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False):
+        """Stop every replica process."""
+        for replica in self._replicas:
+            replica.executor.shutdown(wait=wait, cancel_futures=cancel_futures)
@@ -0,0 +1,80 @@
+# External imports
+import os
+import time
+import unittest
+from concurrent.futures.process import BrokenProcessPool
+from replica_pool import ReplicaPool
+
+
+def pid_after(seconds: float) -> int:
+    time.sleep(seconds)
+    return os.getpid()
+
+
+def fail():
+    raise ValueError("bad batch")
+
+
+def crash():
+    os._exit(1)
+
+
+def events() -> list:
+    return [("stage", "inference", 0.01)]
+
+
+class TestReplicaPool(unittest.TestCase):
+    """
+    This class tests the dispatch, event forwarding and recovery of the inference replica pool.
+    """
+
+
+    def setUp(self):
+        self.received = []
+        self.pool = ReplicaPool(2, collect_events=events, on_events=self.received.extend)
+
+
+    def tearDown(self):
+        self.pool.shutdown(wait=True)
+
+
+    def test_least_loaded_dispatch(self):
+        """
+        Tests that a task goes to the idle replica while the other one is busy.
+        """
+
+        busy = self.pool.submit(pid_after, 0.5)
+        idle = self.pool.submit(pid_after, 0.0)
+        self.assertNotEqual(busy.result(timeout=30), idle.result(timeout=30))
+
+        pids = [future.result(timeout=30) for future in self.pool.broadcast(pid_after, 0.0)]
+        self.assertEqual(len(set(pids)), 2)
+
+
+    def test_events_and_stats(self):
+        """
+        Tests that the events recorded in a replica reach this process and that utilization is reported.
+        """
+
+        self.pool.submit(pid_after, 0.1).result(timeout=30)
+        self.assertEqual(self.received, [("stage", "inference", 0.01)])
+
+        stats = self.pool.stats()
+        self.assertEqual(sum(replica["tasks"] for replica in stats["replicas"]), 1)
+        self.assertTrue(any(replica["utilization"] > 0 for replica in stats["replicas"]))
+        if os.path.exists("/proc/self/smaps_rollup"):
+            self.assertGreater(stats["total_pss_bytes"], 0)
+
+
+    def test_errors_and_restart(self):
+        """
+        Tests that task errors reach the caller and that a dead replica is replaced.
+        """
+
+        with self.assertRaises(ValueError):
+            self.pool.submit(fail).result(timeout=30)
+
+        with self.assertRaises(BrokenProcessPool):
+            self.pool.submit_to(0, crash).result(timeout=30)
+        self.assertIsInstance(self.pool.submit_to(0, pid_after, 0.0).result(timeout=30), int)
+        self.assertEqual(self.pool.stats()["replicas"][0]["restarts"], 1)
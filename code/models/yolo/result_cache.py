@@ -0,0 +1,275 @@
+"""
+Content-addressed cache of detection results.
+Identical images (same bytes, model version and inference config) are served without running the model;
+an optional perceptual-hash index also matches near-duplicate photos.
+"""
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import cv2
+import numpy as np
+
+from inference_config import InferenceConfig
+
+logger = logging.getLogger(__name__)
+
+# Number of set bits of every byte value, used for vectorized Hamming distances
+_POPCOUNT8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def cache_namespace(model_version: str, config: InferenceConfig) -> str:
+    """
+    Identifier of everything, besides the image, that determines a detection result.
+
+    Args:
+        model_version: Version of the weights serving the request
+        config: Inference configuration
+
+    Returns:
+        str: Namespace string
+    """
+    config_digest = hashlib.sha256(json.dumps(config.to_dict(), sort_keys=True).encode()).hexdigest()[:16]
+    return f"{model_version}|{config_digest}"
+
+
+def content_key(data: bytes, namespace: str) -> str:
+    """
+    Cache key of an encoded image within a namespace.
+
+    Args:
+        data: Encoded image bytes
+        namespace: Result of `cache_namespace`
+
+    Returns:
+        str: Hex digest
+    """
+    digest = hashlib.sha256(data)
+    digest.update(namespace.encode())
+    return digest.hexdigest()
+
+
+def dhash(image: np.ndarray, hash_size: int = 8) -> int:
+    """
+    Difference hash of an image: robust to re-encoding, resizing and small lighting changes.
+
+    Args:
+        image: BGR image
+        hash_size: Side of the hash grid (8 gives a 64-bit hash)
+
+    Returns:
+        int: Unsigned 64-bit perceptual hash
+    """
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+@dataclass
+class _Entry:
+    namespace: str
+    phash: int | None
+    result: list
+
+
+class DetectionCache:
+    """
+    Bounded LRU cache of detection results, with an optional near-duplicate index and on-disk persistence.
+    """
+
+    def __init__(self, max_entries: int = 1024, near_duplicate_distance: int = 0, persist_path: str | None = None):
+        """
+        Args:
+            max_entries: Maximum number of cached results (0 disables the cache)
+            near_duplicate_distance: Maximum Hamming distance between perceptual hashes
+                for a near-duplicate hit (0 disables the near-duplicate lookup)
+            persist_path: SQLite file where entries survive restarts (None keeps them in memory only)
+        """
+        self.max_entries = max(0, max_entries)
+        self.near_duplicate_distance = max(0, near_duplicate_distance)
+        self.persist_path = persist_path
+
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._lock = threading.Lock()
+        # SQLite writes hold their own lock, so lookups never wait for the disk
+        self._db_lock = threading.Lock()
+
+        # Perceptual hashes as an array, rebuilt lazily after changes
+        self._phash_keys: list[str] = []
+        self._phash_values = np.zeros((0,), dtype=np.uint64)
+        self._phash_dirty = False
+
+        # Metrics
+        self._hits = 0
+        self._near_hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+        self._db = None
+        if self.enabled and persist_path:
+            self._open_db(persist_path)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get(self, key: str) -> list | None:
+        """
+        Exact lookup by content key.
+
+        Args:
+            key: Result of `content_key`
+
+        Returns:
+            list or None: Cached ingredients
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry.result
+
+    def get_near(self, phash: int, namespace: str) -> list | None:
+        """
+        Near-duplicate lookup: closest cached image of the same namespace within the Hamming distance.
+
+        Args:
+            phash: Perceptual hash of the image
+            namespace: Result of `cache_namespace`
+
+        Returns:
+            list or None: Cached ingredients
+        """
+        if not self.enabled or self.near_duplicate_distance == 0:
+            return None
+        with self._lock:
+            if self._phash_dirty:
+                self._rebuild_phash_index()
+            if len(self._phash_keys) == 0:
+                return None
+
+            distances = _POPCOUNT8[(self._phash_values ^ np.uint64(phash)).view(np.uint8)].reshape(-1, 8).sum(axis=1)
+            for index in np.argsort(distances, kind="stable"):
+                if distances[index] > self.near_duplicate_distance:
+                    break
+                key = self._phash_keys[index]
+                entry = self._entries[key]
+                if entry.namespace == namespace:
+                    self._entries.move_to_end(key)
+                    self._near_hits += 1
+                    return entry.result
+            return None
+
+    def record_miss(self):
+        """Count a request that had to run the model."""
+        with self._lock:
+            self._misses += 1
+
+    def put(self, key: str, namespace: str, phash: int | None, result: list):
+        """
+        Store a result, evicting the least recently used entries beyond `max_entries`.
+        Writes to the SQLite file when persistent: call it from a worker thread, not the event loop.
+
+        Args:
+            key: Result of `content_key`
+            namespace: Result of `cache_namespace`
+            phash: Perceptual hash of the image (None when not computed)
+            result: Ingredients to cache
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            evicted = self._store(key, _Entry(namespace=namespace, phash=phash, result=result))
+        if self._db is None:
+            return
+        # Outside the entries lock: a row left behind by concurrent writes is trimmed when the file is loaded
+        with self._db_lock:
+            self._db.executemany("DELETE FROM detections WHERE key = ?", [(evicted_key,) for evicted_key in evicted])
+            self._db.execute(
+                "INSERT OR REPLACE INTO detections (key, namespace, phash, result, stored_at) VALUES (?, ?, ?, ?, ?)",
+                (key, namespace, None if phash is None else str(phash), json.dumps(result), time.time())
+            )
+            self._db.commit()
+
+    def clear(self):
+        """Drop every entry (e.g. after a model change)."""
+        with self._lock:
+            self._entries.clear()
+            self._phash_dirty = True
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute("DELETE FROM detections")
+                self._db.commit()
+
+    def stats(self) -> dict:
+        """
+        Snapshot of the cache metrics.
+
+        Returns:
+            dict: Size, hit/miss/eviction counters and hit rate
+        """
+        lookups = self._hits + self._near_hits + self._misses
+        return {
+            "enabled": self.enabled,
+            "max_entries": self.max_entries,
+            "entries": len(self._entries),
+            "near_duplicate_distance": self.near_duplicate_distance,
+            "persistent": self._db is not None,
+            "hits": self._hits,
+            "near_hits": self._near_hits,
+            "misses": self._misses,
+            "evictions": self._evictions,
+            "hit_rate": (self._hits + self._near_hits) / lookups if lookups else 0.0,
+        }
+
+    def _store(self, key: str, entry: _Entry) -> list[str]:
+        """Store an entry in memory, returning the keys it evicted."""
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        self._phash_dirty = True
+        evicted = []
+        while len(self._entries) > self.max_entries:
+            evicted_key, _ = self._entries.popitem(last=False)
+            self._evictions += 1
+            evicted.append(evicted_key)
+        return evicted
+
+    def _rebuild_phash_index(self):
+        keys = [key for key, entry in self._entries.items() if entry.phash is not None]
+        self._phash_keys = keys
+        self._phash_values = np.array([self._entries[key].phash for key in keys], dtype=np.uint64)
+        self._phash_dirty = False
+
+    def _open_db(self, path: str):
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS detections "
+            "(key TEXT PRIMARY KEY, namespace TEXT NOT NULL, phash TEXT, result TEXT NOT NULL, stored_at REAL NOT NULL)"
+        )
+
+        # Reload the most recent entries, oldest first so the LRU order is preserved
+        rows = self._db.execute(
+            "SELECT key, namespace, phash, result FROM detections ORDER BY stored_at DESC LIMIT ?",
+            (self.max_entries,)
+        ).fetchall()
+        for key, namespace, phash, result in reversed(rows):
+            self._entries[key] = _Entry(namespace=namespace, phash=None if phash is None else int(phash), result=json.loads(result))
+        self._phash_dirty = True
+        self._db.execute(
+            "DELETE FROM detections WHERE key NOT IN (SELECT key FROM detections ORDER BY stored_at DESC LIMIT ?)",
+            (self.max_entries,)
+        )
+        self._db.commit()
+        logger.info(f"Loaded {len(rows)} cached detections from {path}")
@@ -0,0 +1,77 @@
+# External imports
+import os
+import tempfile
+import unittest
+import numpy as np
+from inference_config import InferenceConfig
+from result_cache import DetectionCache, cache_namespace, content_key, dhash
+
+
+class TestDetectionCache(unittest.TestCase):
+    """
+    This class tests the content-addressed detection cache.
+    """
+
+
+    def setUp(self):
+        config = InferenceConfig(model_path=None, image_size=640, conf_threshold=0.25)
+        self.namespace = cache_namespace("ultralytics:yolo_best.pt", config)
+        self.result = [{"name": "Tomato", "confidence": 0.9, "box": [0.0, 0.0, 10.0, 10.0]}]
+
+
+    def test_key_depends_on_model_and_config(self):
+        """
+        Tests that the same bytes get another key with another model version or configuration.
+        """
+
+        config = InferenceConfig(model_path=None, image_size=640, conf_threshold=0.25)
+        other_model = cache_namespace("onnxruntime:yolo_best.onnx", config)
+        other_config = cache_namespace("ultralytics:yolo_best.pt", InferenceConfig(model_path=None, image_size=320, conf_threshold=0.25))
+        keys = {content_key(b"image", namespace) for namespace in (self.namespace, other_model, other_config)}
+        self.assertEqual(len(keys), 3)
+
+
+    def test_lru_eviction(self):
+        """
+        Tests that the least recently used entry is evicted first.
+        """
+
+        cache = DetectionCache(max_entries=2)
+        cache.put("a", self.namespace, None, self.result)
+        cache.put("b", self.namespace, None, self.result)
+        cache.get("a")
+        cache.put("c", self.namespace, None, self.result)
+
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+
+    def test_near_duplicate(self):
+        """
+        Tests that a slightly different photo of the same scene hits the perceptual-hash index.
+        """
+
+        rng = np.random.default_rng(0)
+        image = rng.integers(0, 256, (120, 160, 3), dtype=np.uint8)
+        brighter = np.clip(image.astype(np.int16) + 3, 0, 255).astype(np.uint8)
+        other = rng.integers(0, 256, (120, 160, 3), dtype=np.uint8)
+
+        cache = DetectionCache(max_entries=10, near_duplicate_distance=6)
+        cache.put("a", self.namespace, dhash(image), self.result)
+
+        self.assertEqual(cache.get_near(dhash(brighter), self.namespace), self.result)
+        self.assertIsNone(cache.get_near(dhash(other), self.namespace))
+        self.assertIsNone(cache.get_near(dhash(image), "another model"))
+
+
+    def test_persistence(self):
+        """
+        Tests that entries survive a restart when persistence is enabled.
+        """
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "cache.sqlite")
+            DetectionCache(max_entries=10, persist_path=path).put("a", self.namespace, 42, self.result)
+            reloaded = DetectionCache(max_entries=10, persist_path=path)
+            self.assertEqual(reloaded.get("a"), self.result)
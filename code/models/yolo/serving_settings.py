@@ -0,0 +1,129 @@
+"""
+Serving settings for the Models Service.
+Values are read from environment variables so the same image can be tuned per deployment.
+"""
+import math
+import os
+from dataclasses import dataclass
+
+
+def available_cpus() -> int:
+    """
+    CPUs this process may use: its CPU affinity, capped by the cgroup (container) CPU quota.
+
+    Returns:
+        int: Number of usable CPUs, at least 1
+    """
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+    try:
+        with open("/sys/fs/cgroup/cpu.max", "r") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    return max(1, cpus)
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+def _env_int_list(name: str) -> tuple[int, ...]:
+    value = os.getenv(name, "")
+    return tuple(int(item) for item in value.split(",") if item.strip())
+
+
+def _env_str_list(name: str) -> tuple[str, ...]:
+    value = os.getenv(name, "")
+    return tuple(item.strip() for item in value.split(",") if item.strip())
+
+
+def _env_replicas(name: str) -> int:
+    value = os.getenv(name, "").strip().lower()
+    if value == "auto":
+        return available_cpus()
+    return max(0, int(value)) if value else 0
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value not in (None, "") else default
+
+
+@dataclass(frozen=True)
+class ServingSettings:
+    """
+    Tunables of the HTTP serving layer (not of the model itself, see config_yolo_inf.yaml).
+
+    Attributes:
+        batch_max_size: Maximum number of images grouped in a single forward pass
+        batch_max_wait_ms: Maximum time the first queued image waits for a batch to fill up
+        inference_workers: Threads of the executor running forward passes off the event loop
+        max_in_flight: Maximum number of admitted prediction requests
+        max_queue: Maximum number of requests waiting for admission
+        admission_timeout_ms: Maximum time a request waits for admission before a 429
+        retry_after_s: Retry-After value returned with 429 responses
+        warmup_runs: Warmup inferences per image size run at startup (0 disables the warmup passes)
+        warmup_sizes: Image sizes to warm up (empty means the configured image_size)
+        cache_max_entries: Maximum number of cached detection results (0 disables the cache)
+        cache_near_duplicate_distance: Maximum perceptual-hash Hamming distance of a near-duplicate hit (0 disables it)
+        cache_persist_path: SQLite file persisting the cache across restarts (empty keeps it in memory)
+        shared_volume_root: Directory where the volume shared with the backend is mounted
+        batch_request_max_images: Maximum number of images in a single /predict/batch request
+        model_dir: Folder of the .pt/.onnx files registered as model versions (empty means yolo/model_weights)
+        model_preload: Model versions loaded and warmed up at startup besides the active one, ready to be activated
+        inference_replicas: Inference worker processes, each with its own model (0 runs inference in this process)
+        admin_token: Bearer token of the admin endpoints (config reload, model load/activate/unload); empty disables them
+    """
+    batch_max_size: int = 8
+    batch_max_wait_ms: float = 15.0
+    inference_workers: int = 1
+    max_in_flight: int = 32
+    max_queue: int = 64
+    admission_timeout_ms: float = 2000.0
+    retry_after_s: int = 1
+    warmup_runs: int = 2
+    warmup_sizes: tuple[int, ...] = ()
+    cache_max_entries: int = 1024
+    cache_near_duplicate_distance: int = 0
+    cache_persist_path: str = ""
+    shared_volume_root: str = "uploads"
+    batch_request_max_images: int = 256
+    model_dir: str = ""
+    model_preload: tuple[str, ...] = ()
+    inference_replicas: int = 0
+    admin_token: str = ""
+
+    @classmethod
+    def from_env(cls) -> "ServingSettings":
+        """
+        Build the settings from environment variables, falling back to the defaults.
+
+        Returns:
+            ServingSettings: Settings for this process
+        """
+        return cls(
+            batch_max_size=max(1, _env_int("BATCH_MAX_SIZE", cls.batch_max_size)),
+            batch_max_wait_ms=max(0.0, _env_float("BATCH_MAX_WAIT_MS", cls.batch_max_wait_ms)),
+            inference_workers=max(1, _env_int("INFERENCE_WORKERS", cls.inference_workers)),
+            max_in_flight=max(1, _env_int("MAX_IN_FLIGHT", cls.max_in_flight)),
+            max_queue=max(0, _env_int("MAX_QUEUE", cls.max_queue)),
+            admission_timeout_ms=max(0.0, _env_float("ADMISSION_TIMEOUT_MS", cls.admission_timeout_ms)),
+            retry_after_s=max(1, _env_int("RETRY_AFTER_S", cls.retry_after_s)),
+            warmup_runs=max(0, _env_int("WARMUP_RUNS", cls.warmup_runs)),
+            warmup_sizes=_env_int_list("WARMUP_SIZES"),
+            cache_max_entries=max(0, _env_int("CACHE_MAX_ENTRIES", cls.cache_max_entries)),
+            cache_near_duplicate_distance=max(0, _env_int("CACHE_NEAR_DUPLICATE_DISTANCE", cls.cache_near_duplicate_distance)),
+            cache_persist_path=os.getenv("CACHE_PERSIST_PATH", cls.cache_persist_path),
+            shared_volume_root=os.getenv("SHARED_VOLUME_ROOT", cls.shared_volume_root),
+            batch_request_max_images=max(1, _env_int("BATCH_REQUEST_MAX_IMAGES", cls.batch_request_max_images)),
+            model_dir=os.getenv("MODEL_DIR", cls.model_dir),
+            model_preload=_env_str_list("MODEL_PRELOAD"),
+            inference_replicas=_env_replicas("INFERENCE_REPLICAS"),
+            admin_token=os.getenv("ADMIN_TOKEN", cls.admin_token),
+        )
+
+
+settings = ServingSettings.from_env()
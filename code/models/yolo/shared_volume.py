@@ -0,0 +1,80 @@
+"""
+Access to images on the volume shared with the backend.
+Client-supplied paths are sandboxed: only regular image files under the volume root can be read.
+"""
+import mmap
+import os
+from pathlib import PurePosixPath
+
+# Name of the shared directory in the backend's layout ("uploads/recipes/..."), accepted as a path prefix
+VOLUME_PREFIX = "uploads"
+
+# Extensions of the files that can be read through the shared volume
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+
+
+def resolve_shared_path(path: str, root: str) -> str:
+    """
+    Resolve a client-supplied path to a file inside the shared volume.
+
+    The path is relative to the volume root; a leading "uploads/" (the backend's layout) is accepted.
+    Absolute paths, ".." components and symlinks pointing outside the root are rejected.
+
+    Args:
+        path: Relative path sent by the client, e.g. "uploads/recipes/fridge_photo.jpg"
+        root: Directory where the shared volume is mounted
+
+    Returns:
+        str: Real path of the file
+
+    Raises:
+        ValueError: If the path is not allowed
+        FileNotFoundError: If the file does not exist
+    """
+    if not path or "\x00" in path:
+        raise ValueError("Invalid path")
+
+    relative = PurePosixPath(path.replace("\\", "/"))
+    if relative.is_absolute():
+        raise ValueError("Absolute paths are not allowed")
+    if ".." in relative.parts:
+        raise ValueError("Parent directory references are not allowed")
+    if relative.parts and relative.parts[0] == VOLUME_PREFIX:
+        relative = PurePosixPath(*relative.parts[1:])
+    if relative.suffix.lower() not in IMAGE_EXTENSIONS:
+        raise ValueError(f"Unsupported file type: {relative.suffix or 'none'}")
+
+    # Resolve symlinks before checking containment, so a link cannot escape the volume
+    real_root = os.path.realpath(root)
+    real_path = os.path.realpath(os.path.join(real_root, *relative.parts))
+    if os.path.commonpath([real_root, real_path]) != real_root:
+        raise ValueError("Path is outside the shared volume")
+    if not os.path.isfile(real_path):
+        raise FileNotFoundError(f"Image not found: {path}")
+    return real_path
+
+
+def read_shared_file(path: str, root: str) -> bytes | mmap.mmap:
+    """
+    Read an image from the shared volume, memory-mapped where possible.
+
+    The mapping is read-only and is decoded in place, so the file is never copied into the process;
+    it is unmapped when the returned object is garbage collected.
+
+    Args:
+        path: Relative path sent by the client
+        root: Directory where the shared volume is mounted
+
+    Returns:
+        bytes or mmap: Encoded image (bytes when the file is empty or cannot be mapped)
+
+    Raises:
+        ValueError: If the path is not allowed
+        FileNotFoundError: If the file does not exist
+    """
+    with open(resolve_shared_path(path, root), "rb") as f:
+        try:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            # Empty files cannot be mapped, and some filesystems do not support mmap
+            return f.read()
@@ -0,0 +1,85 @@
+# External imports
+import hashlib
+import os
+import tempfile
+import unittest
+import cv2
+import numpy as np
+from image_io import decode_image
+from shared_volume import resolve_shared_path, read_shared_file
+
+
+class TestSharedVolume(unittest.TestCase):
+    """
+    This class tests the sandboxing of paths on the shared volume.
+    """
+
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmp_dir.name, "uploads")
+        os.makedirs(os.path.join(self.root, "recipes"))
+        self.image = os.path.join(self.root, "recipes", "fridge.jpg")
+        with open(self.image, "wb") as f:
+            f.write(b"jpeg bytes")
+        with open(os.path.join(self.tmp_dir.name, "secret.jpg"), "wb") as f:
+            f.write(b"secret")
+
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+
+    def test_relative_paths(self):
+        """
+        Tests that paths relative to the volume, with or without the backend's "uploads/" prefix, are read.
+        """
+
+        self.assertEqual(bytes(read_shared_file("uploads/recipes/fridge.jpg", self.root)), b"jpeg bytes")
+        self.assertEqual(bytes(read_shared_file("recipes/fridge.jpg", self.root)), b"jpeg bytes")
+
+
+    def test_rejects_escapes(self):
+        """
+        Tests that absolute paths, parent references and symlinks leaving the volume are rejected.
+        """
+
+        os.symlink(os.path.join(self.tmp_dir.name, "secret.jpg"), os.path.join(self.root, "link.jpg"))
+        for path in (self.image, "uploads/../secret.jpg", "../secret.jpg", "link.jpg", "recipes/fridge.txt", ""):
+            with self.assertRaises(ValueError, msg=path):
+                resolve_shared_path(path, self.root)
+
+
+    def test_missing_file(self):
+        """
+        Tests that a missing image raises FileNotFoundError.
+        """
+
+        with self.assertRaises(FileNotFoundError):
+            resolve_shared_path("recipes/missing.jpg", self.root)
+
+
+    def test_memory_mapped_decode(self):
+        """
+        Tests that a memory-mapped image is hashed and decoded in place like the uploaded bytes.
+        """
+
+        ok, encoded = cv2.imencode(".jpg", np.zeros((40, 60, 3), dtype=np.uint8))
+        self.assertTrue(ok)
+        with open(os.path.join(self.root, "recipes", "black.jpg"), "wb") as f:
+            f.write(encoded.tobytes())
+
+        data = read_shared_file("recipes/black.jpg", self.root)
+        self.assertNotIsInstance(data, bytes)
+        self.assertEqual(hashlib.sha256(data).digest(), hashlib.sha256(encoded.tobytes()).digest())
+        image, _ = decode_image(data)
+        self.assertEqual(image.shape, (40, 60, 3))
+
+
+    def test_empty_file(self):
+        """
+        Tests that an empty file, which cannot be mapped, is read as empty bytes.
+        """
+
+        open(os.path.join(self.root, "recipes", "empty.jpg"), "wb").close()
+        self.assertEqual(read_shared_file("recipes/empty.jpg", self.root), b"")
@@ -0,0 +1,76 @@
+"""
+Single-flight execution for the Models Service.
+Concurrent requests for the same image (double submits, client retries) share one in-flight detection.
+"""
+import asyncio
+from functools import partial
+from typing import Awaitable, Callable
+
+
+class SingleFlight:
+    """
+    Runs one call per key at a time: callers arriving while a call for their key is in flight wait for its result
+    (or its exception) instead of starting their own.
+
+    The call runs in its own task, so a caller that goes away (client disconnect, timeout) does not cancel it
+    for the others. Once every caller has gone, the call is cancelled: it runs under its callers' admission slots,
+    released as they leave, so it must not keep running past them.
+    """
+
+    def __init__(self):
+        self._in_flight: dict[str, asyncio.Task] = {}
+        # Callers still waiting for each in-flight call
+        self._waiters: dict[asyncio.Task, int] = {}
+        self._leaders = 0
+        self._coalesced = 0
+
+    async def run(self, key: str, call: Callable[[], Awaitable]) -> tuple[object, bool]:
+        """
+        Run `call()` unless a call for `key` is already in flight, then wait for the result.
+
+        Args:
+            key: Identity of the work, e.g. the content hash of the image and the model version
+            call: Coroutine function doing the work
+
+        Returns:
+            tuple: (result, whether it was shared from another caller's call)
+        """
+        task = self._in_flight.get(key)
+        shared = task is not None
+        if shared:
+            self._coalesced += 1
+        else:
+            self._leaders += 1
+            task = asyncio.ensure_future(call())
+            self._in_flight[key] = task
+            task.add_done_callback(partial(self._finished, key))
+
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task), shared
+        finally:
+            self._waiters[task] -= 1
+            if self._waiters[task] == 0:
+                del self._waiters[task]
+                if not task.done():
+                    task.cancel()
+
+    def _finished(self, key: str, task: asyncio.Task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Retrieve the exception, which no caller may be left to await
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict:
+        """
+        Snapshot of the single-flight layer.
+
+        Returns:
+            dict: calls run (leaders), requests that shared another call (coalesced) and calls in flight
+        """
+        return {
+            "leaders": self._leaders,
+            "coalesced": self._coalesced,
+            "in_flight": len(self._in_flight),
+        }
@@ -0,0 +1,98 @@
+# External imports
+import asyncio
+import unittest
+from single_flight import SingleFlight
+
+
+class TestSingleFlight(unittest.TestCase):
+    """
+    This class tests the coalescing of concurrent identical requests.
+    """
+
+
+    def test_concurrent_calls_share_result(self):
+        """
+        Tests that concurrent callers with the same key share one call, and other keys run their own.
+        """
+
+        flight = SingleFlight()
+        calls = []
+
+        async def detect(name: str):
+            calls.append(name)
+            await asyncio.sleep(0.05)
+            return [name]
+
+        async def main():
+            return await asyncio.gather(
+                *(flight.run("a", lambda: detect("a")) for _ in range(3)),
+                flight.run("b", lambda: detect("b")),
+            )
+
+        results = asyncio.run(main())
+        self.assertEqual(calls, ["a", "b"])
+        self.assertEqual([result for result, _ in results], [["a"], ["a"], ["a"], ["b"]])
+        self.assertEqual([shared for _, shared in results], [False, True, True, False])
+        self.assertEqual(flight.stats(), {"leaders": 2, "coalesced": 2, "in_flight": 0})
+
+
+    def test_errors_and_cancellation(self):
+        """
+        Tests that an error reaches every waiter, and that a cancelled caller does not cancel the shared call.
+        """
+
+        flight = SingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0.02)
+            raise ValueError("Invalid image")
+
+        async def detect():
+            await asyncio.sleep(0.05)
+            return ["Tomato"]
+
+        async def main():
+            failures = await asyncio.gather(flight.run("bad", fail), flight.run("bad", fail), return_exceptions=True)
+            self.assertTrue(all(isinstance(failure, ValueError) for failure in failures))
+
+            leader = asyncio.create_task(flight.run("img", detect))
+            await asyncio.sleep(0.01)
+            follower = asyncio.create_task(flight.run("img", detect))
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            self.assertEqual(await follower, (["Tomato"], True))
+
+            # Once done, the next request runs a new call
+            self.assertEqual(await flight.run("img", detect), (["Tomato"], False))
+
+        asyncio.run(main())
+
+
+    def test_call_cancelled_with_last_caller(self):
+        """
+        Tests that a call is cancelled once every caller has gone, so it does not outlive their admission slots.
+        """
+
+        flight = SingleFlight()
+        cancelled = []
+
+        async def detect():
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        async def main():
+            callers = [asyncio.create_task(flight.run("img", detect)) for _ in range(2)]
+            await asyncio.sleep(0.01)
+            callers[0].cancel()
+            await asyncio.sleep(0.01)
+            self.assertEqual(cancelled, [])
+            callers[1].cancel()
+            await asyncio.gather(*callers, return_exceptions=True)
+            await asyncio.sleep(0.01)
+
+        asyncio.run(main())
+        self.assertEqual(cancelled, [True])
+        self.assertEqual(flight.stats()["in_flight"], 0)
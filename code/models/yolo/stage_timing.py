@@ -0,0 +1,103 @@
+"""
+Timing of the stages of a prediction (upload read, decode, preprocess, inference, NMS, post-process).
+Durations are pushed to the registered observers; with none registered, timing a stage costs two clock reads.
+"""
+import threading
+import time
+from typing import Callable
+
+# Stages, in pipeline order
+STAGE_UPLOAD_READ = "upload_read"
+STAGE_DECODE = "decode"
+STAGE_PREPROCESS = "preprocess"
+STAGE_INFERENCE = "inference"
+STAGE_NMS = "nms"
+STAGE_POSTPROCESS = "postprocess"
+STAGES = (STAGE_UPLOAD_READ, STAGE_DECODE, STAGE_PREPROCESS, STAGE_INFERENCE, STAGE_NMS, STAGE_POSTPROCESS)
+
+_observers: list[Callable[[str, float], None]] = []
+
+
+def add_observer(observer: Callable[[str, float], None]):
+    """
+    Register a callable receiving (stage, seconds) for every timed stage.
+
+    Observers are called on the thread that ran the stage and must be cheap and thread-safe.
+    """
+    if observer not in _observers:
+        _observers.append(observer)
+
+
+def remove_observer(observer: Callable[[str, float], None]):
+    """Unregister an observer added with `add_observer`."""
+    if observer in _observers:
+        _observers.remove(observer)
+
+
+def record(stage: str, seconds: float):
+    """
+    Report the duration of a stage measured elsewhere (e.g. by ultralytics).
+
+    Args:
+        stage: One of STAGES
+        seconds: Duration of the stage
+    """
+    for observer in _observers:
+        observer(stage, seconds)
+
+
+class timed:
+    """
+    Context manager timing a stage: `with timed(STAGE_INFERENCE): ...`.
+    Stages are timed per call, so a batched forward pass counts once.
+    """
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if _observers:
+            record(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+class StageStats:
+    """
+    Observer keeping the count, total and maximum duration of every stage.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._count = dict.fromkeys(STAGES, 0)
+        self._total = dict.fromkeys(STAGES, 0.0)
+        self._max = dict.fromkeys(STAGES, 0.0)
+
+    def __call__(self, stage: str, seconds: float):
+        with self._lock:
+            self._count[stage] = self._count.get(stage, 0) + 1
+            self._total[stage] = self._total.get(stage, 0.0) + seconds
+            self._max[stage] = max(self._max.get(stage, 0.0), seconds)
+
+    def stats(self) -> dict:
+        """
+        Snapshot of the stage timings.
+
+        Returns:
+            dict: Per stage, the number of timed calls, total and mean duration and maximum, in milliseconds
+        """
+        with self._lock:
+            return {
+                stage: {
+                    "count": self._count[stage],
+                    "total_ms": self._total[stage] * 1000,
+                    "mean_ms": self._total[stage] * 1000 / self._count[stage] if self._count[stage] else 0.0,
+                    "max_ms": self._max[stage] * 1000,
+                }
+                for stage in self._count
+            }
@@ -0,0 +1,59 @@
+# External imports
+import unittest
+import stage_timing
+from stage_timing import StageStats, add_observer, remove_observer, record, timed, STAGE_DECODE, STAGE_INFERENCE
+
+
+class TestStageTiming(unittest.TestCase):
+    """
+    This class tests the stage timers and their observers.
+    """
+
+
+    def setUp(self):
+        self.stats = StageStats()
+        add_observer(self.stats)
+
+
+    def tearDown(self):
+        remove_observer(self.stats)
+
+
+    def test_timed_stages(self):
+        """
+        Tests that timed blocks and externally measured durations reach the observers.
+        """
+
+        with timed(STAGE_DECODE):
+            pass
+        record(STAGE_INFERENCE, 0.25)
+        record(STAGE_INFERENCE, 0.75)
+
+        stats = self.stats.stats()
+        self.assertEqual(stats[STAGE_DECODE]["count"], 1)
+        self.assertEqual(stats[STAGE_INFERENCE]["count"], 2)
+        self.assertAlmostEqual(stats[STAGE_INFERENCE]["mean_ms"], 500.0)
+        self.assertAlmostEqual(stats[STAGE_INFERENCE]["max_ms"], 750.0)
+
+
+    def test_exception_is_timed_and_propagated(self):
+        """
+        Tests that a failing stage is still timed and its exception is not swallowed.
+        """
+
+        with self.assertRaises(RuntimeError):
+            with timed(STAGE_DECODE):
+                raise RuntimeError("boom")
+        self.assertEqual(self.stats.stats()[STAGE_DECODE]["count"], 1)
+
+
+    def test_no_observer(self):
+        """
+        Tests that nothing is recorded once the observer is removed.
+        """
+
+        remove_observer(self.stats)
+        with timed(STAGE_DECODE):
+            pass
+        self.assertEqual(self.stats.stats()[STAGE_DECODE]["count"], 0)
+        self.assertEqual(stage_timing._observers, [])
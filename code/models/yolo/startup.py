@@ -0,0 +1,88 @@
+"""
+Cold-start measurements of the Models Service: time since the process started, and the import-time profile
+written by `python -X importtime` (or PYTHONPROFILEIMPORTTIME=1), aggregated per top-level package.
+"""
+import os
+import re
+import time
+
+# Modules only the selected engine needs: importing them up front would slow down every start
+HEAVY_MODULES = ("torch", "ultralytics", "onnxruntime", "onnx")
+
+# "import time:       312 |       1459 |   fastapi.routing"
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+\d+\s+\|\s+(\S+)\s*$")
+
+
+def process_uptime() -> float | None:
+    """
+    Seconds since this process was started, interpreter start-up and imports included.
+
+    Returns:
+        float: Process age in seconds, or None where /proc is not available
+    """
+    try:
+        with open("/proc/self/stat", "r") as f:
+            # The command name may contain spaces: fields are counted after its closing parenthesis
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime", "r") as f:
+            system_uptime = float(f.read().split()[0])
+        started = int(fields[19]) / os.sysconf("SC_CLK_TCK")
+        return max(0.0, system_uptime - started)
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+class StartupTimeline:
+    """
+    Process age at each milestone of the start-up (imports done, model loaded, ready...).
+    Ages come from `process_uptime`, falling back to the time since the timeline was created.
+    """
+
+    def __init__(self):
+        self._created = time.monotonic()
+        self._offset = process_uptime() or 0.0
+        self._marks: dict[str, float] = {}
+
+    def mark(self, name: str) -> float:
+        """
+        Record a milestone (the first time only).
+
+        Returns:
+            float: Process age at the milestone, in seconds
+        """
+        if name not in self._marks:
+            self._marks[name] = round(self._offset + time.monotonic() - self._created, 4)
+        return self._marks[name]
+
+    def as_dict(self) -> dict:
+        """Milestones in the order they were reached, e.g. {"imports": 0.71, "ready": 2.4}."""
+        return dict(self._marks)
+
+
+def parse_importtime(output: str, top: int | None = None) -> dict:
+    """
+    Aggregate an import-time profile per top-level package.
+
+    The self time of every module is charged to its top-level package (numpy.core -> numpy), so the packages
+    split the total import time exactly, however deep they were imported.
+
+    Args:
+        output: stderr of a process started with `python -X importtime`
+        top: Keep only the slowest packages (None keeps all of them)
+
+    Returns:
+        dict: total_seconds and packages, {package: seconds} from the slowest
+    """
+    packages: dict[str, int] = {}
+    for line in output.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match is not None:
+            self_us, module = match.groups()
+            package = module.split(".")[0]
+            packages[package] = packages.get(package, 0) + int(self_us)
+
+    ranked = sorted(packages.items(), key=lambda item: item[1], reverse=True)
+    return {
+        "total_seconds": sum(packages.values()) / 1e6,
+        "packages": {package: us / 1e6 for package, us in ranked[:top]},
+    }
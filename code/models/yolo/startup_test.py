@@ -0,0 +1,61 @@
+# External imports
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+from startup import HEAVY_MODULES, StartupTimeline, parse_importtime, process_uptime
+
+
+class TestStartup(unittest.TestCase):
+    """
+    This class tests the cold-start measurements and that the engine modules are imported lazily.
+    """
+
+
+    def test_parse_importtime(self):
+        """
+        Tests that the self time of every module is charged to its top-level package.
+        """
+
+        output = "\n".join([
+            "import time: self [us] | cumulative | imported package",
+            "import time:       200 |        200 |     numpy.core._multiarray_umath",
+            "import time:       300 |        500 |   numpy",
+            "import time:      1000 |       1000 |   yaml",
+            "import time:        50 |       1550 | detector",
+            "INFO:     Started server process [42]",
+        ])
+        profile = parse_importtime(output)
+
+        self.assertAlmostEqual(profile["total_seconds"], 0.00155)
+        self.assertEqual(list(profile["packages"]), ["yaml", "numpy", "detector"])
+        self.assertAlmostEqual(profile["packages"]["numpy"], 0.0005)
+        self.assertEqual(list(parse_importtime(output, top=1)["packages"]), ["yaml"])
+
+
+    def test_timeline(self):
+        """
+        Tests that milestones are recorded once, in order, as ages of the process.
+        """
+
+        timeline = StartupTimeline()
+        imports = timeline.mark("imports")
+        self.assertEqual(timeline.mark("imports"), imports)
+        self.assertGreaterEqual(timeline.mark("ready"), imports)
+        self.assertEqual(list(timeline.as_dict()), ["imports", "ready"])
+
+        uptime = process_uptime()
+        if uptime is not None:
+            self.assertGreater(uptime, 0)
+
+
+    def test_engines_imported_lazily(self):
+        """
+        Tests that importing the detector imports none of the engine modules, which load with the model.
+        """
+
+        code = f"import sys, detector; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+        result = subprocess.run(
+            [sys.executable, "-c", code], cwd=Path(__file__).parent, capture_output=True, text=True, check=True
+        )
+        self.assertEqual(result.stdout.strip(), "")
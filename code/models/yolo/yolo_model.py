@@ -1,8 +1,15 @@
+import json
+import os
+
+import cv2
 import yaml
 
 from ultralytics import YOLO
 from ultralytics.utils.metrics import DetMetrics
 
+from inference_config import InferenceConfig, load_inference_config
+from stage_timing import record, STAGE_PREPROCESS, STAGE_INFERENCE, STAGE_NMS
+
 
 class YOLOClass:
     """
@@ -73,6 +80,88 @@ class YOLOClass:
         return train_results, ft_metrics
 
 
+    def export_quantized(self, config_path : str, output_folder : str | None = None) -> dict:
+        """
+        Export the loaded model to ONNX together with its FP16, dynamic INT8 and static INT8 variants,
+        and write a report comparing their accuracy and CPU latency.
+
+        Params:
+        - config_path : string, path to the fine-tuning configuration YAML file (dataset, image size and quantization settings)
+        - output_folder : string, folder where the variants and 'quantization_report.json' are written. Defaults to 'quantized/' in the project folder, or next to the exported model
+
+        Returns:
+        - report : dict, mAP50-95, mAP50, per-image latency and size of every variant, and the recommended variant
+        """
+        # Only needed for this offline step
+        import quantization as q
+
+        # Load configuration path
+        try:
+            with open(config_path, 'r') as f:
+                config = yaml.safe_load(f)
+        except FileNotFoundError as e:
+            print(f"File {config_path} not found\nError:\n\n{e}")
+            return
+
+        # Define variables for eventual use
+        self.config_data_path = config['config_data_path']
+        image_size = config['image_size']
+        max_map_drop = config.get('max_map_drop', 0.01)
+
+        # Export the FP32 model with a fixed input size, as served in production
+        exported_path = str(self.model.export(format="onnx", imgsz=image_size))
+        if output_folder is None:
+            output_folder = self.project_folder + 'quantized/' if self.project_folder is not None else os.path.join(os.path.dirname(exported_path), 'quantized')
+        fp32_path = q.export_fp32(exported_path, output_folder)
+        stem = fp32_path[:-len(f"_{q.VARIANT_FP32}.onnx")]
+
+        # Calibration set drawn from the training split of the fine-tuning dataset
+        calibration = q.sample_images(
+            q.dataset_images(self.config_data_path, config.get('calibration_split', 'train')),
+            config.get('calibration_images', 200)
+        )
+        print(f"Calibrating static quantization on {len(calibration)} images")
+
+        variant_paths = {
+            q.VARIANT_FP32: fp32_path,
+            q.VARIANT_FP16: q.convert_fp16(fp32_path, f"{stem}_{q.VARIANT_FP16}.onnx"),
+            q.VARIANT_INT8_DYNAMIC: q.quantize_dynamic_int8(fp32_path, f"{stem}_{q.VARIANT_INT8_DYNAMIC}.onnx"),
+            q.VARIANT_INT8_STATIC: q.quantize_static_int8(fp32_path, f"{stem}_{q.VARIANT_INT8_STATIC}.onnx", calibration, image_size),
+        }
+
+        # Latency is measured on validation images, one at a time, as requests are served
+        latency_images = [cv2.imread(path) for path in q.sample_images(q.dataset_images(self.config_data_path, 'val'), config.get('latency_images', 20))]
+        latency_images = [image for image in latency_images if image is not None]
+
+        variants = {}
+        for name, path in variant_paths.items():
+            print(f"--- Evaluating {name} ---")
+            metrics = YOLOClass(path, self.config_data_path, self.project_folder).test(split="val")
+            variants[name] = {
+                "path": path,
+                "size_mb": os.path.getsize(path) / 2**20,
+                "map50_95": float(metrics.box.map),
+                "map50": float(metrics.box.map50),
+                "latency": q.measure_latency(path, latency_images, image_size, threads=config.get('latency_threads', 1)),
+            }
+
+        report = {
+            "image_size": image_size,
+            "calibration_images": len(calibration),
+            "latency_images": len(latency_images),
+            "max_map_drop": max_map_drop,
+            "variants": variants,
+            "recommended": q.pick_variant(variants, max_map_drop),
+        }
+        with open(os.path.join(output_folder, 'quantization_report.json'), 'w') as f:
+            json.dump(report, f, indent=2)
+
+        for name, entry in variants.items():
+            print(f"{name}: mAP50-95 {entry['map50_95']:.4f}, p50 {entry['latency']['p50_ms']:.1f} ms, {entry['size_mb']:.1f} MB")
+        print(f"Recommended variant: {report['recommended']}")
+        return report
+
+
     def load_module(self, finetuned_model_path : str):
         """
         Loads a fine-tuned version of YOLO from a given path
@@ -106,37 +195,41 @@ class YOLOClass:
         # Define the folder where validation results will be stored
         val_folder = self.project_folder + 'validation/' if self.project_folder is not None else None
 
-        # Run validation on the specified dataset split and print the mean Average Precision (mAP)
-        val_metrics = self.model.val(split=split, project=val_folder)
+        # Run validation on the specified dataset split and print the mean Average Precision (mAP).
+        # Exported models (e.g. ONNX) do not remember their dataset: pass it when known
+        dataset = {"data": self.config_data_path} if self.config_data_path is not None else {}
+        val_metrics = self.model.val(split=split, project=val_folder, **dataset)
         print(f"{split} mAP50-95: {val_metrics.box.map}")
         return val_metrics
 
 
-    def predict(self, config_path : str,  image_path : str, project_folder : str | None = None):
+    def predict(self, config_path : str | InferenceConfig,  image_path : str, project_folder : str | None = None):
         """
         Make the prediction on a given image.
 
         Params:
-        - image_path : string, path to the image where to make prediction
-        - config_path : string, path to the inference configuration YAML file.
+        - image_path : string, path to the image where to make prediction. A list of images is run as a single batch
+        - config_path : string, path to the inference configuration YAML file (parsed once and cached until it changes), or an already loaded InferenceConfig
         - project_folder : string, path to a folder where to store test results. Automatically adds an inner folder 'prediction/'
 
         Returns:
         - predictions : object, predictions made by the model
         """
 
-        # Load the inference configuration from the provided YAML file
-        try:
-            with open(config_path, 'r') as f:
-                config = yaml.safe_load(f)
-        except FileNotFoundError as e:
-            print(f"File {config_path} not found\nError:\n\n{e}")
-            return
+        # Get the inference configuration (cached, reloaded only when the YAML file changes)
+        if isinstance(config_path, InferenceConfig):
+            config = config_path
+        else:
+            try:
+                config = load_inference_config(config_path)
+            except FileNotFoundError as e:
+                print(f"File {config_path} not found\nError:\n\n{e}")
+                return
 
         # Check if a model is already loaded, otherwise load the model specified in the config
         if self.model is None:
-            assert config['model_path'] is not None, "No model loaded. Please provide a model path."
-            self.load_module(config['model_path'])
+            assert config.model_path is not None, "No model loaded. Please provide a model path."
+            self.load_module(config.model_path)
             self.project_folder = project_folder
 
         # Define the folder where prediction results will be stored
@@ -145,9 +238,19 @@ class YOLOClass:
         # Run prediction on the given image using parameters from the config
         predictions = self.model.predict(
             source=image_path,
-            imgsz=config['image_size'],
-            conf=config['conf_threshold'],
-            save=config['save'],
+            imgsz=config.image_size,
+            conf=config.conf_threshold,
+            iou=config.iou_threshold,
+            max_det=config.max_detections,
+            save=config.save,
+            batch=len(image_path) if isinstance(image_path, list) else 1,
             project = predict_folder
         )
+
+        # ultralytics measures its own stages, in milliseconds per image; its post-processing is the NMS
+        if predictions:
+            speed = predictions[0].speed
+            record(STAGE_PREPROCESS, speed.get("preprocess", 0.0) * len(predictions) / 1000)
+            record(STAGE_INFERENCE, speed.get("inference", 0.0) * len(predictions) / 1000)
+            record(STAGE_NMS, speed.get("postprocess", 0.0) * len(predictions) / 1000)
         return predictions